@@ -0,0 +1,100 @@
+"""
+Cold-start benchmark for the Cloud Functions module.
+
+Each endpoint is measured in a fresh Python process so that nothing is warm:
+the script reports the time to import `main`, the first request (which pays
+for lazy imports and client creation) and a second, warm request.
+
+Run from the repository root with the same environment variables and
+credentials the functions use:
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --endpoints create_session get_investor_dashboard_data --user-id bench_user
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "firebase_functions", "functions")
+
+# Runs inside the child process: times the import and two calls to one endpoint.
+_CHILD_SCRIPT = """
+import json, sys, time
+from werkzeug.test import EnvironBuilder
+from flask import Request
+
+endpoint, method, payload = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+start = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - start) * 1000
+
+def call():
+    builder = EnvironBuilder(method=method, json=payload if method == "POST" else None,
+                             query_string=payload if method == "GET" else None)
+    start = time.perf_counter()
+    response = getattr(main, endpoint)(Request(builder.get_environ()))
+    return (time.perf_counter() - start) * 1000, response.status_code
+
+first_ms, first_status = call()
+warm_ms, warm_status = call()
+print(json.dumps({"import_ms": import_ms, "first_ms": first_ms, "first_status": first_status,
+                  "warm_ms": warm_ms, "warm_status": warm_status}))
+"""
+
+
+def endpoint_requests(args):
+    """Returns the sample request (method, payload) used for each endpoint."""
+    return {
+        "create_session": ("POST", {"user_id": args.user_id}),
+        "get_investor_dashboard_data": ("GET", {"page_size": "25"}),
+        "get_analysis_status": ("GET", {"job_id": args.job_id}),
+        "invester_query_agent_function": ("POST", {
+            "user_id": args.user_id, "session_id": args.session_id,
+            "analysis_id": args.analysis_id, "prompt": "What is the market size?",
+        }),
+        "followup_question": ("POST", {"user_id": args.user_id, "session_id": args.session_id}),
+    }
+
+
+def run_endpoint(endpoint, method, payload):
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD_SCRIPT, endpoint, method, json.dumps(payload)],
+        cwd=FUNCTIONS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    # The functions log to stdout; the measurement is the last line.
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "no output"}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", default=["create_session", "get_investor_dashboard_data", "get_analysis_status"])
+    parser.add_argument("--user-id", default="cold_start_benchmark_user")
+    parser.add_argument("--session-id", default="")
+    parser.add_argument("--analysis-id", default="")
+    parser.add_argument("--job-id", default="cold-start-benchmark-missing-job")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per endpoint.")
+    args = parser.parse_args()
+
+    requests_by_endpoint = endpoint_requests(args)
+    print(f"{'endpoint':<32}{'import ms':>12}{'first ms':>12}{'warm ms':>12}  status")
+    for endpoint in args.endpoints:
+        method, payload = requests_by_endpoint[endpoint]
+        runs = [run_endpoint(endpoint, method, payload) for _ in range(args.runs)]
+        errors = [run["error"] for run in runs if "error" in run]
+        if errors:
+            print(f"{endpoint:<32}  failed: {errors[0]}")
+            continue
+        median = lambda key: sorted(run[key] for run in runs)[len(runs) // 2]
+        statuses = sorted({f"{run['first_status']}/{run['warm_status']}" for run in runs})
+        print(f"{endpoint:<32}{median('import_ms'):>12.1f}{median('first_ms'):>12.1f}{median('warm_ms'):>12.1f}  {','.join(statuses)}")
+
+
+if __name__ == "__main__":
+    main()
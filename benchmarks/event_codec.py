@@ -0,0 +1,111 @@
+"""
+Round-trip check and micro-benchmark for the Firestore event codec.
+
+For each event shape the script first checks that decoding an encoded event
+gives back an identical Event, then reports encode and decode throughput.
+Legacy (unversioned, snake_case actions) documents are decoded as well.
+
+Run from the repository root:
+
+    python benchmarks/event_codec.py
+    python benchmarks/event_codec.py --iterations 50000 --shapes text state_delta
+"""
+import argparse
+import os
+import sys
+import time
+
+MANAGER_AGENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "manager_agent")
+sys.path.insert(0, MANAGER_AGENT_DIR)
+
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.events.event_actions import EventActions  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from firestore.event_codec import SCHEMA_VERSION_FIELD, decode_event, encode_event  # noqa: E402
+
+
+def sample_events():
+    """Returns one representative event per shape seen in VentureAI sessions."""
+    timestamp = 1760000000.123456
+    return {
+        "text": Event(
+            id="evt_text", invocation_id="inv_1", author="user", timestamp=timestamp,
+            content=types.Content(role="user", parts=[types.Part(text="What is the market size?")]),
+        ),
+        "state_delta": Event(
+            id="evt_state", invocation_id="inv_1", author="investment_analysis_agent", timestamp=timestamp,
+            content=types.Content(role="model", parts=[types.Part(text='{"company_name": "Acme"}')]),
+            actions=EventActions(state_delta={"analysis_id": "a1b2c3", "tech_field": "fintech"}),
+            turn_complete=True,
+        ),
+        "function_call": Event(
+            id="evt_call", invocation_id="inv_2", author="invester_query_agent", timestamp=timestamp,
+            content=types.Content(role="model", parts=[
+                types.Part(function_call=types.FunctionCall(id="call_1", name="get_analysis_data", args={})),
+            ]),
+            long_running_tool_ids={"call_1"},
+        ),
+        "function_response": Event(
+            id="evt_response", invocation_id="inv_2", author="invester_query_agent", timestamp=timestamp,
+            content=types.Content(role="user", parts=[
+                types.Part(function_response=types.FunctionResponse(
+                    id="call_1", name="get_analysis_data", response={"company_name": "Acme", "market_size": "$4B"},
+                )),
+            ]),
+        ),
+        "transfer": Event(
+            id="evt_transfer", invocation_id="inv_3", author="manager_agent", timestamp=timestamp,
+            actions=EventActions(transfer_to_agent="followup_questions_agent", skip_summarization=True),
+        ),
+    }
+
+
+def legacy_document(event):
+    """Rewrites an encoded event the way the unversioned serializer stored it."""
+    doc = encode_event(event)
+    doc.pop(SCHEMA_VERSION_FIELD)
+    actions = doc.get("actions")
+    if actions:
+        doc["actions"] = {
+            "skip_summarization": actions["skipSummarization"],
+            "state_delta": actions["stateDelta"],
+            "artifact_delta": actions["artifactDelta"],
+            "transfer_agent": actions["transferAgent"],
+            "escalate": actions["escalate"],
+            "requested_auth_configs": actions["requestedAuthConfigs"],
+        }
+    return doc
+
+
+def ops_per_sec(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    events = sample_events()
+    parser.add_argument("--shapes", nargs="+", default=list(events), choices=list(events))
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'shape':<20}{'round trip':>12}{'encode/s':>12}{'decode/s':>12}{'legacy/s':>12}")
+    for shape in args.shapes:
+        event = events[shape]
+        doc = encode_event(event)
+        legacy_doc = legacy_document(event)
+        round_trip_ok = (
+            decode_event(event.id, doc).model_dump() == event.model_dump()
+            and decode_event(event.id, legacy_doc).model_dump() == event.model_dump()
+        )
+        encode_rate = ops_per_sec(lambda: encode_event(event), args.iterations)
+        decode_rate = ops_per_sec(lambda: decode_event(event.id, doc), args.iterations)
+        legacy_rate = ops_per_sec(lambda: decode_event(event.id, legacy_doc), args.iterations)
+        print(f"{shape:<20}{'ok' if round_trip_ok else 'MISMATCH':>12}{encode_rate:>12.0f}{decode_rate:>12.0f}{legacy_rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Compares the sync (thread-offloaded) and native async Firestore session backends.
+
+Each backend runs the same workload: `--sessions` sessions are driven in
+parallel, each creating a session, then running `--events` turns that read the
+session and append an event, and finally deleting it. Every turn runs in its
+own `asyncio.run` on a new thread, which is how Agent Engine calls the session
+service, so per-loop resources and the concurrency limit are exercised as in
+production. The script reports wall time, throughput and per-operation latency
+percentiles for each backend.
+
+Run from the repository root against a scratch database (or the Firestore
+emulator via FIRESTORE_EMULATOR_HOST), with the variables the agent uses:
+
+    python benchmarks/session_backends.py --sessions 50 --events 10
+    python benchmarks/session_backends.py --backends async --max-concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MANAGER_AGENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "manager_agent")
+sys.path.insert(0, MANAGER_AGENT_DIR)
+
+from google.adk.events.event import Event  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from firestore.async_firestore_session_service import AsyncFirestoreSessionService  # noqa: E402
+from firestore.firestore_session_service import FirestoreSessionService  # noqa: E402
+
+APP_NAME = "session_backend_benchmark"
+
+
+def build_service(backend, args):
+    if backend == "async":
+        return AsyncFirestoreSessionService(
+            project=args.project, database=args.database, max_concurrency=args.max_concurrency
+        )
+    return FirestoreSessionService(project=args.project, database=args.database)
+
+
+def run_turn(turn):
+    """Runs one turn the way Agent Engine does: in a new event loop on a new thread."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = asyncio.run(turn())
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
+
+def run_session(service, index, events, latencies):
+    user_id = f"bench_user_{index}"
+
+    async def timed(op, coro):
+        start = time.perf_counter()
+        result = await coro
+        latencies.setdefault(op, []).append((time.perf_counter() - start) * 1000)
+        return result
+
+    session = run_turn(lambda: timed("create_session", service.create_session(app_name=APP_NAME, user_id=user_id)))
+    for turn in range(events):
+        event = Event(
+            author="user" if turn % 2 == 0 else "benchmark_agent",
+            invocation_id=f"inv_{index}_{turn}",
+            content=types.Content(role="user", parts=[types.Part(text=f"Benchmark message {turn} of session {index}.")]),
+        )
+
+        async def query():
+            current = await timed(
+                "get_session", service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session.id)
+            )
+            await timed("append_event", service.append_event(current, event))
+
+        run_turn(query)
+    run_turn(lambda: timed(
+        "delete_session", service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session.id)
+    ))
+
+
+def run_backend(backend, args):
+    service = build_service(backend, args)
+    latencies = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        # list() surfaces the first session error, if any.
+        list(executor.map(lambda i: run_session(service, i, args.events, latencies), range(args.sessions)))
+    wall_sec = time.perf_counter() - start
+    return wall_sec, latencies, getattr(service, "peak_in_flight", None)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--project", default=os.getenv("PROJECT_ID"))
+    parser.add_argument("--database", default=os.getenv("DATABASE"))
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions driven in parallel.")
+    parser.add_argument("--events", type=int, default=10, help="Turns (read, then append an event) per session.")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="Concurrency limit of the async backend.")
+    args = parser.parse_args()
+
+    total_ops = args.sessions * (2 * args.events + 2)
+    for backend in args.backends:
+        wall_sec, latencies, peak_in_flight = run_backend(backend, args)
+        peak = f", peak in flight {peak_in_flight}" if peak_in_flight is not None else ""
+        print(f"{backend}: {wall_sec:.2f}s wall, {total_ops / wall_sec:.1f} ops/s{peak}")
+        print(f"  {'operation':<16}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        for op, values in latencies.items():
+            print(f"  {op:<16}{percentile(values, 0.5):>10.1f}{percentile(values, 0.95):>10.1f}{max(values):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Content-addressed cache of completed pitch deck analyses.
+
+Entries live in Firestore and are keyed on the SHA-256 of the deck bytes
+together with the analysis prompt, tech field and requesting user, so a user
+resubmitting the same deck with the same inputs can reuse their stored memo
+instead of rerunning the agent pipeline. Analysis rows are attributed to the
+user who requested them, so entries are never shared across users.
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+
+# --- Configuration ---
+ANALYSIS_CACHE_COLLECTION = "analysis_cache"
+ANALYSIS_CACHE_MAX_AGE_HOURS = float(os.environ.get("ANALYSIS_CACHE_MAX_AGE_HOURS", "168"))
+# --------------------
+
+
+def analysis_cache_key(deck_sha256, prompt, tech_field, user_id):
+    """Builds the cache key for a deck hash, prompt, tech field and user."""
+    key_material = "\n".join([deck_sha256, prompt or "", tech_field or "", user_id or ""])
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+def lookup_cached_analysis(db, cache_key, max_age_hours=ANALYSIS_CACHE_MAX_AGE_HOURS):
+    """Returns the cached analysis for `cache_key` if it is within the freshness window, else None."""
+    cache_doc = db.collection(ANALYSIS_CACHE_COLLECTION).document(cache_key).get()
+    if not cache_doc.exists:
+        return None
+
+    entry = cache_doc.to_dict()
+    created = entry.get("createTime")
+    if created is None or datetime.now(timezone.utc) - created > timedelta(hours=max_age_hours):
+        return None
+    return {
+        "analysis_id": entry["analysis_id"],
+        "generated_pdf_url": entry["generated_pdf_url"],
+    }
+
+
+def store_cached_analysis(db, cache_key, result, deck_sha256, tech_field, user_id):
+    """Records a completed analysis under `cache_key`, replacing any stale entry."""
+    from firebase_admin import firestore
+
+    db.collection(ANALYSIS_CACHE_COLLECTION).document(cache_key).set({
+        "analysis_id": result["analysis_id"],
+        "generated_pdf_url": result["generated_pdf_url"],
+        "deck_sha256": deck_sha256,
+        "tech_field": tech_field,
+        "user_id": user_id,
+        "createTime": firestore.SERVER_TIMESTAMP,
+    })
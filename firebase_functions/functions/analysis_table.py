@@ -0,0 +1,59 @@
+"""
+Column layout of the BigQuery pitch deck analysis table.
+
+Shared by table creation and by the dashboard query builder, which only
+accepts projected columns that appear here.
+
+`inserted_at` is filled in by BigQuery itself (a column default), at the time
+the row is written, so it orders rows by when they landed in the table rather
+than by when the analysis ran. Writers leave it out of their rows.
+"""
+
+ANALYSIS_TABLE_FIELDS = [
+    ("analysis_id", "STRING"),
+    ("user_id", "STRING"), # Added user_id
+    ("generated_pdf_url", "STRING"),
+    ("company_name", "STRING"),
+    ("tech_field", "STRING"),
+    ("company_website", "STRING"),
+    ("date", "STRING"),
+    ("author", "STRING"),
+    ("introduction", "STRING"), # from summary
+    ("problem", "STRING"), # from problem_definition
+    ("product_description", "STRING"), # from solution_description
+    ("business_model", "STRING"), # Added business_model
+    ("market_competition", "STRING"), # from competitive_advantage
+    ("opportunity", "STRING"), # from market_opportunity.analysis
+    ("market_size_tam", "STRING"),
+    ("market_size_som", "STRING"),
+    ("market_growth_rate", "STRING"),
+    ("impact_metrics", "STRING"), # from traction.metrics
+    ("customer_feedback", "STRING"),
+    ("founders", "STRING"),
+    ("team_strengths", "STRING"), # from team_analysis.background_summary
+    ("key_strengths", "STRING"), # from team_analysis.strengths
+    ("round_size", "STRING"), # from financials.funding_ask_inr
+    ("use_of_funds", "STRING"),
+    ("growth_trajectory", "STRING"), # from financials.projections_summary
+    ("recommendation", "STRING"),
+    ("justification", "STRING"),
+    ("technical_risk", "STRING"), # from investment_recommendation.risks
+    ("created_at", "TIMESTAMP"), # time the analysis completed
+    ("inserted_at", "TIMESTAMP"), # sink-side write time, used for dashboard delta sync
+]
+
+# Column default expressions, evaluated by BigQuery when a row omits the column.
+ANALYSIS_TABLE_DEFAULTS = {
+    "inserted_at": "CURRENT_TIMESTAMP()",
+}
+
+ANALYSIS_TABLE_COLUMNS = [name for name, _ in ANALYSIS_TABLE_FIELDS]
+# Columns written by the row writer; columns with defaults are left to BigQuery.
+ANALYSIS_LOAD_FIELDS = [(name, field_type) for name, field_type in ANALYSIS_TABLE_FIELDS if name not in ANALYSIS_TABLE_DEFAULTS]
+
+
+def analysis_schema_field(name, field_type):
+    """Builds the BigQuery SchemaField for one column, with its default expression if any."""
+    from google.cloud import bigquery
+
+    return bigquery.SchemaField(name, field_type, default_value_expression=ANALYSIS_TABLE_DEFAULTS.get(name))
@@ -0,0 +1,133 @@
+"""
+Batched writer for pitch deck analysis rows.
+
+`write(row)` returns once the row is in the table, so a request never finishes
+(or hands out the row's analysis ID) before its row is written; Cloud Functions
+may throttle or recycle an instance as soon as the response is sent, so nothing
+is left to a background flush. Rows written concurrently on the same instance
+share a batch: a request whose row was picked up by another request's flush
+waits for that flush instead of starting a load job of its own, and learns from
+it whether its own row was written.
+
+Batches are written with load jobs by default, which keeps rows out of the
+streaming buffer so DML can touch them immediately. The load job ID is derived
+from the batch's analysis IDs, so retrying a batch that already landed is
+rejected by BigQuery instead of duplicating rows. Load jobs leave out the
+sink-managed `inserted_at` column so BigQuery fills in its default; the legacy
+streaming API does not apply column defaults, so streamed rows are stamped just
+before the insert, and it uses the analysis ID as insertId for the same
+best-effort deduplication.
+"""
+import hashlib
+from datetime import datetime, timezone
+import os
+import threading
+
+from analysis_table import ANALYSIS_LOAD_FIELDS
+
+# --- Configuration ---
+BIGQUERY_WRITE_METHOD = os.environ.get("BIGQUERY_WRITE_METHOD", "load") # "load" or "streaming"
+BIGQUERY_WRITE_MAX_BATCH_ROWS = int(os.environ.get("BIGQUERY_WRITE_MAX_BATCH_ROWS", "50"))
+# --------------------
+
+
+class _PendingRow:
+    """A row waiting to be written, and the outcome of the batch that carried it."""
+
+    def __init__(self, row):
+        self.row = row
+        self.done = False
+        self.error = None
+
+
+class AnalysisRowWriter:
+    """Writes analysis rows to BigQuery, batching rows written concurrently."""
+
+    def __init__(self, client, table_ref_str, method=BIGQUERY_WRITE_METHOD,
+                 max_batch_rows=BIGQUERY_WRITE_MAX_BATCH_ROWS, on_flush=None):
+        if method not in ("load", "streaming"):
+            raise ValueError(f"Unsupported BigQuery write method: {method}")
+        self._client = client
+        self._table_ref_str = table_ref_str
+        self._method = method
+        self._max_batch_rows = max_batch_rows
+        self._on_flush = on_flush
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        # Serializes flushes so a row is only ever taken by one of them.
+        self._flush_lock = threading.Lock()
+
+    def write(self, row):
+        """
+        Writes `row`, together with any rows queued meanwhile, and returns once
+        it is in the table. If the batch carrying the row fails, the error is
+        raised; the row is not kept, so it is never written after the caller
+        has given up on it.
+        """
+        pending = _PendingRow(row)
+        with self._pending_lock:
+            self._pending.append(pending)
+        with self._flush_lock:
+            if not pending.done:
+                self._flush_pending()
+        if pending.error is not None:
+            raise pending.error
+
+    def _flush_pending(self):
+        """Writes every queued row in batches and records each batch's outcome on its rows."""
+        with self._pending_lock:
+            queued, self._pending = self._pending, []
+        written = []
+        for start in range(0, len(queued), self._max_batch_rows):
+            batch = queued[start:start + self._max_batch_rows]
+            try:
+                self._write_batch([pending.row for pending in batch])
+                written.extend(pending.row for pending in batch)
+            except Exception as e:
+                print(f"Writing {len(batch)} analysis rows to BigQuery failed: {e}")
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.done = True
+        if not written:
+            return
+        print(f"Flushed {len(written)} analysis rows to BigQuery.")
+        if self._on_flush:
+            # The rows are already in the table; a failing hook must not report them as failed.
+            try:
+                self._on_flush(written)
+            except Exception as e:
+                print(f"Post-flush hook for analysis rows failed: {e}")
+
+    def _write_batch(self, rows):
+        if self._method == "streaming":
+            inserted_at = datetime.now(timezone.utc).isoformat()
+            errors = self._client.insert_rows_json(
+                self._table_ref_str,
+                [{**row, "inserted_at": inserted_at} for row in rows],
+                row_ids=[row["analysis_id"] for row in rows],
+            )
+            if errors:
+                raise Exception(f"BigQuery insertion failed: {errors}")
+            return
+
+        from google.cloud import bigquery
+        from google.api_core.exceptions import Conflict
+
+        batch_key = ",".join(sorted(row["analysis_id"] for row in rows))
+        job_id = "analysis_rows_" + hashlib.sha256(batch_key.encode("utf-8")).hexdigest()[:40]
+        job_config = bigquery.LoadJobConfig(
+            schema=[bigquery.SchemaField(name, field_type) for name, field_type in ANALYSIS_LOAD_FIELDS],
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        try:
+            load_job = self._client.load_table_from_json(rows, self._table_ref_str, job_config=job_config, job_id=job_id)
+        except Conflict:
+            # A job with this ID already exists: an earlier attempt submitted this exact batch.
+            load_job = self._client.get_job(job_id)
+            if load_job.done() and load_job.error_result:
+                # That attempt failed without writing anything, so it is safe to submit again.
+                load_job = self._client.load_table_from_json(
+                    rows, self._table_ref_str, job_config=job_config, job_id_prefix=job_id + "_retry_"
+                )
+        load_job.result()
@@ -0,0 +1,77 @@
+"""
+Response cache and ETags for the investor dashboard.
+
+A single Firestore document carries a version counter that is bumped every
+time analysis rows are written to BigQuery. The ETag of a dashboard response
+is derived from that version, the normalized query options and the current
+TTL window, so a dashboard poll can be answered with a 304 or from the
+in-process cache without running a BigQuery job. Bumping the version
+invalidates every cached page on every instance.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuration ---
+DASHBOARD_META_COLLECTION = "dashboard_meta"
+DASHBOARD_META_DOCUMENT = "analysis_table"
+DASHBOARD_CACHE_TTL_SEC = int(os.environ.get("DASHBOARD_CACHE_TTL_SEC", "300"))
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.environ.get("DASHBOARD_CACHE_MAX_ENTRIES", "128"))
+# --------------------
+
+
+def get_dashboard_version(db):
+    """Returns the current dashboard data version (0 before the first insert)."""
+    meta_doc = db.collection(DASHBOARD_META_COLLECTION).document(DASHBOARD_META_DOCUMENT).get()
+    if not meta_doc.exists:
+        return 0
+    return meta_doc.to_dict().get("version", 0)
+
+
+def bump_dashboard_version(db):
+    """Marks the dashboard data as changed, invalidating cached responses everywhere."""
+    from firebase_admin import firestore
+
+    db.collection(DASHBOARD_META_COLLECTION).document(DASHBOARD_META_DOCUMENT).set({
+        "version": firestore.Increment(1),
+        "updateTime": firestore.SERVER_TIMESTAMP,
+    }, merge=True)
+
+
+def dashboard_etag(version, options, now=None):
+    """Builds a strong ETag for a dashboard page from the data version, options and TTL window."""
+    ttl_window = int((now or time.time()) // DASHBOARD_CACHE_TTL_SEC)
+    key_material = json.dumps({"version": version, "window": ttl_window, "options": options}, sort_keys=True, default=str)
+    return '"' + hashlib.sha256(key_material.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+class DashboardResponseCache:
+    """A size-bounded, TTL-bounded in-process cache of serialized dashboard pages keyed by ETag."""
+
+    def __init__(self, max_entries=DASHBOARD_CACHE_MAX_ENTRIES, ttl_sec=DASHBOARD_CACHE_TTL_SEC):
+        self._max_entries = max_entries
+        self._ttl_sec = ttl_sec
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None:
+                return None
+            expires_at, response_data = entry
+            if time.monotonic() > expires_at:
+                del self._entries[etag]
+                return None
+            self._entries.move_to_end(etag)
+            return response_data
+
+    def put(self, etag, response_data):
+        with self._lock:
+            self._entries[etag] = (time.monotonic() + self._ttl_sec, response_data)
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,170 @@
+"""
+Paginated, projected and filtered queries for the investor dashboard.
+
+Pages are keyset-paginated on (date DESC, analysis_id DESC): the page token
+encodes the last row of the previous page, so each page scans only the
+requested columns and never re-reads earlier pages. All filter values are
+passed as query parameters; projected column names are checked against the
+table layout before being placed in the SQL.
+"""
+import base64
+import json
+import re
+from datetime import datetime, timezone
+
+from analysis_table import ANALYSIS_TABLE_COLUMNS
+
+# --- Configuration ---
+DEFAULT_DASHBOARD_FIELDS = [
+    "analysis_id",
+    "user_id",
+    "company_name",
+    "tech_field",
+    "company_website",
+    "date",
+    "recommendation",
+    "generated_pdf_url",
+    "created_at",
+]
+# Columns needed to build the next page token and the delta sync point; always selected.
+INTERNAL_FIELDS = ["date", "analysis_id", "inserted_at", "created_at"]
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+FILTER_FIELDS = ["tech_field", "recommendation", "user_id"]
+# --------------------
+
+_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class DashboardQueryError(ValueError):
+    """Raised when dashboard request parameters are invalid."""
+
+
+def encode_page_token(row):
+    """Encodes the cursor position after `row` as an opaque page token."""
+    cursor = {"date": row.get("date"), "analysis_id": row.get("analysis_id")}
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii")
+
+
+def decode_page_token(page_token):
+    """Decodes a page token produced by encode_page_token."""
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(page_token.encode("ascii")))
+        return {"date": cursor["date"] or "", "analysis_id": cursor["analysis_id"] or ""}
+    except (ValueError, KeyError, TypeError):
+        raise DashboardQueryError("Invalid page_token.")
+
+
+def parse_dashboard_params(params):
+    """Validates raw request parameters and returns normalized dashboard options."""
+    try:
+        page_size = int(params.get("page_size", DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise DashboardQueryError("page_size must be an integer.")
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise DashboardQueryError(f"page_size must be between 1 and {MAX_PAGE_SIZE}.")
+
+    fields = params.get("fields") or DEFAULT_DASHBOARD_FIELDS
+    if isinstance(fields, str):
+        fields = ANALYSIS_TABLE_COLUMNS if fields == "*" else [f.strip() for f in fields.split(",") if f.strip()]
+    unknown_fields = [f for f in fields if f not in ANALYSIS_TABLE_COLUMNS]
+    if unknown_fields:
+        raise DashboardQueryError(f"Unknown fields: {', '.join(unknown_fields)}.")
+
+    for date_param in ("date_from", "date_to"):
+        value = params.get(date_param)
+        if value and not _DATE_PATTERN.match(value):
+            raise DashboardQueryError(f"{date_param} must be formatted as YYYY-MM-DD.")
+
+    since = params.get("since")
+    if since:
+        try:
+            since = datetime.fromisoformat(since)
+        except ValueError:
+            raise DashboardQueryError("since must be an ISO 8601 timestamp.")
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        since = since.isoformat()
+
+    page_token = params.get("page_token")
+    return {
+        "page_size": page_size,
+        "fields": list(dict.fromkeys(fields)),
+        "cursor": decode_page_token(page_token) if page_token else None,
+        "filters": {name: params[name] for name in FILTER_FIELDS if params.get(name)},
+        "date_from": params.get("date_from"),
+        "date_to": params.get("date_to"),
+        "since": since,
+    }
+
+
+def build_dashboard_query(table_ref_str, options):
+    """Builds the SQL and query parameters for one dashboard page."""
+    from google.cloud import bigquery
+
+    selected = options["fields"] + [f for f in INTERNAL_FIELDS if f not in options["fields"]]
+    conditions = []
+    query_parameters = []
+
+    for name, value in options["filters"].items():
+        conditions.append(f"{name} = @{name}")
+        query_parameters.append(bigquery.ScalarQueryParameter(name, "STRING", value))
+
+    # Dates are stored as YYYY-MM-DD strings, so lexical comparison is chronological.
+    if options["date_from"]:
+        conditions.append("date >= @date_from")
+        query_parameters.append(bigquery.ScalarQueryParameter("date_from", "STRING", options["date_from"]))
+    if options["date_to"]:
+        conditions.append("date <= @date_to")
+        query_parameters.append(bigquery.ScalarQueryParameter("date_to", "STRING", options["date_to"]))
+
+    # Delta sync: only rows that landed in the table after the client's last sync point.
+    # Rows written before inserted_at existed fall back to created_at.
+    if options["since"]:
+        conditions.append("IFNULL(inserted_at, created_at) > @since")
+        query_parameters.append(bigquery.ScalarQueryParameter("since", "TIMESTAMP", datetime.fromisoformat(options["since"])))
+
+    if cursor := options["cursor"]:
+        conditions.append(
+            "(IFNULL(date, '') < @cursor_date"
+            " OR (IFNULL(date, '') = @cursor_date AND IFNULL(analysis_id, '') < @cursor_analysis_id))"
+        )
+        query_parameters.append(bigquery.ScalarQueryParameter("cursor_date", "STRING", cursor["date"]))
+        query_parameters.append(bigquery.ScalarQueryParameter("cursor_analysis_id", "STRING", cursor["analysis_id"]))
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = (
+        f"SELECT {', '.join(selected)} FROM `{table_ref_str}` {where_clause} "
+        f"ORDER BY IFNULL(date, '') DESC, IFNULL(analysis_id, '') DESC "
+        f"LIMIT @page_limit"
+    )
+    # Fetch one extra row to learn whether another page exists.
+    query_parameters.append(bigquery.ScalarQueryParameter("page_limit", "INT64", options["page_size"] + 1))
+    return query, query_parameters
+
+
+def fetch_dashboard_page(client, table_ref_str, options):
+    """
+    Runs the dashboard query and returns the page rows, the next page token and
+    `as_of`, the newest insertion time on the page, to be passed back as `since` for delta sync.
+    """
+    from google.cloud import bigquery
+
+    query, query_parameters = build_dashboard_query(table_ref_str, options)
+    print(f"Executing query: {query}")
+    job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+    rows = [dict(row) for row in client.query(query, job_config=job_config).result()]
+
+    next_page_token = None
+    if len(rows) > options["page_size"]:
+        rows = rows[:options["page_size"]]
+        next_page_token = encode_page_token(rows[-1])
+
+    inserted_times = [row.get("inserted_at") or row["created_at"] for row in rows if row.get("inserted_at") or row.get("created_at")]
+    as_of = max(inserted_times).isoformat() if inserted_times else options["since"]
+
+    hidden_fields = [f for f in INTERNAL_FIELDS if f not in options["fields"]]
+    for row in rows:
+        for field in hidden_fields:
+            row.pop(field, None)
+    return {"rows": rows, "next_page_token": next_page_token, "as_of": as_of}
@@ -0,0 +1,82 @@
+"""
+Streaming, size-bounded pitch deck downloads over a pooled HTTP session.
+
+The deck is streamed chunk by chunk to a caller-supplied writer (see
+`deck_storage`, which streams it into Cloud Storage) and hashed as it arrives,
+so the full deck is never held in memory and oversized uploads are rejected
+early.
+"""
+import hashlib
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- Configuration ---
+MAX_DECK_SIZE_BYTES = int(os.environ.get("MAX_DECK_SIZE_MB", "50")) * 1024 * 1024
+CONNECT_TIMEOUT_SEC = float(os.environ.get("DECK_CONNECT_TIMEOUT_SEC", "10"))
+READ_TIMEOUT_SEC = float(os.environ.get("DECK_READ_TIMEOUT_SEC", "30"))
+TOTAL_TIMEOUT_SEC = float(os.environ.get("DECK_TOTAL_TIMEOUT_SEC", "120"))
+CHUNK_SIZE_BYTES = 256 * 1024
+# --------------------
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class DeckDownloadError(Exception):
+    """Raised when a pitch deck cannot be downloaded."""
+
+
+class DeckTooLargeError(DeckDownloadError):
+    """Raised when a pitch deck exceeds MAX_DECK_SIZE_BYTES."""
+
+
+def get_http_session():
+    """Returns the process-wide pooled HTTP session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(["GET"]))
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def stream_deck(url, write, max_bytes=MAX_DECK_SIZE_BYTES, total_timeout_sec=TOTAL_TIMEOUT_SEC):
+    """
+    Streams the deck at `url` chunk by chunk into `write`, enforcing a size limit
+    and an overall deadline. Returns (size, sha256, response_headers).
+    """
+    deadline = time.monotonic() + total_timeout_sec
+    session = get_http_session()
+    with session.get(url, stream=True, timeout=(CONNECT_TIMEOUT_SEC, READ_TIMEOUT_SEC)) as response:
+        response.raise_for_status()
+
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise DeckTooLargeError(f"Pitch deck is {content_length} bytes, which exceeds the {max_bytes} byte limit.")
+
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE_BYTES):
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise DeckTooLargeError(f"Pitch deck exceeds the {max_bytes} byte limit.")
+            if time.monotonic() > deadline:
+                raise DeckDownloadError(f"Pitch deck download exceeded {total_timeout_sec} seconds.")
+            digest.update(chunk)
+            write(chunk)
+
+    print(f"Downloaded pitch deck ({size} bytes, sha256 {digest.hexdigest()}).")
+    return size, digest.hexdigest(), response.headers
+
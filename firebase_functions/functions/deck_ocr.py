@@ -0,0 +1,157 @@
+"""
+Page-sharded, parallel OCR of PDF decks.
+
+The PDF is split into shards of at most `pages_per_shard` pages (Document AI
+online processing rejects long documents), the shards are processed
+concurrently on a bounded thread pool, and the page results are reassembled
+in order with each page's offset in the combined text. Per-shard timings are
+returned alongside.
+
+The PDF may be given as bytes or as a seekable binary file (e.g. a temporary
+file), and at most `max_workers` shards are held in memory at a time.
+
+The OCR client is pluggable: anything with a `process_pdf(pdf_bytes)` method
+that returns the shard's pages as `{"text", "blocks"}` dicts, in order.
+`DocumentAiOcrClient` calls a Document AI OCR processor and
+`PypdfOcrClient` reads the embedded text layer locally.
+"""
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+OCR_PAGES_PER_SHARD = int(os.environ.get("OCR_PAGES_PER_SHARD", "15"))
+OCR_MAX_WORKERS = int(os.environ.get("OCR_MAX_WORKERS", "4"))
+# --------------------
+
+PAGE_SEPARATOR = "\n\n"
+
+
+class DocumentAiOcrClient:
+    """Processes PDF bytes with a Document AI OCR processor."""
+
+    def __init__(self, project_id, location, processor_id):
+        from google.api_core.client_options import ClientOptions
+        from google.cloud import documentai_v1
+
+        self._documentai = documentai_v1
+        self._client = documentai_v1.DocumentProcessorServiceClient(
+            client_options=ClientOptions(api_endpoint=f"{location}-documentai.googleapis.com")
+        )
+        self.processor_name = self._client.processor_path(project_id, location, processor_id)
+
+    def process_pdf(self, pdf_bytes):
+        return self._process(raw_document=self._documentai.RawDocument(content=pdf_bytes, mime_type="application/pdf"))
+
+    def process_gcs(self, gcs_uri, mime_type="application/pdf"):
+        """
+        Processes a document in Cloud Storage without downloading it. Raises
+        google.api_core.exceptions.InvalidArgument if it has more pages than the
+        processor accepts online.
+        """
+        return self._process(gcs_document=self._documentai.GcsDocument(gcs_uri=gcs_uri, mime_type=mime_type))
+
+    def _process(self, **document):
+        request = self._documentai.ProcessRequest(name=self.processor_name, **document)
+        document = self._client.process_document(request=request).document
+        return [
+            {
+                "text": _layout_text(document.text, page.layout).strip(),
+                "blocks": [
+                    {"text": _layout_text(document.text, block.layout).strip(), "bbox": _bounding_box(block.layout)}
+                    for block in page.blocks
+                ],
+            }
+            for page in document.pages
+        ]
+
+
+class PypdfOcrClient:
+    """Reads the embedded text layer with pypdf; a local stand-in for an OCR processor."""
+
+    def process_pdf(self, pdf_bytes):
+        from pypdf import PdfReader
+
+        pages = []
+        for page in PdfReader(io.BytesIO(pdf_bytes)).pages:
+            text = (page.extract_text() or "").strip()
+            blocks = [{"text": block.strip(), "bbox": None} for block in text.split("\n\n") if block.strip()]
+            pages.append({"text": text, "blocks": blocks})
+        return pages
+
+
+def split_pdf(pdf, pages_per_shard=OCR_PAGES_PER_SHARD):
+    """
+    Yields (first_page, shard_pdf_bytes) pieces of at most `pages_per_shard`
+    pages from a PDF given as bytes or a seekable binary file. Shards are built
+    one at a time, as they are consumed.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf)
+    page_count = len(reader.pages)
+    if page_count <= pages_per_shard and isinstance(pdf, bytes):
+        yield 1, pdf
+        return
+    for start in range(0, page_count, pages_per_shard):
+        writer = PdfWriter()
+        for page in reader.pages[start:start + pages_per_shard]:
+            writer.add_page(page)
+        shard_file = io.BytesIO()
+        writer.write(shard_file)
+        yield start + 1, shard_file.getvalue()
+
+
+def ocr_pdf(pdf, client, pages_per_shard=OCR_PAGES_PER_SHARD, max_workers=OCR_MAX_WORKERS):
+    """
+    OCRs a PDF (bytes or a seekable binary file) shard by shard on up to
+    `max_workers` threads. Returns
+    {"text", "pages": [{"page", "offset", "text", "blocks"}], "shards": [{"first_page", "last_page", "seconds"}]}
+    with pages in document order; `offset` is the page's start in `text`.
+    """
+    max_workers = max(1, max_workers)
+
+    def process_shard(first_page, shard_bytes):
+        start = time.perf_counter()
+        pages = client.process_pdf(shard_bytes)
+        return first_page, pages, time.perf_counter() - start
+
+    # Shards are split lazily and submitted in waves, so at most `max_workers` are in memory.
+    shard_results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = []
+        for first_page, shard_bytes in split_pdf(pdf, pages_per_shard):
+            in_flight.append(executor.submit(process_shard, first_page, shard_bytes))
+            if len(in_flight) == max_workers:
+                shard_results.extend(future.result() for future in in_flight)
+                in_flight = []
+        shard_results.extend(future.result() for future in in_flight)
+
+    pages = []
+    shard_timings = []
+    text_parts = []
+    offset = 0
+    for first_page, shard_pages, seconds in shard_results:
+        shard_timings.append({"first_page": first_page, "last_page": first_page + len(shard_pages) - 1, "seconds": seconds})
+        for index, page in enumerate(shard_pages):
+            pages.append({"page": first_page + index, "offset": offset, **page})
+            text_parts.append(page["text"])
+            offset += len(page["text"]) + len(PAGE_SEPARATOR)
+    return {"text": PAGE_SEPARATOR.join(text_parts), "pages": pages, "shards": shard_timings}
+
+
+def _layout_text(full_text, layout):
+    return "".join(
+        full_text[int(segment.start_index):int(segment.end_index)]
+        for segment in layout.text_anchor.text_segments
+    )
+
+
+def _bounding_box(layout):
+    vertices = layout.bounding_poly.normalized_vertices
+    if not vertices:
+        return None
+    xs = [vertex.x for vertex in vertices]
+    ys = [vertex.y for vertex in vertices]
+    return [min(xs), min(ys), max(xs), max(ys)]
@@ -0,0 +1,239 @@
+"""
+Resolves pitch decks to Cloud Storage objects, so they reach the agent as
+file-URI parts instead of base64 bytes inside the query.
+
+A deck that already lives in a bucket (a Firebase Storage download URL, a
+storage.googleapis.com URL or a gs:// URI) is used in place; its SHA-256 is
+computed once by streaming the object and kept in the object's metadata,
+tied to the object generation. Any other URL is streamed straight into the
+default bucket under UPLOADED_DECKS_PREFIX and hashed on the way. The deck is
+never held in memory as a whole.
+
+Uploaded copies are named after the source URL and remember its ETag or
+Last-Modified, so a URL that was uploaded before and is unchanged (checked
+with a HEAD request) is reused without transferring it again.
+`find_stored_deck` returns a deck only when its hash is already known this way,
+so callers can consult hash-keyed caches before paying for any transfer.
+"""
+import hashlib
+import os
+from urllib.parse import unquote, urlparse
+
+from deck_download import (
+    CHUNK_SIZE_BYTES,
+    CONNECT_TIMEOUT_SEC,
+    MAX_DECK_SIZE_BYTES,
+    READ_TIMEOUT_SEC,
+    DeckDownloadError,
+    DeckTooLargeError,
+    get_http_session,
+    stream_deck,
+)
+
+# --- Configuration ---
+UPLOADED_DECKS_PREFIX = os.environ.get("UPLOADED_DECKS_PREFIX", "pitch_decks/uploaded")
+# --------------------
+
+SHA256_METADATA_KEY = "sha256"
+SHA256_GENERATION_METADATA_KEY = "sha256Generation"
+SOURCE_VALIDATOR_METADATA_KEY = "sourceValidator"
+DEFAULT_DECK_MIME_TYPE = "application/pdf"
+
+
+class StoredDeck:
+    """A pitch deck stored in Cloud Storage, with its size and SHA-256."""
+
+    def __init__(self, gcs_uri, size, sha256, content_type):
+        self.gcs_uri = gcs_uri
+        self.size = size
+        self.sha256 = sha256
+        self.mime_type = content_type if content_type == DEFAULT_DECK_MIME_TYPE else DEFAULT_DECK_MIME_TYPE
+
+
+def parse_storage_url(url):
+    """Returns (bucket_name, object_name) if `url` points at a Cloud Storage object, else None."""
+    parsed = urlparse(url)
+    if parsed.scheme == "gs":
+        return parsed.netloc, parsed.path.lstrip("/")
+    if parsed.scheme not in ("http", "https"):
+        return None
+    path_parts = parsed.path.lstrip("/").split("/")
+    if parsed.netloc == "firebasestorage.googleapis.com":
+        # /v0/b/<bucket>/o/<url-encoded object name>
+        if len(path_parts) >= 5 and path_parts[0] == "v0" and path_parts[1] == "b" and path_parts[3] == "o":
+            return path_parts[2], unquote("/".join(path_parts[4:]))
+        return None
+    if parsed.netloc == "storage.googleapis.com" and len(path_parts) >= 2:
+        return path_parts[0], unquote("/".join(path_parts[1:]))
+    if parsed.netloc.endswith(".storage.googleapis.com"):
+        return parsed.netloc[: -len(".storage.googleapis.com")], unquote(parsed.path.lstrip("/"))
+    return None
+
+
+def find_stored_deck(url, default_bucket, max_bytes=MAX_DECK_SIZE_BYTES):
+    """
+    Returns a StoredDeck for `url` if its SHA-256 is known without reading or
+    transferring the deck (recorded in object metadata), else None.
+    """
+    blob = _source_blob(url, default_bucket)
+    if blob is None:
+        blob = _reusable_upload(url, default_bucket)
+    if blob is None or _recorded_sha256(blob) is None:
+        return None
+    return _deck_from_blob(blob, max_bytes)
+
+
+def resolve_deck(url, default_bucket, max_bytes=MAX_DECK_SIZE_BYTES):
+    """
+    Returns a StoredDeck for the deck at `url`, using the object in place when
+    it is in a readable bucket, reusing an unchanged earlier upload, and
+    streaming it into `default_bucket` otherwise.
+    """
+    blob = _source_blob(url, default_bucket) or _reusable_upload(url, default_bucket)
+    if blob is not None:
+        return _deck_from_blob(blob, max_bytes)
+    return _upload_deck(url, default_bucket, max_bytes)
+
+
+def _source_blob(url, default_bucket):
+    """Returns the readable Cloud Storage object `url` points at, or None."""
+    location = parse_storage_url(url)
+    if not location:
+        return None
+    bucket_name, object_name = location
+    bucket = default_bucket if bucket_name == default_bucket.name else default_bucket.client.bucket(bucket_name)
+    try:
+        return bucket.get_blob(object_name)
+    except Exception as e:
+        print(f"Cannot read deck object gs://{bucket_name}/{object_name} ({e}); downloading it instead.")
+        return None
+
+
+def _uploaded_object_name(url):
+    return f"{UPLOADED_DECKS_PREFIX}/{hashlib.sha256(url.encode('utf-8')).hexdigest()}.pdf"
+
+
+def _source_validator(headers):
+    """An ETag or Last-Modified (with length) identifying one version of a remote deck, or None."""
+    validator = headers.get("ETag") or headers.get("Last-Modified")
+    if not validator:
+        return None
+    return f"{validator};{headers.get('Content-Length', '')}"
+
+
+def _reusable_upload(url, bucket):
+    """Returns the earlier upload of `url` if the source still reports the same version, else None."""
+    if parse_storage_url(url):
+        return None
+    blob = bucket.get_blob(_uploaded_object_name(url))
+    if blob is None:
+        return None
+    recorded_validator = (blob.metadata or {}).get(SOURCE_VALIDATOR_METADATA_KEY)
+    if not recorded_validator:
+        return None
+    try:
+        response = get_http_session().head(url, allow_redirects=True, timeout=(CONNECT_TIMEOUT_SEC, READ_TIMEOUT_SEC))
+        response.raise_for_status()
+    except Exception as e:
+        print(f"Cannot check whether {url} changed ({e}); downloading it again.")
+        return None
+    return blob if _source_validator(response.headers) == recorded_validator else None
+
+
+def _recorded_sha256(blob):
+    metadata = blob.metadata or {}
+    if metadata.get(SHA256_GENERATION_METADATA_KEY) != str(blob.generation):
+        return None
+    return metadata.get(SHA256_METADATA_KEY)
+
+
+def _deck_from_blob(blob, max_bytes):
+    if blob.size is not None and blob.size > max_bytes:
+        raise DeckTooLargeError(f"Pitch deck is {blob.size} bytes, which exceeds the {max_bytes} byte limit.")
+    sha256 = _recorded_sha256(blob)
+    if not sha256:
+        digest = hashlib.sha256()
+        with blob.open("rb", chunk_size=CHUNK_SIZE_BYTES) as reader:
+            for chunk in iter(lambda: reader.read(CHUNK_SIZE_BYTES), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        _record_sha256(blob, sha256)
+    return StoredDeck(f"gs://{blob.bucket.name}/{blob.name}", blob.size, sha256, blob.content_type)
+
+
+class _ResumableDeckUpload:
+    """
+    Streams a deck into a Cloud Storage resumable upload session, sending whole
+    CHUNK_SIZE_BYTES pieces as they fill. Nothing becomes visible until
+    `finish()`; `abort()` cancels the session, so a failed transfer leaves no
+    partial object (and never replaces an existing one).
+    """
+
+    def __init__(self, blob, content_type):
+        self._session_url = blob.create_resumable_upload_session(content_type=content_type)
+        self._http = get_http_session()
+        self._buffer = bytearray()
+        self._offset = 0
+
+    def write(self, data):
+        self._buffer.extend(data)
+        if len(self._buffer) >= CHUNK_SIZE_BYTES:
+            # Non-final chunks must be multiples of 256 KiB.
+            length = len(self._buffer) // CHUNK_SIZE_BYTES * CHUNK_SIZE_BYTES
+            self._put(bytes(self._buffer[:length]), final=False)
+            del self._buffer[:length]
+
+    def finish(self):
+        self._put(bytes(self._buffer), final=True)
+        self._buffer.clear()
+
+    def abort(self):
+        try:
+            self._http.delete(self._session_url, timeout=(CONNECT_TIMEOUT_SEC, READ_TIMEOUT_SEC))
+        except Exception as e:
+            # An abandoned session expires on its own after a week without creating an object.
+            print(f"Could not cancel the deck upload session: {e}")
+
+    def _put(self, data, final):
+        total = str(self._offset + len(data)) if final else "*"
+        content_range = f"bytes {self._offset}-{self._offset + len(data) - 1}/{total}" if data else f"bytes */{total}"
+        response = self._http.put(
+            self._session_url,
+            data=data,
+            headers={"Content-Range": content_range},
+            allow_redirects=False,
+            timeout=(CONNECT_TIMEOUT_SEC, READ_TIMEOUT_SEC),
+        )
+        # 308 means the chunk was stored and the upload continues.
+        if (final and not response.ok) or (not final and response.status_code != 308):
+            raise DeckDownloadError(f"Storing the pitch deck failed with HTTP {response.status_code}: {response.text[:200]}")
+        self._offset += len(data)
+
+
+def _upload_deck(url, bucket, max_bytes):
+    blob = bucket.blob(_uploaded_object_name(url))
+    upload = _ResumableDeckUpload(blob, DEFAULT_DECK_MIME_TYPE)
+    try:
+        size, sha256, headers = stream_deck(url, upload.write, max_bytes)
+        upload.finish()
+    except Exception:
+        upload.abort()
+        raise
+    blob.reload()
+    _record_sha256(blob, sha256, {SOURCE_VALIDATOR_METADATA_KEY: _source_validator(headers)})
+    print(f"Stored pitch deck at gs://{bucket.name}/{blob.name}.")
+    return StoredDeck(f"gs://{bucket.name}/{blob.name}", size, sha256, DEFAULT_DECK_MIME_TYPE)
+
+
+def _record_sha256(blob, sha256, extra_metadata=None):
+    """Caches the deck hash in the object's metadata; a failure only means it is recomputed next time."""
+    try:
+        blob.metadata = {
+            **(blob.metadata or {}),
+            **{key: value for key, value in (extra_metadata or {}).items() if value},
+            SHA256_METADATA_KEY: sha256,
+            SHA256_GENERATION_METADATA_KEY: str(blob.generation),
+        }
+        blob.patch()
+    except Exception as e:
+        print(f"Could not record the SHA-256 of gs://{blob.bucket.name}/{blob.name}: {e}")
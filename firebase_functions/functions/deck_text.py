@@ -0,0 +1,124 @@
+"""
+Text-extraction stage for pitch decks.
+
+Each deck is turned once into page-indexed text plus layout blocks, cached as
+gzipped JSON in Cloud Storage under DECK_TEXT_PREFIX keyed by the deck's
+SHA-256 and the extractor backend, and fed to the agent as compact text
+instead of the PDF. Pages are read through `deck_ocr`, with Document AI OCR
+("documentai") in production and pypdf ("pypdf") for offline runs. Backends
+are imported lazily.
+
+Document AI reads decks straight from Cloud Storage. Only decks with more
+pages than it accepts online are downloaded, to a temporary file rather than
+memory and up to OCR_MAX_SPLIT_BYTES, and split into page shards.
+
+An extracted deck is a dict:
+
+    {"sha256": ..., "backend": ..., "page_count": N,
+     "pages": [{"page": 1, "text": "...", "blocks": [{"text": "...", "bbox": [x0, y0, x1, y1] | None}]}]}
+"""
+import gzip
+import json
+import os
+import tempfile
+
+from deck_ocr import DocumentAiOcrClient, PypdfOcrClient, ocr_pdf
+
+# --- Configuration ---
+DECK_TEXT_EXTRACTOR = os.environ.get("DECK_TEXT_EXTRACTOR", "documentai") # "documentai", "pypdf" or "none"
+DECK_TEXT_PREFIX = os.environ.get("DECK_TEXT_PREFIX", "deck_text")
+DOCUMENT_AI_PROJECT_ID = os.environ.get("DOCUMENT_AI_PROJECT_ID", os.environ.get("GCP_PROJECT", "valued-mediator-461216-k7"))
+DOCUMENT_AI_LOCATION = os.environ.get("DOCUMENT_AI_LOCATION", "us")
+DOCUMENT_AI_PROCESSOR_ID = os.environ.get("DOCUMENT_AI_PROCESSOR_ID", "6143611b8bf159c1")
+# Decks with less extracted text than this per page are treated as scanned and sent as PDFs.
+MIN_CHARS_PER_PAGE = int(os.environ.get("DECK_TEXT_MIN_CHARS_PER_PAGE", "20"))
+# Largest deck that is downloaded and split into shards locally.
+OCR_MAX_SPLIT_BYTES = int(os.environ.get("OCR_MAX_SPLIT_MB", "25")) * 1024 * 1024
+# --------------------
+
+
+class DeckTextTooLargeError(Exception):
+    """Raised when a deck must be split for OCR but exceeds OCR_MAX_SPLIT_BYTES."""
+
+
+class OcrExtractor:
+    """Extracts deck pages with a `deck_ocr` client, shard by shard."""
+
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+
+    def extract(self, deck, bucket):
+        if hasattr(self.client, "process_gcs"):
+            from google.api_core.exceptions import InvalidArgument
+
+            try:
+                pages = self.client.process_gcs(deck.gcs_uri, deck.mime_type)
+                return [{"page": number, **page} for number, page in enumerate(pages, start=1)]
+            except InvalidArgument as e:
+                if "page" not in str(e).lower():
+                    raise
+                print(f"Deck {deck.sha256} exceeds the processor's page limit; splitting it into shards ({e}).")
+
+        if deck.size is not None and deck.size > OCR_MAX_SPLIT_BYTES:
+            raise DeckTextTooLargeError(
+                f"Deck is {deck.size} bytes; decks over {OCR_MAX_SPLIT_BYTES} bytes are not split for OCR."
+            )
+        with tempfile.TemporaryFile() as pdf_file:
+            bucket.client.download_blob_to_file(deck.gcs_uri, pdf_file)
+            pdf_file.seek(0)
+            result = ocr_pdf(pdf_file, self.client)
+        for shard in result["shards"]:
+            print(f"OCR of pages {shard['first_page']}-{shard['last_page']} took {shard['seconds']:.2f}s ({self.name}).")
+        return [{"page": page["page"], "text": page["text"], "blocks": page["blocks"]} for page in result["pages"]]
+
+
+_extractors = {}
+
+
+def get_extractor(backend=DECK_TEXT_EXTRACTOR):
+    """Returns the process-wide extractor for `backend`, or None if extraction is disabled."""
+    if backend == "none":
+        return None
+    if backend not in _extractors:
+        if backend == "pypdf":
+            _extractors[backend] = OcrExtractor(backend, PypdfOcrClient())
+        elif backend == "documentai":
+            _extractors[backend] = OcrExtractor(
+                backend, DocumentAiOcrClient(DOCUMENT_AI_PROJECT_ID, DOCUMENT_AI_LOCATION, DOCUMENT_AI_PROCESSOR_ID)
+            )
+        else:
+            raise ValueError(f"Unsupported deck text extractor: {backend}")
+    return _extractors[backend]
+
+
+def get_deck_text(deck, bucket, extractor):
+    """Returns the extracted deck for a StoredDeck, from the Cloud Storage cache when possible."""
+    cache_blob = bucket.blob(f"{DECK_TEXT_PREFIX}/{deck.sha256}.{extractor.name}.json.gz")
+    if cache_blob.exists():
+        print(f"Deck text cache hit for deck {deck.sha256} ({extractor.name}).")
+        return json.loads(gzip.decompress(cache_blob.download_as_bytes()))
+
+    pages = extractor.extract(deck, bucket)
+    extracted = {"sha256": deck.sha256, "backend": extractor.name, "page_count": len(pages), "pages": pages}
+    cache_blob.upload_from_string(
+        gzip.compress(json.dumps(extracted).encode("utf-8")), content_type="application/gzip"
+    )
+    print(f"Extracted {len(pages)} pages of text from deck {deck.sha256} ({extractor.name}).")
+    return extracted
+
+
+def has_usable_text(extracted):
+    """False for decks without a meaningful text layer (e.g. scanned slides under pypdf)."""
+    page_count = max(extracted["page_count"], 1)
+    return sum(len(page["text"]) for page in extracted["pages"]) >= MIN_CHARS_PER_PAGE * page_count
+
+
+def format_deck_text(extracted):
+    """Renders an extracted deck as compact, page-indexed text for the agent."""
+    sections = [f"Pitch deck text ({extracted['page_count']} pages, extracted from the PDF):"]
+    for page in extracted["pages"]:
+        if page["text"]:
+            sections.append(f"--- Page {page['page']} ---\n{page['text']}")
+    return "\n\n".join(sections)
+
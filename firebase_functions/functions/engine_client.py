@@ -0,0 +1,57 @@
+"""
+Lightweight client for the deployed ADK app on Vertex AI Agent Engine.
+
+`agent_engines.get` imports the whole vertexai SDK and performs a remote GET of
+the reasoning engine to discover its operations before the first call. The
+operations this module needs (create_session, list_sessions, stream_query)
+are fixed by deploy.py, so the handle is built directly from the resource name
+on top of the generated aiplatform_v1 execution client, with no remote lookup.
+Return values match the dicts produced by the vertexai AgentEngine methods.
+"""
+import json
+
+
+class ReasoningEngineClient:
+    """Calls the registered ADK app operations of one reasoning engine."""
+
+    def __init__(self, resource_name, location):
+        from google.cloud import aiplatform_v1
+
+        self.resource_name = resource_name
+        self._client = aiplatform_v1.ReasoningEngineExecutionServiceClient(
+            client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"}
+        )
+
+    def _query(self, class_method, **kwargs):
+        from google.cloud.aiplatform_v1 import types
+
+        request = types.QueryReasoningEngineRequest(name=self.resource_name, class_method=class_method, input=kwargs)
+        response = self._client.query_reasoning_engine(request=request)
+        return types.QueryReasoningEngineResponse.to_dict(response).get("output")
+
+    def create_session(self, *, user_id, state=None):
+        return self._query("create_session", user_id=user_id, state=state or {})
+
+    def list_sessions(self, *, user_id):
+        return self._query("list_sessions", user_id=user_id)
+
+    def stream_query(self, *, user_id, session_id, message):
+        """Yields the agent's events as dicts, parsed from the newline-delimited JSON stream."""
+        from google.cloud.aiplatform_v1 import types
+
+        request = types.StreamQueryReasoningEngineRequest(
+            name=self.resource_name,
+            class_method="stream_query",
+            input={"user_id": user_id, "session_id": session_id, "message": message},
+        )
+        pending = b""
+        for chunk in self._client.stream_query_reasoning_engine(request=request):
+            pending += chunk.data
+            # A JSON line (or a multi-byte character) may be split across chunks; only parse complete lines.
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if pending.strip():
+            yield json.loads(pending)
+
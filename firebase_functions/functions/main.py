@@ -1,21 +1,27 @@
+# Heavy client libraries (BigQuery, Firestore, Storage, reportlab, Vertex AI) are
+# imported inside the functions that use them, so each endpoint's cold start only
+# pays for what it touches. Client handles are created once per instance.
 from firebase_functions import https_fn, firestore_fn
 from firebase_functions.options import set_global_options, MemoryOption
-from firebase_admin import initialize_app, firestore, storage
-from google.cloud import bigquery
-from google.cloud.exceptions import NotFound
+from firebase_admin import initialize_app
 import uuid
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 import io
+import gzip
+import threading
 
 import os
-import vertexai
-from vertexai import agent_engines, generative_models
-from vertexai.generative_models import Part, Content
 import json
-import requests
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+from deck_download import DeckTooLargeError
+from deck_storage import find_stored_deck, resolve_deck
+from deck_text import format_deck_text, get_deck_text, get_extractor, has_usable_text
+from analysis_cache import analysis_cache_key, lookup_cached_analysis, store_cached_analysis
+from analysis_table import ANALYSIS_TABLE_DEFAULTS, ANALYSIS_TABLE_FIELDS, analysis_schema_field
+from dashboard_query import DashboardQueryError, fetch_dashboard_page, parse_dashboard_params
+from dashboard_cache import DashboardResponseCache, bump_dashboard_version, dashboard_etag, get_dashboard_version
+from engine_client import ReasoningEngineClient
+from bigquery_writer import AnalysisRowWriter
 
 # --- Configuration ---
 PROJECT_ID = os.environ.get("GCP_PROJECT", "valued-mediator-461216-k7")
@@ -29,6 +35,24 @@ BIGQUERY_TABLE_ID = os.environ.get("BIGQUERY_TABLE_ID", "pitch_deck_analysis") #
 
 # Firestore Configuration
 SESSIONS_COLLECTION = "adk_sessions"
+# App name the deployed AdkApp stores on its sessions (vertexai's AdkApp default).
+SESSION_APP_NAME = os.environ.get("SESSION_APP_NAME", "default-app-name")
+ANALYSIS_JOBS_COLLECTION = "analysis_jobs"
+
+# Analysis job lifecycle
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_SUCCEEDED = "succeeded"
+JOB_STATUS_FAILED = "failed"
+ANALYSIS_JOB_TIMEOUT_SEC = 540
+# A claim is a lease: a job still "running" after it expires was abandoned by a
+# worker that crashed or hit the timeout, and may be reclaimed or marked failed.
+ANALYSIS_JOB_LEASE_SEC = int(os.environ.get("ANALYSIS_JOB_LEASE_SEC", ANALYSIS_JOB_TIMEOUT_SEC + 60))
+
+# Responses smaller than this are not worth compressing.
+GZIP_MIN_BYTES = 1024
+
+DEFAULT_ANALYSIS_PROMPT = "Analyze this pitch deck and return a comprehensive investment memo based on your defined output schema."
 # --------------------
 
 # --- Initialization ---
@@ -37,28 +61,85 @@ set_global_options(max_instances=10, memory=MemoryOption.GB_1, timeout_sec=660)
 
 _remote_app = None
 _db = None
+_bigquery_client = None
+_storage_bucket = None
+_analysis_row_writer = None
+_clients_lock = threading.Lock()
 _bigquery_table_checked = False
+_dashboard_cache = DashboardResponseCache()
 
 def get_remote_app():
     global _remote_app
     if _remote_app is None:
-        print("Initializing Vertex AI client...")
-        engine_resource_name = f"projects/{PROJECT_ID}/locations/{LOCATION}/reasoningEngines/{REASONING_ENGINE_ID}"
-        _remote_app = agent_engines.get(engine_resource_name)
-        print("Vertex AI client initialized.")
+        with _clients_lock:
+            if _remote_app is None:
+                print("Initializing Vertex AI client...")
+                engine_resource_name = f"projects/{PROJECT_ID}/locations/{LOCATION}/reasoningEngines/{REASONING_ENGINE_ID}"
+                _remote_app = ReasoningEngineClient(engine_resource_name, LOCATION)
+                print("Vertex AI client initialized.")
     return _remote_app
 
 def get_firestore_client():
     global _db
     if _db is None:
-        print("Initializing Firestore client...")
-        _db = firestore.Client(project=PROJECT_ID, database=DATABASE)
-        print("Firestore client initialized.")
+        with _clients_lock:
+            if _db is None:
+                from firebase_admin import firestore
+                print("Initializing Firestore client...")
+                _db = firestore.Client(project=PROJECT_ID, database=DATABASE)
+                print("Firestore client initialized.")
     return _db
 
+def get_bigquery_client():
+    global _bigquery_client
+    if _bigquery_client is None:
+        with _clients_lock:
+            if _bigquery_client is None:
+                from google.cloud import bigquery
+                print("Initializing BigQuery client...")
+                _bigquery_client = bigquery.Client(project=PROJECT_ID)
+                print("BigQuery client initialized.")
+    return _bigquery_client
+
+def get_storage_bucket():
+    global _storage_bucket
+    if _storage_bucket is None:
+        with _clients_lock:
+            if _storage_bucket is None:
+                from firebase_admin import storage
+                _storage_bucket = storage.bucket()
+    return _storage_bucket
+
+def get_analysis_row_writer():
+    global _analysis_row_writer
+    if _analysis_row_writer is None:
+        with _clients_lock:
+            if _analysis_row_writer is None:
+                table_ref_str = f"{PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}"
+                _analysis_row_writer = AnalysisRowWriter(
+                    get_bigquery_client(),
+                    table_ref_str,
+                    # New rows change the dashboard, so invalidate cached pages once they land.
+                    on_flush=lambda rows: bump_dashboard_version(get_firestore_client()),
+                )
+    return _analysis_row_writer
+
+def text_part(text):
+    return {"text": text}
+
+def file_part(file_uri, mime_type):
+    return {"file_data": {"file_uri": file_uri, "mime_type": mime_type}}
+
+def user_message(*parts):
+    """Builds a user message dict in the shape vertexai's Content.to_dict() produces."""
+    return {"role": "user", "parts": list(parts)}
+
 def setup_bigquery_table():
     """Creates the BigQuery dataset and table with the correct, comprehensive schema."""
-    client = bigquery.Client(project=PROJECT_ID)
+    from google.cloud import bigquery
+    from google.cloud.exceptions import NotFound
+
+    client = get_bigquery_client()
     dataset_ref_str = f"{PROJECT_ID}.{BIGQUERY_DATASET_ID}"
     table_ref_str = f"{dataset_ref_str}.{BIGQUERY_TABLE_ID}"
 
@@ -71,45 +152,40 @@ def setup_bigquery_table():
         client.create_dataset(dataset, timeout=30)
 
     try:
-        client.get_table(table_ref_str)
+        table = client.get_table(table_ref_str)
         print(f"BigQuery Table '{BIGQUERY_TABLE_ID}' already exists.")
+        # Add any columns introduced since the table was created (additive schema change).
+        existing_columns = {field.name for field in table.schema}
+        missing_fields = [bigquery.SchemaField(name, field_type) for name, field_type in ANALYSIS_TABLE_FIELDS if name not in existing_columns]
+        if missing_fields:
+            table.schema = list(table.schema) + missing_fields
+            client.update_table(table, ["schema"])
+            print(f"Added columns {[field.name for field in missing_fields]} to '{BIGQUERY_TABLE_ID}'.")
+        # Defaults cannot be set while adding a column, so they are applied to the existing column.
+        defaults = {field.name: field.default_value_expression for field in client.get_table(table_ref_str).schema}
+        for name, expression in ANALYSIS_TABLE_DEFAULTS.items():
+            if defaults.get(name) != expression:
+                client.query(f"ALTER TABLE `{table_ref_str}` ALTER COLUMN {name} SET DEFAULT {expression}").result()
+                print(f"Set default of '{name}' to {expression}.")
     except NotFound:
         print(f"BigQuery Table '{BIGQUERY_TABLE_ID}' not found, creating it...")
-        schema = [
-            bigquery.SchemaField("analysis_id", "STRING"),
-            bigquery.SchemaField("user_id", "STRING"), # Added user_id
-            bigquery.SchemaField("generated_pdf_url", "STRING"),
-            bigquery.SchemaField("company_name", "STRING"),
-            bigquery.SchemaField("tech_field", "STRING"),
-            bigquery.SchemaField("company_website", "STRING"),
-            bigquery.SchemaField("date", "STRING"),
-            bigquery.SchemaField("author", "STRING"),
-            bigquery.SchemaField("introduction", "STRING"), # from summary
-            bigquery.SchemaField("problem", "STRING"), # from problem_definition
-            bigquery.SchemaField("product_description", "STRING"), # from solution_description
-            bigquery.SchemaField("business_model", "STRING"), # Added business_model
-            bigquery.SchemaField("market_competition", "STRING"), # from competitive_advantage
-            bigquery.SchemaField("opportunity", "STRING"), # from market_opportunity.analysis
-            bigquery.SchemaField("market_size_tam", "STRING"),
-            bigquery.SchemaField("market_size_som", "STRING"),
-            bigquery.SchemaField("market_growth_rate", "STRING"),
-            bigquery.SchemaField("impact_metrics", "STRING"), # from traction.metrics
-            bigquery.SchemaField("customer_feedback", "STRING"),
-            bigquery.SchemaField("founders", "STRING"),
-            bigquery.SchemaField("team_strengths", "STRING"), # from team_analysis.background_summary
-            bigquery.SchemaField("key_strengths", "STRING"), # from team_analysis.strengths
-            bigquery.SchemaField("round_size", "STRING"), # from financials.funding_ask_inr
-            bigquery.SchemaField("use_of_funds", "STRING"),
-            bigquery.SchemaField("growth_trajectory", "STRING"), # from financials.projections_summary
-            bigquery.SchemaField("recommendation", "STRING"),
-            bigquery.SchemaField("justification", "STRING"),
-            bigquery.SchemaField("technical_risk", "STRING"), # from investment_recommendation.risks
-        ]
+        schema = [analysis_schema_field(name, field_type) for name, field_type in ANALYSIS_TABLE_FIELDS]
         table = bigquery.Table(table_ref_str, schema=schema)
         client.create_table(table)
         print(f"Table '{BIGQUERY_TABLE_ID}' created successfully.")
 
+def ensure_bigquery_table():
+    """Runs setup_bigquery_table once per instance."""
+    global _bigquery_table_checked
+    if not _bigquery_table_checked:
+        setup_bigquery_table()
+        _bigquery_table_checked = True
+
 def generate_pdf_from_json(json_data):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     styles = getSampleStyleSheet()
@@ -134,6 +210,119 @@ def generate_pdf_from_json(json_data):
     buffer.close()
     return pdf_bytes
 
+def find_latest_session(user_id):
+    """
+    Returns (session_id, state) for the user's most recently updated session of
+    the agent app, or None. A single indexed, projected Firestore read regardless
+    of how many sessions the user has; sessions of other apps are never resumed.
+    """
+    from firebase_admin import firestore
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    db = get_firestore_client()
+    query = (
+        db.collection(SESSIONS_COLLECTION)
+        .where(filter=FieldFilter("app_name", "==", SESSION_APP_NAME))
+        .where(filter=FieldFilter("user_id", "==", user_id))
+        .order_by("updateTime", direction=firestore.Query.DESCENDING)
+        .select(["state"])
+        .limit(1)
+    )
+    for doc in query.stream():
+        return doc.id, doc.to_dict().get("state", {})
+    return None
+
+def json_response(req, response_data, headers):
+    """Builds a JSON response, gzip-compressed when the client accepts it."""
+    if "gzip" in req.headers.get("Accept-Encoding", "") and len(response_data) > GZIP_MIN_BYTES:
+        headers = {**headers, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        return https_fn.Response(gzip.compress(response_data.encode("utf-8")), mimetype="application/json", headers=headers)
+    return https_fn.Response(response_data, mimetype="application/json", headers=headers)
+
+def create_analysis_job(analysis_request):
+    """Writes a queued analysis job document and returns its ID."""
+    from firebase_admin import firestore
+
+    db = get_firestore_client()
+    job_ref = db.collection(ANALYSIS_JOBS_COLLECTION).document()
+    job_ref.set({
+        "status": JOB_STATUS_QUEUED,
+        "stage": None,
+        "stages": {},
+        "request": analysis_request,
+        "result": None,
+        "error": None,
+        "createTime": firestore.SERVER_TIMESTAMP,
+        "updateTime": firestore.SERVER_TIMESTAMP,
+    })
+    return job_ref.id
+
+def analysis_job_lease_expired(job, now=None):
+    """True if a running job's lease has passed. Jobs claimed without a lease fall back to their last update."""
+    if job.get("status") != JOB_STATUS_RUNNING:
+        return False
+    lease_expires_at = job.get("leaseExpiresAt")
+    if lease_expires_at is None:
+        if job.get("updateTime") is None:
+            return False
+        lease_expires_at = job["updateTime"] + timedelta(seconds=ANALYSIS_JOB_LEASE_SEC)
+    return lease_expires_at <= (now or datetime.now(timezone.utc))
+
+def claim_analysis_job(transaction, job_ref):
+    """
+    Atomically moves a queued job, or a running job whose lease has expired, to
+    running under a fresh lease. Returns the job data, or None if it is not claimable.
+    """
+    from firebase_admin import firestore
+
+    return firestore.transactional(_claim_analysis_job)(transaction, job_ref)
+
+def _claim_analysis_job(transaction, job_ref):
+    from firebase_admin import firestore
+
+    job_doc = job_ref.get(transaction=transaction)
+    if not job_doc.exists:
+        return None
+    job = job_doc.to_dict()
+    if job.get("status") != JOB_STATUS_QUEUED and not analysis_job_lease_expired(job):
+        return None
+    now = datetime.now(timezone.utc)
+    transaction.update(job_ref, {
+        "status": JOB_STATUS_RUNNING,
+        "claimTime": now,
+        "leaseExpiresAt": now + timedelta(seconds=ANALYSIS_JOB_LEASE_SEC),
+        "attempts": firestore.Increment(1),
+        "updateTime": firestore.SERVER_TIMESTAMP,
+    })
+    return job
+
+def fail_expired_analysis_job(transaction, job_ref):
+    """
+    Marks a running job whose lease has expired as failed. Returns the job data
+    as it stands afterwards, or None if the job does not exist.
+    """
+    from firebase_admin import firestore
+
+    return firestore.transactional(_fail_expired_analysis_job)(transaction, job_ref)
+
+def _fail_expired_analysis_job(transaction, job_ref):
+    from firebase_admin import firestore
+
+    job_doc = job_ref.get(transaction=transaction)
+    if not job_doc.exists:
+        return None
+    job = job_doc.to_dict()
+    if not analysis_job_lease_expired(job):
+        return job
+    update = {
+        "status": JOB_STATUS_FAILED,
+        "error": f"Analysis did not finish within its {ANALYSIS_JOB_LEASE_SEC}s lease; the worker crashed or timed out.",
+        "updateTime": firestore.SERVER_TIMESTAMP,
+    }
+    transaction.update(job_ref, update)
+    job.update(update, updateTime=datetime.now(timezone.utc))
+    return job
+
 # --------------------
 
 @https_fn.on_request()
@@ -162,21 +351,17 @@ def create_session(req: https_fn.Request) -> https_fn.Response:
         
         user_id = request_json['user_id']
         initial_state = request_json.get('state', {})
-        remote_app = get_remote_app()
 
         print(f"Checking for existing sessions for user '{user_id}'...")
-        list_sessions_response = remote_app.list_sessions(user_id=user_id)
-        
         session_id = None
         session_state = {}
 
-        if list_sessions_response and list_sessions_response.get('sessions'):
-            remote_session = list_sessions_response['sessions'][0]
-            session_id = remote_session.get('id')
-            session_state = remote_session.get('state', {})
+        if latest_session := find_latest_session(user_id):
+            session_id, session_state = latest_session
             print(f"Found existing session with ID: {session_id}")
         else:
             print(f"No existing sessions for user '{user_id}'. Creating a new one.")
+            remote_app = get_remote_app()
             new_session = remote_app.create_session(user_id=user_id, state=initial_state)
             session_id = new_session.get('id')
             session_state = new_session.get('state', {})
@@ -192,10 +377,189 @@ def create_session(req: https_fn.Request) -> https_fn.Response:
         print(f"An error occurred in create_session: {e}")
         return https_fn.Response(f"An internal error occurred: {e}", status=500, headers=headers)
 
+def deck_content_part(deck):
+    """
+    Returns the message part carrying the deck: its cached, page-indexed text when
+    extraction is enabled and the deck has a text layer, otherwise the PDF itself.
+    """
+    try:
+        extractor = get_extractor()
+        if extractor:
+            extracted = get_deck_text(deck, get_storage_bucket(), extractor)
+            if has_usable_text(extracted):
+                return text_part(format_deck_text(extracted))
+            print(f"Deck {deck.sha256} has too little extractable text; sending the PDF instead.")
+    except Exception as e:
+        print(f"Deck text extraction failed, sending the PDF instead: {e}")
+    return file_part(deck.gcs_uri, deck.mime_type)
+
+def update_session_analysis_state(session_id, result, analysis_request):
+    """Links a completed analysis to the session state so follow-up agents can find it."""
+    db = get_firestore_client()
+    session_doc_ref = db.collection(SESSIONS_COLLECTION).document(session_id)
+    session_doc_ref.update({
+        "state.analysis_id": result["analysis_id"],
+        "state.generated_pdf_url": result["generated_pdf_url"],
+        "state.tech_field": analysis_request['tech_field'],
+        "state.company_website": analysis_request.get('company_website'),
+        "state.short_description": analysis_request['short_description'],
+        "state.pitch_deck_url": analysis_request['pdf_url']
+    })
+
+def run_investment_analysis(analysis_request, report_stage=None):
+    """
+    Runs the full pitch deck analysis pipeline: agent query, PDF rendering,
+    BigQuery insert and session state update. Returns the stored result.
+    `report_stage` is called with each stage name as the pipeline progresses.
+    """
+    def enter_stage(stage):
+        if report_stage:
+            report_stage(stage)
+
+    ensure_bigquery_table()
+
+    user_id = analysis_request['user_id']
+    session_id = analysis_request['session_id']
+    pdf_url = analysis_request['pdf_url']
+    tech_field = analysis_request['tech_field']
+    company_website = analysis_request.get('company_website')
+    prompt = analysis_request.get('prompt') or DEFAULT_ANALYSIS_PROMPT
+    force_refresh = analysis_request.get('force_refresh', False)
+
+    enter_stage("downloading_deck")
+    db = get_firestore_client()
+    # The cache is checked before any transfer when the deck's hash is already recorded in
+    # Cloud Storage metadata, and again once an unknown deck has been hashed.
+    deck = find_stored_deck(pdf_url, get_storage_bucket())
+    if deck is None:
+        # The deck is passed by Cloud Storage URI; it is only streamed if it is not in a bucket yet.
+        deck = resolve_deck(pdf_url, get_storage_bucket())
+    cache_key = analysis_cache_key(deck.sha256, prompt, tech_field, user_id)
+    if not force_refresh:
+        cached_result = lookup_cached_analysis(db, cache_key)
+        if cached_result:
+            print(f"Analysis cache hit for deck {deck.sha256}: reusing analysis '{cached_result['analysis_id']}'.")
+            enter_stage("updating_session")
+            update_session_analysis_state(session_id, cached_result, analysis_request)
+            return {**cached_result, "cached": True}
+
+    enter_stage("extracting_text")
+    final_message = user_message(deck_content_part(deck), text_part(prompt))
+    deck_sha256 = deck.sha256
+
+    analysis_id = str(uuid.uuid4())
+    remote_app = get_remote_app()
+
+    enter_stage("running_agent")
+    print(f"Streaming query to manager_agent for session '{session_id}'...")
+    response_chunks = []
+    for event in remote_app.stream_query(user_id=user_id, session_id=session_id, message=final_message):
+        if event.get('content') and event.get('content').get('parts'):
+            for part in event['content']['parts']:
+                if part.get('text'):
+                    # Store each response chunk separately
+                    response_chunks.append(part['text'])
+
+    if not response_chunks:
+        raise Exception("Agent returned no response.")
+
+    # The final report is the last item in the list
+    full_response_text = response_chunks[-1]
+
+    print("--- Agent's Final Response Chunk ---")
+    print(full_response_text)
+    print("------------------------------------")
+
+    if full_response_text.strip().startswith("```json"):
+        full_response_text = full_response_text[full_response_text.find('{'):full_response_text.rfind('}')+1]
+
+    try:
+        analysis_data = json.loads(full_response_text)
+    except json.JSONDecodeError as e:
+        raise Exception(f"Failed to decode the final JSON chunk from the agent. Error: {e}. Raw final chunk: '{full_response_text}'")
+
+    enter_stage("rendering_pdf")
+    pdf_bytes = generate_pdf_from_json(analysis_data)
+    bucket = get_storage_bucket()
+    blob = bucket.blob(f"investment_memos/{analysis_id}.pdf")
+    blob.upload_from_string(pdf_bytes, content_type='application/pdf')
+    blob.make_public()
+    generated_pdf_url = blob.public_url
+
+    enter_stage("storing_analysis")
+    # The agent sometimes returns the memo directly, and sometimes nested under 'investment_memo'.
+    # This handles both cases by defaulting to the entire 'analysis_data' object if the key is missing.
+    memo_data = analysis_data.get("investment_memo", analysis_data)
+    if not memo_data:
+        raise Exception("Agent response was empty or did not contain the expected investment memo data.")
+
+    # --- Map Agent Response to BigQuery Schema ---
+    row_to_insert = {
+        "analysis_id": analysis_id,
+        "user_id": user_id, # Add user_id to insertion
+        "generated_pdf_url": generated_pdf_url,
+        "company_name": memo_data.get("company_name"),
+        "tech_field": tech_field,
+        "company_website": company_website,
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "author": "VentureAI Agent",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "introduction": memo_data.get("summary"),
+        "problem": memo_data.get("problem_definition"),
+        "product_description": memo_data.get("solution_description"),
+        "business_model": memo_data.get("business_model"), # Add business_model
+        "market_competition": memo_data.get("competitive_advantage"),
+    }
+
+    # Flatten nested objects
+    if team_analysis := memo_data.get("team_analysis"):
+        row_to_insert["founders"] = team_analysis.get("founders")
+        row_to_insert["team_strengths"] = team_analysis.get("background_summary")
+        row_to_insert["key_strengths"] = team_analysis.get("strengths")
+
+    if market_opportunity := memo_data.get("market_opportunity"):
+        row_to_insert["market_size_tam"] = market_opportunity.get("market_size_tam")
+        row_to_insert["market_size_som"] = market_opportunity.get("market_size_sam")
+        row_to_insert["market_growth_rate"] = market_opportunity.get("market_growth_rate")
+        row_to_insert["opportunity"] = market_opportunity.get("analysis")
+
+    if traction := memo_data.get("traction"):
+        row_to_insert["impact_metrics"] = traction.get("metrics")
+        row_to_insert["customer_feedback"] = traction.get("customer_feedback")
+
+    if financials := memo_data.get("financials"):
+        row_to_insert["round_size"] = str(financials.get("funding_ask_inr"))
+        row_to_insert["use_of_funds"] = financials.get("use_of_funds")
+        row_to_insert["growth_trajectory"] = financials.get("projections_summary")
+
+    if investment_recommendation := memo_data.get("investment_recommendation"):
+        row_to_insert["recommendation"] = investment_recommendation.get("recommendation")
+        row_to_insert["justification"] = investment_recommendation.get("justification")
+        row_to_insert["technical_risk"] = investment_recommendation.get("risks")
+
+    # Convert list/dict fields to JSON strings for BigQuery
+    for key, value in row_to_insert.items():
+        if isinstance(value, (list, dict)):
+            row_to_insert[key] = json.dumps(value)
+
+    # Written before the analysis ID is cached or linked to the session, so neither can point at a missing row.
+    get_analysis_row_writer().write(row_to_insert)
+    print("New row written to BigQuery.")
+
+    result = {"analysis_id": analysis_id, "generated_pdf_url": generated_pdf_url}
+    store_cached_analysis(db, cache_key, result, deck_sha256, tech_field, user_id)
+
+    enter_stage("updating_session")
+    update_session_analysis_state(session_id, result, analysis_request)
+
+    return {**result, "cached": False}
+
 @https_fn.on_request(timeout_sec=540)
 def generate_investment_analysis(req: https_fn.Request) -> https_fn.Response:
     """
     HTTP Cloud Function to generate investment analysis, now with CORS support.
+    With "async": true in the body, the request is queued as an analysis job and
+    a 202 with the job id is returned immediately; poll `get_analysis_status`.
     """
     # Set CORS headers for the preflight OPTIONS request.
     if req.method == "OPTIONS":
@@ -211,149 +575,133 @@ def generate_investment_analysis(req: https_fn.Request) -> https_fn.Response:
     headers = {
         "Access-Control-Allow-Origin": "*",
     }
-    global _bigquery_table_checked
     try:
-        if not _bigquery_table_checked:
-            setup_bigquery_table()
-            _bigquery_table_checked = True
-
         request_json = req.get_json(silent=True)
         required_fields = ['user_id', 'session_id', 'pdf_url', 'tech_field', 'short_description']
         if not request_json or not all(field in request_json for field in required_fields):
                 return https_fn.Response(f"Error: Please provide {', '.join(required_fields)}.", status=400, headers=headers)
 
-        user_id = request_json['user_id']
-        session_id = request_json['session_id']
-        pdf_url = request_json['pdf_url']
-        tech_field = request_json['tech_field']
-        company_website = request_json.get('company_website')
-        short_description = request_json['short_description']
-        prompt = request_json.get('prompt', "Analyze this pitch deck and return a comprehensive investment memo based on your defined output schema.")
+        analysis_request = {
+            "user_id": request_json['user_id'],
+            "session_id": request_json['session_id'],
+            "pdf_url": request_json['pdf_url'],
+            "tech_field": request_json['tech_field'],
+            "company_website": request_json.get('company_website'),
+            "short_description": request_json['short_description'],
+            "prompt": request_json.get('prompt', DEFAULT_ANALYSIS_PROMPT),
+            "force_refresh": bool(request_json.get('force_refresh', False)),
+        }
 
-        analysis_id = str(uuid.uuid4())
-        remote_app = get_remote_app()
-        
-        response = requests.get(pdf_url)
-        response.raise_for_status()
-        pdf_data = response.content
-        
-        message_parts = [Part.from_data(data=pdf_data, mime_type="application/pdf"), Part.from_text(prompt)]
-        final_message = Content(parts=message_parts, role="user").to_dict()
+        if request_json.get('async'):
+            job_id = create_analysis_job(analysis_request)
+            print(f"Queued analysis job '{job_id}' for session '{analysis_request['session_id']}'.")
+            response_data = json.dumps({"message": "Analysis queued", "job_id": job_id, "status": JOB_STATUS_QUEUED})
+            return https_fn.Response(response_data, status=202, mimetype="application/json", headers=headers)
 
-        print(f"Streaming query to manager_agent for session '{session_id}'...")
-        response_chunks = []
-        for event in remote_app.stream_query(user_id=user_id, session_id=session_id, message=final_message):
-            if event.get('content') and event.get('content').get('parts'):
-                for part in event['content']['parts']:
-                    if part.get('text'):
-                        # Store each response chunk separately
-                        response_chunks.append(part['text'])
+        result = run_investment_analysis(analysis_request)
 
-        if not response_chunks:
-            return https_fn.Response("Agent returned no response.", status=500, headers=headers)
+        response_data = json.dumps({"message": "Analysis complete", **result})
+        return https_fn.Response(response_data, mimetype="application/json", headers=headers)
 
-        # The final report is the last item in the list
-        full_response_text = response_chunks[-1]
-        
-        print("--- Agent's Final Response Chunk ---")
-        print(full_response_text)
-        print("------------------------------------")
+    except DeckTooLargeError as e:
+        return https_fn.Response(f"Error: {e}", status=413, headers=headers)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return https_fn.Response(f"An internal error occurred: {e}", status=500, headers=headers)
 
-        if full_response_text.strip().startswith("```json"):
-            full_response_text = full_response_text[full_response_text.find('{'):full_response_text.rfind('}')+1]
+@firestore_fn.on_document_created(document=f"{ANALYSIS_JOBS_COLLECTION}/{{job_id}}", database=DATABASE, timeout_sec=ANALYSIS_JOB_TIMEOUT_SEC)
+def process_analysis_job(event: firestore_fn.Event[firestore_fn.DocumentSnapshot | None]) -> None:
+    """
+    Worker for queued analysis jobs. Runs the analysis pipeline for a newly
+    created job document and records stage progress and the outcome on it.
+    """
+    from firebase_admin import firestore
+
+    job_id = event.params["job_id"]
+    db = get_firestore_client()
+    job_ref = db.collection(ANALYSIS_JOBS_COLLECTION).document(job_id)
+
+    # Firestore triggers are delivered at least once, so a redelivery may only claim
+    # the job if it is still queued or its previous worker's lease has expired.
+    job = claim_analysis_job(db.transaction(), job_ref)
+    if job is None:
+        print(f"Analysis job '{job_id}' is already claimed or finished, skipping.")
+        return
+
+    def report_stage(stage):
+        print(f"Analysis job '{job_id}' entering stage '{stage}'.")
+        job_ref.update({
+            "stage": stage,
+            f"stages.{stage}": firestore.SERVER_TIMESTAMP,
+            "updateTime": firestore.SERVER_TIMESTAMP,
+        })
 
-        try:
-            analysis_data = json.loads(full_response_text)
-        except json.JSONDecodeError as e:
-            error_message = f"Failed to decode the final JSON chunk from the agent. Error: {e}. Raw final chunk: '{full_response_text}'"
-            return https_fn.Response(error_message, status=500, headers=headers)
-
-        pdf_bytes = generate_pdf_from_json(analysis_data)
-        bucket = storage.bucket()
-        blob = bucket.blob(f"investment_memos/{analysis_id}.pdf")
-        blob.upload_from_string(pdf_bytes, content_type='application/pdf')
-        blob.make_public()
-        generated_pdf_url = blob.public_url
-
-        bigquery_client = bigquery.Client(project=PROJECT_ID)
-        table_ref_str = f"{PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}"
-
-        # The agent sometimes returns the memo directly, and sometimes nested under 'investment_memo'.
-        # This handles both cases by defaulting to the entire 'analysis_data' object if the key is missing.
-        memo_data = analysis_data.get("investment_memo", analysis_data)
-        if not memo_data:
-            raise Exception("Agent response was empty or did not contain the expected investment memo data.")
-
-        # --- Map Agent Response to BigQuery Schema ---
-        row_to_insert = {
-            "analysis_id": analysis_id,
-            "user_id": user_id, # Add user_id to insertion
-            "generated_pdf_url": generated_pdf_url,
-            "company_name": memo_data.get("company_name"),
-            "tech_field": tech_field,
-            "company_website": company_website,
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "author": "VentureAI Agent",
-            "introduction": memo_data.get("summary"),
-            "problem": memo_data.get("problem_definition"),
-            "product_description": memo_data.get("solution_description"),
-            "business_model": memo_data.get("business_model"), # Add business_model
-            "market_competition": memo_data.get("competitive_advantage"),
+    try:
+        result = run_investment_analysis(job["request"], report_stage=report_stage)
+        job_ref.update({
+            "status": JOB_STATUS_SUCCEEDED,
+            "stage": None,
+            "result": result,
+            "updateTime": firestore.SERVER_TIMESTAMP,
+        })
+        print(f"Analysis job '{job_id}' succeeded with analysis_id '{result['analysis_id']}'.")
+    except Exception as e:
+        print(f"Analysis job '{job_id}' failed: {e}")
+        job_ref.update({
+            "status": JOB_STATUS_FAILED,
+            "error": str(e),
+            "updateTime": firestore.SERVER_TIMESTAMP,
+        })
+
+@https_fn.on_request()
+def get_analysis_status(req: https_fn.Request) -> https_fn.Response:
+    """
+    HTTP Cloud Function to poll the status of a queued analysis job.
+    A running job whose lease has expired is marked failed before it is reported.
+    """
+    # Set CORS headers for the preflight OPTIONS request.
+    if req.method == "OPTIONS":
+        headers = {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type, Authorization",
+            "Access-Control-Max-Age": "3600",
         }
+        return https_fn.Response("", headers=headers, status=204)
 
-        # Flatten nested objects
-        if team_analysis := memo_data.get("team_analysis"):
-            row_to_insert["founders"] = team_analysis.get("founders")
-            row_to_insert["team_strengths"] = team_analysis.get("background_summary")
-            row_to_insert["key_strengths"] = team_analysis.get("strengths")
-
-        if market_opportunity := memo_data.get("market_opportunity"):
-            row_to_insert["market_size_tam"] = market_opportunity.get("market_size_tam")
-            row_to_insert["market_size_som"] = market_opportunity.get("market_size_sam")
-            row_to_insert["market_growth_rate"] = market_opportunity.get("market_growth_rate")
-            row_to_insert["opportunity"] = market_opportunity.get("analysis")
-
-        if traction := memo_data.get("traction"):
-            row_to_insert["impact_metrics"] = traction.get("metrics")
-            row_to_insert["customer_feedback"] = traction.get("customer_feedback")
-
-        if financials := memo_data.get("financials"):
-            row_to_insert["round_size"] = str(financials.get("funding_ask_inr"))
-            row_to_insert["use_of_funds"] = financials.get("use_of_funds")
-            row_to_insert["growth_trajectory"] = financials.get("projections_summary")
-
-        if investment_recommendation := memo_data.get("investment_recommendation"):
-            row_to_insert["recommendation"] = investment_recommendation.get("recommendation")
-            row_to_insert["justification"] = investment_recommendation.get("justification")
-            row_to_insert["technical_risk"] = investment_recommendation.get("risks")
-
-        # Convert list/dict fields to JSON strings for BigQuery
-        for key, value in row_to_insert.items():
-            if isinstance(value, (list, dict)):
-                row_to_insert[key] = json.dumps(value)
-
-        errors = bigquery_client.insert_rows_json(table_ref_str, [row_to_insert])
-        if errors:
-            raise Exception(f"BigQuery insertion failed: {errors}")
-        else:
-            print("New row successfully added to BigQuery.")
+    # Set CORS headers for the main request.
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+    }
+    try:
+        request_json = req.get_json(silent=True) or {}
+        job_id = req.args.get('job_id') or request_json.get('job_id')
+        if not job_id:
+            return https_fn.Response("Error: Please provide 'job_id'.", status=400, headers=headers)
 
         db = get_firestore_client()
-        session_doc_ref = db.collection(SESSIONS_COLLECTION).document(session_id)
-        session_doc_ref.update({
-            "state.analysis_id": analysis_id,
-            "state.generated_pdf_url": generated_pdf_url,
-            "state.tech_field": tech_field,
-            "state.company_website": company_website,
-            "state.short_description": short_description,
-            "state.pitch_deck_url": pdf_url
-        })
-
-        response_data = json.dumps({"message": "Analysis complete", "analysis_id": analysis_id, "generated_pdf_url": generated_pdf_url})
+        job_ref = db.collection(ANALYSIS_JOBS_COLLECTION).document(job_id)
+        job_doc = job_ref.get()
+        if not job_doc.exists:
+            return https_fn.Response(f"Error: No analysis job found for ID: {job_id}", status=404, headers=headers)
+
+        job = job_doc.to_dict()
+        if analysis_job_lease_expired(job):
+            job = fail_expired_analysis_job(db.transaction(), job_ref) or job
+        response_data = json.dumps({
+            "job_id": job_id,
+            "status": job.get("status"),
+            "stage": job.get("stage"),
+            "stages": job.get("stages", {}),
+            "result": job.get("result"),
+            "error": job.get("error"),
+            "createTime": job.get("createTime"),
+            "updateTime": job.get("updateTime"),
+        }, default=str) # Use default=str to handle Firestore timestamps
         return https_fn.Response(response_data, mimetype="application/json", headers=headers)
 
     except Exception as e:
-        print(f"An error occurred: {e}")
+        print(f"An error occurred in get_analysis_status: {e}")
         return https_fn.Response(f"An internal error occurred: {e}", status=500, headers=headers)
 
 @https_fn.on_request()
@@ -366,7 +714,7 @@ def get_investor_dashboard_data(req: https_fn.Request) -> https_fn.Response:
         headers = {
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
+            "Access-Control-Allow-Headers": "Content-Type, Authorization, If-None-Match",
             "Access-Control-Max-Age": "3600",
         }
         return https_fn.Response("", headers=headers, status=204)
@@ -374,31 +722,44 @@ def get_investor_dashboard_data(req: https_fn.Request) -> https_fn.Response:
     # Set CORS headers for the main request.
     headers = {
         "Access-Control-Allow-Origin": "*",
+        "Access-Control-Expose-Headers": "ETag",
     }
     """
-    Fetches all rows from the BigQuery pitch deck analysis table for the investor dashboard.
+    Fetches one page of the BigQuery pitch deck analysis table for the investor dashboard.
+    Accepts page_size, page_token, fields (comma-separated or "*"), tech_field,
+    recommendation, user_id, date_from, date_to and since as query or JSON parameters.
+    Responses carry an ETag; If-None-Match is answered with 304 while no analysis has been added.
     """
     try:
         print("Received request for investor dashboard data.")
-        
-        bigquery_client = bigquery.Client(project=PROJECT_ID)
-        
-        table_ref_str = f"{PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}"
-        
-        query = f"SELECT * FROM `{table_ref_str}`"
-        
-        print(f"Executing query: {query}")
-        query_job = bigquery_client.query(query)
-        
-        # Fetch all rows from the query job
-        rows = [dict(row) for row in query_job]
-        
-        print(f"Successfully fetched {len(rows)} rows from BigQuery.")
-        
-        # Convert the list of dictionaries to a JSON string
-        response_data = json.dumps(rows, default=str) # Use default=str to handle dates/times
-        
-        return https_fn.Response(response_data, mimetype="application/json", headers=headers)
+
+        params = {**(req.get_json(silent=True) or {}), **req.args.to_dict()}
+        try:
+            options = parse_dashboard_params(params)
+        except DashboardQueryError as e:
+            return https_fn.Response(f"Error: {e}", status=400, headers=headers)
+
+        etag = dashboard_etag(get_dashboard_version(get_firestore_client()), options)
+        headers = {**headers, "ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag in req.headers.get("If-None-Match", ""):
+            print("Dashboard data unchanged, returning 304.")
+            return https_fn.Response("", status=304, headers=headers)
+
+        response_data = _dashboard_cache.get(etag)
+        if response_data is None:
+            ensure_bigquery_table()
+            bigquery_client = get_bigquery_client()
+            table_ref_str = f"{PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}"
+            page = fetch_dashboard_page(bigquery_client, table_ref_str, options)
+
+            print(f"Successfully fetched {len(page['rows'])} rows from BigQuery.")
+
+            response_data = json.dumps(page, default=str) # Use default=str to handle dates/times
+            _dashboard_cache.put(etag, response_data)
+        else:
+            print("Serving dashboard data from cache.")
+
+        return json_response(req, response_data, headers)
 
     except Exception as e:
         print(f"An error occurred in get_investor_dashboard_data: {e}")
@@ -446,7 +807,7 @@ def invester_query_agent_function(req: https_fn.Request) -> https_fn.Response:
         print(f"Updated Firestore session {session_id} with id_to_analyse: {analysis_id}")
 
         # Construct message for the agent
-        final_message = Content(parts=[Part.from_text(prompt)], role="user").to_dict()
+        final_message = user_message(text_part(prompt))
 
         print(f"Streaming query to invester_query_agent for session '{session_id}' with analysis_id '{analysis_id}'...")
         response_chunks = []
@@ -505,7 +866,7 @@ def followup_question(req: https_fn.Request) -> https_fn.Response:
 
         remote_app = get_remote_app()
 
-        final_message = Content(parts=[Part.from_text(prompt)], role="user").to_dict()
+        final_message = user_message(text_part(prompt))
 
         print(f"Streaming query to followup_question_agent for session '{session_id}'...")
         
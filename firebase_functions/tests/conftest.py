@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The function modules import each other from the functions source directory (e.g. `from deck_ocr import ...`).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "functions"))
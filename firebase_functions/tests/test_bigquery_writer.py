@@ -0,0 +1,100 @@
+"""AnalysisRowWriter against a fake BigQuery client using the streaming method."""
+import threading
+import time
+
+import pytest
+
+from bigquery_writer import AnalysisRowWriter
+
+
+class FakeBigQueryClient:
+    """Records streamed batches; a batch containing a row in `failing_ids` fails."""
+
+    def __init__(self, failing_ids=(), delay_sec=0):
+        self.batches = []
+        self.failing_ids = set(failing_ids)
+        self.delay_sec = delay_sec
+        self._lock = threading.Lock()
+
+    def insert_rows_json(self, table, rows, row_ids):
+        time.sleep(self.delay_sec)
+        if self.failing_ids & set(row_ids):
+            return [{"index": 0, "errors": ["boom"]}]
+        with self._lock:
+            self.batches.append(list(row_ids))
+        return []
+
+
+def _row(analysis_id):
+    return {"analysis_id": analysis_id}
+
+
+def _written_ids(client):
+    return [analysis_id for batch in client.batches for analysis_id in batch]
+
+
+def test_write_returns_after_the_row_is_written():
+    client = FakeBigQueryClient()
+    writer = AnalysisRowWriter(client, "p.d.t", method="streaming")
+
+    writer.write(_row("a1"))
+
+    assert client.batches == [["a1"]]
+
+
+def test_concurrent_writes_share_batches():
+    client = FakeBigQueryClient(delay_sec=0.05)
+    writer = AnalysisRowWriter(client, "p.d.t", method="streaming", max_batch_rows=50)
+    threads = [threading.Thread(target=writer.write, args=(_row(f"a{i}"),)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(_written_ids(client)) == sorted(f"a{i}" for i in range(10))
+    assert len(client.batches) < 10
+
+
+def test_a_failed_batch_fails_only_its_rows_and_is_never_retried():
+    client = FakeBigQueryClient(failing_ids={"bad"})
+    writer = AnalysisRowWriter(client, "p.d.t", method="streaming", max_batch_rows=1)
+    writer._pending_lock.acquire()
+    outcomes = {}
+
+    def write(analysis_id):
+        try:
+            writer.write(_row(analysis_id))
+            outcomes[analysis_id] = "ok"
+        except Exception as e:
+            outcomes[analysis_id] = e
+
+    # Hold the queue so the three rows are queued together and usually share one flush.
+    threads = [threading.Thread(target=write, args=(analysis_id,)) for analysis_id in ("good1", "bad", "good2")]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    writer._pending_lock.release()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes["good1"] == "ok" and outcomes["good2"] == "ok"
+    assert isinstance(outcomes["bad"], Exception)
+    writer.write(_row("later"))
+    assert sorted(_written_ids(client)) == ["good1", "good2", "later"]
+
+
+def test_a_failing_flush_hook_does_not_fail_the_write():
+    client = FakeBigQueryClient()
+
+    def on_flush(rows):
+        raise RuntimeError("dashboard version bump failed")
+
+    writer = AnalysisRowWriter(client, "p.d.t", method="streaming", on_flush=on_flush)
+    writer.write(_row("a1"))
+
+    assert client.batches == [["a1"]]
+
+
+def test_rejects_unknown_write_methods():
+    with pytest.raises(ValueError):
+        AnalysisRowWriter(FakeBigQueryClient(), "p.d.t", method="storage_write")
@@ -0,0 +1,136 @@
+"""Sharded OCR with a fake OCR client over small PDFs generated with pypdf."""
+import io
+import random
+import tempfile
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pypdf")
+
+from pypdf import PdfReader, PdfWriter  # noqa: E402
+
+import deck_ocr  # noqa: E402
+from deck_ocr import PAGE_SEPARATOR, ocr_pdf, split_pdf  # noqa: E402
+
+BASE_WIDTH = 100
+
+
+def make_pdf(page_count):
+    """A PDF whose page N (1-based) is BASE_WIDTH + N points wide, so pages can be told apart."""
+    writer = PdfWriter()
+    for number in range(1, page_count + 1):
+        writer.add_blank_page(width=BASE_WIDTH + number, height=200)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def page_numbers(pdf_bytes):
+    return [int(page.mediabox.width) - BASE_WIDTH for page in PdfReader(io.BytesIO(pdf_bytes)).pages]
+
+
+class FakeOcrClient:
+    """Returns "page N" for each page, finishing shards in random order, and records call concurrency."""
+
+    def __init__(self, seed=0):
+        self.shards = []
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def process_pdf(self, pdf_bytes):
+        numbers = page_numbers(pdf_bytes)
+        with self._lock:
+            self.shards.append(numbers)
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            delay = self._rng.uniform(0, 0.03)
+        time.sleep(delay)
+        with self._lock:
+            self.active -= 1
+        return [{"text": f"page {number}", "blocks": [{"text": f"page {number}", "bbox": None}]} for number in numbers]
+
+
+@pytest.mark.parametrize("page_count, pages_per_shard, expected", [
+    (1, 3, [[1]]),
+    (3, 3, [[1, 2, 3]]),
+    (4, 3, [[1, 2, 3], [4]]),
+    (7, 3, [[1, 2, 3], [4, 5, 6], [7]]),
+    (6, 1, [[1], [2], [3], [4], [5], [6]]),
+])
+def test_split_pdf_shard_boundaries(page_count, pages_per_shard, expected):
+    shards = list(split_pdf(make_pdf(page_count), pages_per_shard))
+
+    assert [first_page for first_page, _ in shards] == [pages[0] for pages in expected]
+    assert [page_numbers(shard) for _, shard in shards] == expected
+
+
+def test_split_pdf_reads_from_a_file():
+    with tempfile.TemporaryFile() as pdf_file:
+        pdf_file.write(make_pdf(5))
+        pdf_file.seek(0)
+        shards = list(split_pdf(pdf_file, 2))
+
+    assert [page_numbers(shard) for _, shard in shards] == [[1, 2], [3, 4], [5]]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ocr_pdf_reassembles_pages_in_order(seed):
+    client = FakeOcrClient(seed)
+
+    result = ocr_pdf(make_pdf(11), client, pages_per_shard=2, max_workers=3)
+
+    assert [page["page"] for page in result["pages"]] == list(range(1, 12))
+    assert result["text"] == PAGE_SEPARATOR.join(f"page {number}" for number in range(1, 12))
+    for page in result["pages"]:
+        assert result["text"][page["offset"]:page["offset"] + len(page["text"])] == page["text"]
+    assert [(shard["first_page"], shard["last_page"]) for shard in result["shards"]] == [
+        (1, 2), (3, 4), (5, 6), (7, 8), (9, 10), (11, 11),
+    ]
+    assert sorted(client.shards) == [[1, 2], [3, 4], [5, 6], [7, 8], [9, 10], [11]]
+
+
+def test_ocr_pdf_submits_shards_in_waves(monkeypatch):
+    held = 0
+    peak_held = 0
+    lock = threading.Lock()
+    real_split_pdf = deck_ocr.split_pdf
+
+    def counting_split_pdf(pdf, pages_per_shard):
+        nonlocal held, peak_held
+        for first_page, shard in real_split_pdf(pdf, pages_per_shard):
+            with lock:
+                held += 1
+                peak_held = max(peak_held, held)
+            yield first_page, shard
+
+    class ReleasingClient(FakeOcrClient):
+        def process_pdf(self, pdf_bytes):
+            nonlocal held
+            pages = super().process_pdf(pdf_bytes)
+            with lock:
+                held -= 1
+            return pages
+
+    monkeypatch.setattr(deck_ocr, "split_pdf", counting_split_pdf)
+    client = ReleasingClient()
+
+    result = ocr_pdf(make_pdf(10), client, pages_per_shard=1, max_workers=3)
+
+    assert len(result["pages"]) == 10
+    assert client.peak_active <= 3
+    assert peak_held <= 3
+
+
+def test_ocr_pdf_raises_shard_errors():
+    class FailingClient(FakeOcrClient):
+        def process_pdf(self, pdf_bytes):
+            if 3 in page_numbers(pdf_bytes):
+                raise RuntimeError("processor rejected shard")
+            return super().process_pdf(pdf_bytes)
+
+    with pytest.raises(RuntimeError, match="processor rejected shard"):
+        ocr_pdf(make_pdf(4), FailingClient(), pages_per_shard=1, max_workers=2)
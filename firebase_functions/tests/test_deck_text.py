@@ -0,0 +1,180 @@
+"""OcrExtractor's GCS-first OCR with local split fallback, and the deck text cache, with stubbed clients."""
+import functools
+import gzip
+import io
+import json
+
+import pytest
+
+pytest.importorskip("pypdf")
+pytest.importorskip("google.api_core")
+
+from google.api_core.exceptions import InvalidArgument  # noqa: E402
+from pypdf import PdfReader, PdfWriter  # noqa: E402
+
+import deck_ocr  # noqa: E402
+import deck_text  # noqa: E402
+from deck_storage import StoredDeck  # noqa: E402
+from deck_text import DECK_TEXT_PREFIX, DeckTextTooLargeError, OcrExtractor, get_deck_text  # noqa: E402
+
+BASE_WIDTH = 100
+GCS_URI = "gs://decks/pitch_decks/uploaded/acme.pdf"
+
+
+def make_pdf(page_count):
+    """A PDF whose page N (1-based) is BASE_WIDTH + N points wide, so pages can be told apart."""
+    writer = PdfWriter()
+    for number in range(1, page_count + 1):
+        writer.add_blank_page(width=BASE_WIDTH + number, height=200)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+class StubOcrClient:
+    """OCRs shards by page width; `process_gcs` raises `gcs_error` if set."""
+
+    def __init__(self, gcs_error=None, gcs_pages=2):
+        self.gcs_error = gcs_error
+        self.gcs_pages = gcs_pages
+        self.gcs_calls = []
+        self.shard_calls = 0
+
+    def process_gcs(self, gcs_uri, mime_type="application/pdf"):
+        self.gcs_calls.append((gcs_uri, mime_type))
+        if self.gcs_error:
+            raise self.gcs_error
+        return [{"text": f"gcs page {n}", "blocks": []} for n in range(1, self.gcs_pages + 1)]
+
+    def process_pdf(self, pdf_bytes):
+        self.shard_calls += 1
+        widths = [int(page.mediabox.width) for page in PdfReader(io.BytesIO(pdf_bytes)).pages]
+        return [{"text": f"page {width - BASE_WIDTH}", "blocks": []} for width in widths]
+
+
+class LocalOnlyOcrClient:
+    """A client without `process_gcs`, like PypdfOcrClient."""
+
+    process_pdf = StubOcrClient.process_pdf
+
+    def __init__(self):
+        self.shard_calls = 0
+
+
+class StubBlob:
+    def __init__(self, bucket, name):
+        self._bucket = bucket
+        self.name = name
+
+    def exists(self):
+        return self.name in self._bucket.objects
+
+    def download_as_bytes(self):
+        return self._bucket.objects[self.name]
+
+    def upload_from_string(self, data, content_type=None):
+        self._bucket.objects[self.name] = data
+
+
+class StubStorageClient:
+    def __init__(self, objects):
+        self.objects = objects
+        self.downloads = []
+
+    def download_blob_to_file(self, gcs_uri, file_obj):
+        self.downloads.append(gcs_uri)
+        file_obj.write(self.objects[gcs_uri])
+
+
+class StubBucket:
+    def __init__(self, deck_bytes=b""):
+        self.objects = {}
+        self.client = StubStorageClient({GCS_URI: deck_bytes})
+
+    def blob(self, name):
+        return StubBlob(self, name)
+
+
+def _deck(pdf_bytes, sha256="abc123"):
+    return StoredDeck(GCS_URI, len(pdf_bytes), sha256, "application/pdf")
+
+
+def test_decks_are_read_from_cloud_storage_without_downloading():
+    client = StubOcrClient()
+    bucket = StubBucket(make_pdf(2))
+
+    pages = OcrExtractor("documentai", client).extract(_deck(make_pdf(2)), bucket)
+
+    assert [(page["page"], page["text"]) for page in pages] == [(1, "gcs page 1"), (2, "gcs page 2")]
+    assert client.gcs_calls == [(GCS_URI, "application/pdf")]
+    assert bucket.client.downloads == []
+
+
+def test_decks_over_the_page_limit_are_split_locally(monkeypatch):
+    monkeypatch.setattr(deck_text, "ocr_pdf", functools.partial(deck_ocr.ocr_pdf, pages_per_shard=2, max_workers=2))
+    pdf_bytes = make_pdf(5)
+    client = StubOcrClient(gcs_error=InvalidArgument("Document pages exceed the limit: 5 got 2"))
+    bucket = StubBucket(pdf_bytes)
+
+    pages = OcrExtractor("documentai", client).extract(_deck(pdf_bytes), bucket)
+
+    assert [(page["page"], page["text"]) for page in pages] == [(n, f"page {n}") for n in range(1, 6)]
+    assert bucket.client.downloads == [GCS_URI]
+    assert client.shard_calls == 3
+
+
+def test_other_invalid_arguments_are_raised():
+    client = StubOcrClient(gcs_error=InvalidArgument("Unsupported mime type"))
+    bucket = StubBucket(make_pdf(2))
+
+    with pytest.raises(InvalidArgument):
+        OcrExtractor("documentai", client).extract(_deck(make_pdf(2)), bucket)
+    assert bucket.client.downloads == []
+
+
+def test_decks_too_large_to_split_are_rejected_without_downloading(monkeypatch):
+    pdf_bytes = make_pdf(5)
+    monkeypatch.setattr(deck_text, "OCR_MAX_SPLIT_BYTES", len(pdf_bytes) - 1)
+    client = StubOcrClient(gcs_error=InvalidArgument("Document pages exceed the limit"))
+    bucket = StubBucket(pdf_bytes)
+
+    with pytest.raises(DeckTextTooLargeError):
+        OcrExtractor("documentai", client).extract(_deck(pdf_bytes), bucket)
+    assert bucket.client.downloads == []
+    assert client.shard_calls == 0
+
+
+def test_clients_without_cloud_storage_input_read_the_downloaded_deck():
+    pdf_bytes = make_pdf(3)
+    client = LocalOnlyOcrClient()
+    bucket = StubBucket(pdf_bytes)
+
+    pages = OcrExtractor("pypdf", client).extract(_deck(pdf_bytes), bucket)
+
+    assert [page["text"] for page in pages] == ["page 1", "page 2", "page 3"]
+    assert bucket.client.downloads == [GCS_URI]
+
+
+def test_extracted_text_is_cached_gzipped_per_deck_and_backend():
+    bucket = StubBucket(make_pdf(2))
+    deck = _deck(make_pdf(2))
+    client = StubOcrClient()
+
+    first = get_deck_text(deck, bucket, OcrExtractor("documentai", client))
+    second = get_deck_text(deck, bucket, OcrExtractor("documentai", client))
+
+    cache_key = f"{DECK_TEXT_PREFIX}/abc123.documentai.json.gz"
+    assert json.loads(gzip.decompress(bucket.objects[cache_key])) == first
+    assert second == first
+    assert first["page_count"] == 2 and first["backend"] == "documentai"
+    assert len(client.gcs_calls) == 1
+
+    # Another backend, or another deck, has its own entry.
+    get_deck_text(deck, bucket, OcrExtractor("pypdf", LocalOnlyOcrClient()))
+    get_deck_text(_deck(make_pdf(2), sha256="def456"), bucket, OcrExtractor("documentai", client))
+    assert sorted(bucket.objects) == [
+        f"{DECK_TEXT_PREFIX}/abc123.documentai.json.gz",
+        f"{DECK_TEXT_PREFIX}/abc123.pypdf.json.gz",
+        f"{DECK_TEXT_PREFIX}/def456.documentai.json.gz",
+    ]
+    assert len(client.gcs_calls) == 2
@@ -2,7 +2,10 @@ from agent import root_agent
 import vertexai
 from vertexai.preview.reasoning_engines import AdkApp
 from firestore.firestore_session_service import FirestoreSessionService
+from firestore.async_firestore_session_service import AsyncFirestoreSessionService
+from firestore.blob_store import GcsBlobStore, LocalDirectoryBlobStore
 from google.adk.memory import VertexAiRagMemoryService
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -12,12 +15,69 @@ PROJECT_ID = os.getenv("PROJECT_ID")
 LOCATION = os.getenv("LOCATION")
 STAGING_BUCKET = os.getenv("STAGING_BUCKET")
 DATABASE = os.getenv("DATABASE")
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sync") # "sync" or "async"
+SESSION_MAX_CONCURRENCY = int(os.getenv("SESSION_MAX_CONCURRENCY", "32"))
+SESSION_WRITE_BEHIND = os.getenv("SESSION_WRITE_BEHIND", "false").lower() == "true"
+# Automatic compaction is opt-in: set an event count (e.g. 200) and/or byte size (e.g. 2097152).
+SESSION_COMPACTION_EVENTS = int(os.getenv("SESSION_COMPACTION_EVENTS")) if os.getenv("SESSION_COMPACTION_EVENTS") else None
+SESSION_COMPACTION_BYTES = int(os.getenv("SESSION_COMPACTION_BYTES")) if os.getenv("SESSION_COMPACTION_BYTES") else None
+SESSION_COMPACTION_KEEP_RECENT = int(os.getenv("SESSION_COMPACTION_KEEP_RECENT", "20"))
+# Event payloads above the threshold go to this bucket (or local directory); unset keeps them inline.
+SESSION_BLOB_BUCKET = os.getenv("SESSION_BLOB_BUCKET")
+SESSION_BLOB_DIR = os.getenv("SESSION_BLOB_DIR")
+SESSION_BLOB_THRESHOLD_BYTES = int(os.getenv("SESSION_BLOB_THRESHOLD_BYTES", str(64 * 1024)))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "128")) # 0 disables the cache
+SESSION_CACHE_TTL_SEC = float(os.getenv("SESSION_CACHE_TTL_SEC", "300"))
+
+# Settings only FirestoreSessionService implements; the async backend ignores them.
+SYNC_ONLY_SESSION_SETTINGS = [
+    "SESSION_WRITE_BEHIND",
+    "SESSION_COMPACTION_EVENTS",
+    "SESSION_COMPACTION_BYTES",
+    "SESSION_COMPACTION_KEEP_RECENT",
+    "SESSION_CACHE_MAX_ENTRIES",
+    "SESSION_CACHE_TTL_SEC",
+]
+
+logger = logging.getLogger("google_adk." + __name__)
 
 vertexai.init(project=PROJECT_ID, location=LOCATION, staging_bucket=STAGING_BUCKET)
 
 
+def build_session_blob_store():
+    if SESSION_BLOB_BUCKET:
+        return GcsBlobStore(SESSION_BLOB_BUCKET, project=PROJECT_ID)
+    if SESSION_BLOB_DIR:
+        return LocalDirectoryBlobStore(SESSION_BLOB_DIR)
+    return None
+
+
 def build_local_firestore_session_service():
-    return FirestoreSessionService(project=PROJECT_ID, database=DATABASE)
+    if SESSION_BACKEND == "async":
+        ignored_settings = [name for name in SYNC_ONLY_SESSION_SETTINGS if os.getenv(name) is not None]
+        if ignored_settings:
+            logger.warning(
+                "SESSION_BACKEND=async does not support %s; these settings are ignored.", ", ".join(ignored_settings)
+            )
+        return AsyncFirestoreSessionService(
+            project=PROJECT_ID,
+            database=DATABASE,
+            max_concurrency=SESSION_MAX_CONCURRENCY,
+            blob_store=build_session_blob_store(),
+            blob_threshold_bytes=SESSION_BLOB_THRESHOLD_BYTES,
+        )
+    return FirestoreSessionService(
+        project=PROJECT_ID,
+        database=DATABASE,
+        write_behind=SESSION_WRITE_BEHIND,
+        compaction_event_threshold=SESSION_COMPACTION_EVENTS,
+        compaction_bytes_threshold=SESSION_COMPACTION_BYTES,
+        compaction_keep_recent_events=SESSION_COMPACTION_KEEP_RECENT,
+        blob_store=build_session_blob_store(),
+        blob_threshold_bytes=SESSION_BLOB_THRESHOLD_BYTES,
+        session_cache_max_entries=SESSION_CACHE_MAX_ENTRIES,
+        session_cache_ttl_sec=SESSION_CACHE_TTL_SEC,
+    )
 
 def build_vertex_ai_rag_memory_service():
     return VertexAiRagMemoryService(
@@ -4,6 +4,7 @@ from sub_agents.web_research_analyst import web_research_analyst_agent
 from sub_agents.report_generation_agent import report_generation_agent
 from sub_agents.invester_query_agent import investor_query_agent
 from sub_agents.followup_questions_agent import followup_questions_agent
+from model_config import FAST_MODEL, agent_model_kwargs
 
 
 
@@ -17,7 +18,8 @@ investment_memo_generation_agent = SequentialAgent(
 
 root_agent = Agent(
     name="manager_agent",
-    model="gemini-2.5-pro",
+    # Routing only picks a sub-agent, so a fast model is enough.
+    **agent_model_kwargs("manager_agent", default_model=FAST_MODEL, latency_budget_sec=15),
     description="Orchestrates the analysis of a pitch deck from extraction to final report and answers investor questions.",
     instruction="""
     You are a manager agent responsible for delegating tasks to the appropriate sub-agent.
@@ -26,7 +28,7 @@ root_agent = Agent(
 
     1.  **Analyze Input and User Intent:**
         *   Examine the user's request to determine their primary goal.
-        *   If the user provides a PDF file AND their request includes keywords like "analyze", "analysis", "investment memo", or "report", it is a **Pitch Deck Analysis Task**.
+        *   If the user provides a pitch deck, either as a PDF file or as page-indexed text extracted from one ("Pitch deck text ... --- Page N ---"), AND their request includes keywords like "analyze", "analysis", "investment memo", or "report", it is a **Pitch Deck Analysis Task**.
         *   If the user asks a question in plain text, it is an **Investor Question Task**.
         *   If the user's request includes keywords like "follow-up questions", "generate questions", or "questions for founder", it is a **Follow-up Questions Task** (e.g., "generate follow-up questions for the founder").
 
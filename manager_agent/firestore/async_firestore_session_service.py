@@ -0,0 +1,430 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Implements a session service on the native Firestore AsyncClient.
+
+An AsyncClient is bound to the event loop it was first used on, which is what
+made the original service fall back to the synchronous client. This backend
+keeps one AsyncClient per running event loop, so it is safe inside the Agent
+Engine event loop and in tools that start their own loops, without handing
+every call to the default thread pool. Agent Engine runs each query in a new
+`asyncio.run` on its own thread, so a loop's client is closed when the loop
+shuts down, and the concurrency limit is a single process-wide semaphore
+shared by every loop.
+
+Documents are read and written in the same layout as FirestoreSessionService,
+so the two backends can be switched on the same database: appends merge state
+deltas into the session document, and sessions written before that are read by
+replaying their snapshot and events. Compaction, folding those older sessions'
+state, write-behind and the bulk deletion APIs remain in FirestoreSessionService.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
+from typing_extensions import override
+
+from google.adk.sessions import Session
+from google.adk.events.event import Event
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+
+from .firestore_session_service import (
+    DELETE_CHUNK_SIZE,
+    EVENT_BYTES_FIELD,
+    EVENT_COUNT_FIELD,
+    EVENT_STATE_MERGED_FIELD,
+    EVENT_TIME_INDEXED_FIELD,
+    EVENTS_SUBCOLLECTION,
+    SESSIONS_COLLECTION,
+    SNAPSHOT_DOCUMENT,
+    SNAPSHOT_SUBCOLLECTION,
+    SNAPSHOT_WATERMARK_FIELD,
+    STATE_DELTA_FIELD_PATHS,
+    _estimate_event_bytes,
+    apply_state_deltas,
+    decode_page_token,
+    encode_page_token,
+    state_delta_updates,
+)
+from .blob_store import (
+    DEFAULT_BLOB_THRESHOLD_BYTES,
+    BlobStore,
+    hydrate_event_payloads,
+    offload_event_payloads,
+    session_blob_prefix,
+)
+from .event_codec import EVENT_TIME_FIELD, decode_event, encode_event
+
+logger = logging.getLogger("google_adk." + __name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_MAX_CONCURRENCY = 32
+
+
+class AsyncFirestoreSessionService(BaseSessionService):
+    def __init__(
+        self,
+        project: Optional[str] = None,
+        database: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        blob_store: Optional[BlobStore] = None,
+        blob_threshold_bytes: int = DEFAULT_BLOB_THRESHOLD_BYTES,
+    ):
+        """
+        Initializes the service. Clients are created lazily, one per event loop;
+        at most `max_concurrency` Firestore operations run at once across all
+        loops and threads of the process. Large payloads go to `blob_store` as
+        in FirestoreSessionService.
+        """
+        self._project = project
+        self._database = database
+        self._max_concurrency = max_concurrency
+        self._blob_store = blob_store
+        self._blob_threshold_bytes = blob_threshold_bytes
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Event loop -> (AsyncClient, task that closes it when the loop shuts down).
+        self._loop_clients: Dict[asyncio.AbstractEventLoop, tuple] = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _client(self) -> firestore.AsyncClient:
+        """Returns the running loop's AsyncClient, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._loop_clients.get(loop)
+            if entry is not None:
+                return entry[0]
+            # Loops closed without cancelling their tasks never ran their closer; forget their clients.
+            for stale_loop in [l for l in self._loop_clients if l.is_closed()]:
+                del self._loop_clients[stale_loop]
+            db = firestore.AsyncClient(project=self._project, database=self._database)
+            self._loop_clients[loop] = (db, loop.create_task(self._close_at_loop_shutdown(loop, db)))
+        return db
+
+    async def _close_at_loop_shutdown(self, loop: asyncio.AbstractEventLoop, db: firestore.AsyncClient) -> None:
+        """
+        Waits until the loop cancels its remaining tasks, as `asyncio.run` does
+        before closing it, then closes the loop's client there.
+        """
+        try:
+            await loop.create_future()
+        finally:
+            with self._lock:
+                self._loop_clients.pop(loop, None)
+            await _close_async_client(db)
+
+    async def _acquire_slot(self) -> None:
+        """Takes a process-wide concurrency slot, waiting for one in a worker thread if none is free."""
+        if self._slots.acquire(blocking=False):
+            return
+        # The waiting thread cannot be interrupted, so a cancelled waiter hands back the slot it gets.
+        waiter_lock = threading.Lock()
+        waiter = {"acquired": False, "abandoned": False}
+
+        def _wait():
+            self._slots.acquire()
+            with waiter_lock:
+                if waiter["abandoned"]:
+                    self._slots.release()
+                else:
+                    waiter["acquired"] = True
+
+        try:
+            await asyncio.to_thread(_wait)
+        except asyncio.CancelledError:
+            with waiter_lock:
+                if waiter["acquired"]:
+                    self._slots.release()
+                else:
+                    waiter["abandoned"] = True
+            raise
+
+    @contextlib.asynccontextmanager
+    async def _db(self):
+        """Yields the loop's AsyncClient while holding a concurrency slot."""
+        db = self._client()
+        await self._acquire_slot()
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield db
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    @override
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        """Creates a new session document in Firestore."""
+        if session_id:
+            raise ValueError("User-provided session ID is not supported.")
+
+        async with self._db() as db:
+            session_data = {
+                "app_name": app_name,
+                "user_id": user_id,
+                "state": state or {},
+                "createTime": firestore.SERVER_TIMESTAMP,
+                "updateTime": firestore.SERVER_TIMESTAMP,
+                EVENT_TIME_INDEXED_FIELD: True,
+                EVENT_STATE_MERGED_FIELD: True,
+            }
+            _, doc_ref = await db.collection(SESSIONS_COLLECTION).add(session_data)
+            doc = await doc_ref.get()
+        doc_dict = doc.to_dict()
+        return Session(
+            app_name=doc_dict["app_name"],
+            user_id=doc_dict["user_id"],
+            id=doc.id,
+            state=doc_dict.get("state", {}),
+            last_update_time=doc_dict["updateTime"].timestamp(),
+        )
+
+    @override
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        """Retrieves a session and its events from Firestore."""
+        async with self._db() as db:
+            session_ref = db.collection(SESSIONS_COLLECTION).document(session_id)
+            session_doc = await session_ref.get()
+            if not session_doc.exists:
+                return None
+
+            session_dict = session_doc.to_dict()
+            if (
+                session_dict.get("app_name") != app_name
+                or session_dict.get("user_id") != user_id
+            ):
+                return None
+
+            # Merged sessions keep every event's deltas in the document state. Older ones are
+            # rebuilt from document state, then the snapshot's folded state, then the remaining events' deltas.
+            state = dict(session_dict.get("state", {}))
+            replay_state = not session_dict.get(EVENT_STATE_MERGED_FIELD)
+            watermark = session_dict.get(SNAPSHOT_WATERMARK_FIELD)
+            if replay_state and watermark is not None:
+                snapshot_doc = await session_ref.collection(SNAPSHOT_SUBCOLLECTION).document(SNAPSHOT_DOCUMENT).get()
+                if snapshot_doc.exists:
+                    state.update(snapshot_doc.to_dict().get("state", {}))
+
+            events_ref = session_ref.collection(EVENTS_SUBCOLLECTION)
+            filtered = bool(config and (config.num_recent_events or config.after_timestamp))
+            delta_dicts = None
+            if session_dict.get(EVENT_TIME_INDEXED_FIELD):
+                remaining_query = events_ref.order_by(EVENT_TIME_FIELD)
+                if watermark is not None:
+                    remaining_query = remaining_query.where(filter=FieldFilter(EVENT_TIME_FIELD, ">", watermark))
+                if replay_state and filtered:
+                    # State needs the deltas of every remaining event, not just the ones returned.
+                    delta_dicts = [
+                        doc.to_dict() async for doc in remaining_query.select(STATE_DELTA_FIELD_PATHS).stream()
+                    ]
+                events_query = remaining_query
+                if config:
+                    if config.num_recent_events:
+                        events_query = events_query.limit_to_last(config.num_recent_events)
+                    elif config.after_timestamp:
+                        events_query = events_query.where(
+                            filter=FieldFilter(EVENT_TIME_FIELD, ">", config.after_timestamp)
+                        )
+                event_docs = await events_query.get()
+            else:
+                event_docs = [doc async for doc in events_ref.stream()]
+        event_dicts = [doc.to_dict() for doc in event_docs]
+        if replay_state:
+            if delta_dicts is None:
+                # Unfiltered reads, and legacy sessions (read whole), already hold every remaining event.
+                delta_dicts = sorted(event_dicts, key=_event_time)
+            apply_state_deltas(state, delta_dicts)
+        if self._blob_store:
+            await asyncio.to_thread(hydrate_event_payloads, self._blob_store, event_dicts)
+        events = [decode_event(doc.id, event_dict) for doc, event_dict in zip(event_docs, event_dicts)]
+        if not session_dict.get(EVENT_TIME_INDEXED_FIELD):
+            # Legacy session not yet backfilled by FirestoreSessionService: order in memory.
+            events.sort(key=lambda e: e.timestamp)
+            if config:
+                if config.num_recent_events:
+                    events = events[-config.num_recent_events :]
+                elif config.after_timestamp:
+                    events = [e for e in events if e.timestamp > config.after_timestamp]
+
+        session = Session(
+            app_name=session_dict["app_name"],
+            user_id=session_dict["user_id"],
+            id=session_doc.id,
+            state=state,
+            last_update_time=session_dict["updateTime"].timestamp(),
+        )
+        session.events = events
+        return session
+
+    @override
+    async def list_sessions(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        include_state: bool = False,
+        limit: Optional[int] = None,
+        page_token: Optional[str] = None,
+    ) -> ListSessionsResponse:
+        """
+        Lists a user's sessions, most recently updated first, reading state only
+        if requested. Use `list_sessions_page` to page through results.
+        """
+        response, _ = await self.list_sessions_page(
+            app_name=app_name,
+            user_id=user_id,
+            include_state=include_state,
+            limit=limit,
+            page_token=page_token,
+        )
+        return response
+
+    async def list_sessions_page(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        include_state: bool = False,
+        limit: Optional[int] = None,
+        page_token: Optional[str] = None,
+    ) -> Tuple[ListSessionsResponse, Optional[str]]:
+        """
+        Lists one page of sessions; returns the response and the next page token,
+        if any. Raises ValueError for a malformed page token.
+        """
+        field_paths = ["app_name", "user_id", "updateTime"]
+        if include_state:
+            field_paths.append("state")
+        async with self._db() as db:
+            query = (
+                db.collection(SESSIONS_COLLECTION)
+                .where(filter=FieldFilter("app_name", "==", app_name))
+                .where(filter=FieldFilter("user_id", "==", user_id))
+                .order_by("updateTime", direction=firestore.Query.DESCENDING)
+                .order_by(FieldPath.document_id(), direction=firestore.Query.DESCENDING)
+                .select(field_paths)
+            )
+            if page_token:
+                query = query.start_after(decode_page_token(page_token))
+            if limit:
+                query = query.limit(limit)
+            sessions = []
+            last_update_time = None
+            async for doc in query.stream():
+                session_dict = doc.to_dict()
+                sessions.append(Session(
+                    app_name=session_dict["app_name"],
+                    user_id=session_dict["user_id"],
+                    id=doc.id,
+                    state=session_dict.get("state", {}),
+                    last_update_time=session_dict["updateTime"].timestamp(),
+                ))
+                last_update_time = session_dict["updateTime"]
+        next_page_token = (
+            encode_page_token(last_update_time, sessions[-1].id) if limit and len(sessions) == limit else None
+        )
+        return ListSessionsResponse(sessions=sessions), next_page_token
+
+    @override
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        """Deletes a session and all its subcollections from Firestore."""
+        async with self._db() as db:
+            session_ref = db.collection(SESSIONS_COLLECTION).document(session_id)
+            session_doc = await session_ref.get(field_paths=["app_name", "user_id"])
+            if not session_doc.exists or session_doc.to_dict().get("user_id") != user_id:
+                return
+            await db.recursive_delete(session_ref, chunk_size=DELETE_CHUNK_SIZE)
+        if self._blob_store:
+            await asyncio.to_thread(self._blob_store.delete_prefix, session_blob_prefix(session_id))
+
+    @override
+    async def append_event(self, session: Session, event: Event) -> Event:
+        """Appends an event to the session's event subcollection in Firestore. Partial events are not persisted."""
+        await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+
+        async with self._db() as db:
+            try:
+                session_ref = db.collection(SESSIONS_COLLECTION).document(session.id)
+                event_doc_ref = session_ref.collection(EVENTS_SUBCOLLECTION).document()
+                event.id = event_doc_ref.id # Assign the new ID to the event object
+                event_data_dict = encode_event(event)
+                if self._blob_store:
+                    event_data_dict = await asyncio.to_thread(
+                        offload_event_payloads, self._blob_store, session.id, event.id,
+                        event_data_dict, self._blob_threshold_bytes,
+                    )
+
+                batch = db.batch()
+                batch.set(event_doc_ref, event_data_dict)
+                batch.update(session_ref, {
+                    **state_delta_updates([event_data_dict]),
+                    "updateTime": firestore.SERVER_TIMESTAMP,
+                    EVENT_COUNT_FIELD: firestore.Increment(1),
+                    EVENT_BYTES_FIELD: firestore.Increment(_estimate_event_bytes(event_data_dict)),
+                })
+                await batch.commit()
+            except Exception as e:
+                logger.error(
+                    "!!! Exception in append_event for session '%s': %s",
+                    session.id,
+                    e,
+                    exc_info=True
+                )
+        return event
+
+
+async def _close_async_client(db: firestore.AsyncClient) -> None:
+    """Closes an AsyncClient's gRPC channel, which has to happen on the loop that owns it."""
+    # AsyncClient.close() only closes the HTTP session; the lazily created channel is closed here.
+    if db._firestore_api_internal is not None:
+        await db._firestore_api.transport.close()
+
+
+def _event_time(event_dict: Dict[str, Any]) -> float:
+    """Event time of an event document, including legacy ones without EVENT_TIME_FIELD."""
+    if event_dict.get(EVENT_TIME_FIELD) is not None:
+        return event_dict[EVENT_TIME_FIELD]
+    ts_map = event_dict["timestamp"]
+    return ts_map["seconds"] + ts_map.get("nanos", 0) / 1_000_000_000
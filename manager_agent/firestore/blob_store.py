@@ -0,0 +1,196 @@
+"""
+Offloads large event payloads from Firestore documents into compressed blobs.
+
+Content parts and grounding metadata whose JSON encoding exceeds a size
+threshold are gzipped into a blob store and replaced in the event document by
+`{"blobRef": <key>}`. Reads put the payloads back before the document is
+decoded, fetching all blobs of a session concurrently.
+
+Blob keys start with the session ID, so deleting a session removes its blobs
+with a single prefix delete; compaction without archiving deletes the blobs of
+the events it drops. Stores are pluggable: `GcsBlobStore` for
+deployments and `LocalDirectoryBlobStore` for local runs and tests.
+"""
+from __future__ import annotations
+
+import abc
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+BLOB_REF_FIELD = "blobRef"
+DEFAULT_BLOB_THRESHOLD_BYTES = 64 * 1024
+MAX_CONCURRENT_FETCHES = 8
+
+
+class BlobStore(abc.ABC):
+    """Interface of a store for gzipped event payloads."""
+
+    @abc.abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        """Stores `data` under `key`, replacing any existing blob."""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> bytes:
+        """Returns the blob stored under `key`."""
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """Deletes the blob stored under `key`; a missing blob is not an error."""
+
+    @abc.abstractmethod
+    def delete_prefix(self, prefix: str) -> int:
+        """Deletes every blob whose key starts with `prefix` and returns how many were deleted."""
+
+
+class GcsBlobStore(BlobStore):
+    """Stores blobs as objects under `prefix` in a Cloud Storage bucket."""
+
+    def __init__(self, bucket_name: str, prefix: str = "adk_session_blobs", project: Optional[str] = None):
+        from google.cloud import storage
+
+        self._bucket = storage.Client(project=project).bucket(bucket_name)
+        self._prefix = prefix.rstrip("/")
+
+    def put(self, key: str, data: bytes) -> None:
+        self._bucket.blob(f"{self._prefix}/{key}").upload_from_string(data, content_type="application/gzip")
+
+    def get(self, key: str) -> bytes:
+        return self._bucket.blob(f"{self._prefix}/{key}").download_as_bytes()
+
+    def delete(self, key: str) -> None:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self._bucket.blob(f"{self._prefix}/{key}").delete()
+        except NotFound:
+            pass
+
+    def delete_prefix(self, prefix: str) -> int:
+        blobs = list(self._bucket.list_blobs(prefix=f"{self._prefix}/{prefix}"))
+        for blob in blobs:
+            blob.delete()
+        return len(blobs)
+
+
+class LocalDirectoryBlobStore(BlobStore):
+    """Stores blobs as files below a local directory."""
+
+    def __init__(self, root: str):
+        self._root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._root, *key.split("/"))
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_prefix(self, prefix: str) -> int:
+        deleted = 0
+        for dirpath, _, filenames in os.walk(self._root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self._root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    os.remove(path)
+                    deleted += 1
+        return deleted
+
+
+def session_blob_prefix(session_id: str) -> str:
+    """Returns the key prefix shared by all blobs of a session."""
+    return f"{session_id}/"
+
+
+def offload_event_payloads(
+    store: BlobStore, session_id: str, event_id: str, event_dict: Dict[str, Any], threshold_bytes: int
+) -> Dict[str, Any]:
+    """
+    Returns a copy of an encoded event with oversized content parts and grounding
+    metadata uploaded to `store` and replaced by blob references.
+    """
+    key_prefix = f"{session_blob_prefix(session_id)}{event_id}"
+    event_dict = dict(event_dict)
+
+    content = event_dict.get("content")
+    if content and content.get("parts"):
+        parts = list(content["parts"])
+        for i, part in enumerate(parts):
+            ref = _offload_if_large(store, f"{key_prefix}/part_{i}.json.gz", part, threshold_bytes)
+            if ref:
+                parts[i] = ref
+        event_dict["content"] = {**content, "parts": parts}
+
+    metadata = event_dict.get("event_metadata")
+    if metadata and metadata.get("grounding_metadata"):
+        ref = _offload_if_large(
+            store, f"{key_prefix}/grounding_metadata.json.gz", metadata["grounding_metadata"], threshold_bytes
+        )
+        if ref:
+            event_dict["event_metadata"] = {**metadata, "grounding_metadata": ref}
+    return event_dict
+
+
+def hydrate_event_payloads(store: BlobStore, event_dicts: List[Dict[str, Any]]) -> None:
+    """Replaces blob references in encoded events with their payloads, fetching blobs concurrently."""
+    slots = _blob_ref_slots(event_dicts)
+    if not slots:
+        return
+
+    def fetch(key):
+        return json.loads(gzip.decompress(store.get(key)))
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_FETCHES, len(slots))) as executor:
+        payloads = list(executor.map(fetch, [key for _, _, key in slots]))
+    for (container, slot, _), payload in zip(slots, payloads):
+        container[slot] = payload
+
+
+def delete_event_payloads(store: BlobStore, event_dicts: List[Dict[str, Any]]) -> int:
+    """Deletes the blobs referenced by encoded events, concurrently; returns how many were referenced."""
+    keys = [key for _, _, key in _blob_ref_slots(event_dicts)]
+    if keys:
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_FETCHES, len(keys))) as executor:
+            list(executor.map(store.delete, keys))
+    return len(keys)
+
+
+def _blob_ref_slots(event_dicts: List[Dict[str, Any]]) -> List[Tuple[Any, Any, str]]:
+    """Returns (container, index or key, blob key) for every blob reference in encoded events."""
+    slots = []
+    for event_dict in event_dicts:
+        content = event_dict.get("content")
+        for i, part in enumerate((content or {}).get("parts") or []):
+            if _is_blob_ref(part):
+                slots.append((content["parts"], i, part[BLOB_REF_FIELD]))
+        metadata = event_dict.get("event_metadata")
+        if metadata and _is_blob_ref(metadata.get("grounding_metadata")):
+            slots.append((metadata, "grounding_metadata", metadata["grounding_metadata"][BLOB_REF_FIELD]))
+    return slots
+
+
+def _offload_if_large(store: BlobStore, key: str, value: Any, threshold_bytes: int) -> Optional[Dict[str, str]]:
+    encoded = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    if len(encoded) <= threshold_bytes:
+        return None
+    store.put(key, gzip.compress(encoded))
+    return {BLOB_REF_FIELD: key}
+
+
+def _is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and value.keys() == {BLOB_REF_FIELD}
@@ -0,0 +1,168 @@
+"""
+Schema-versioned encoding of ADK events to and from Firestore documents.
+
+Documents written by this codec carry `schema_version`. Version 2 stores
+actions under camelCase keys and keeps the exact float timestamp in
+EVENT_TIME_FIELD, so an event reads back as it was written. Documents without
+a version were written by the first serializer, which stored actions under
+snake_case keys (and `transfer_agent`); those are still decoded.
+
+Text-only content, by far the most common shape in a session, is encoded and
+decoded directly instead of going through a full pydantic dump and validation.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions import _session_util
+from google.genai import types
+
+SCHEMA_VERSION = 2
+SCHEMA_VERSION_FIELD = "schema_version"
+# Numeric event timestamp (epoch seconds) used to order and filter events in queries.
+EVENT_TIME_FIELD = "event_time"
+PDF_PLACEHOLDER_TEXT = "[PDF content omitted from history]"
+
+# (EventActions attribute, stored key, legacy stored keys)
+_ACTION_FIELDS = (
+    ("skip_summarization", "skipSummarization", ("skip_summarization",)),
+    ("state_delta", "stateDelta", ("state_delta",)),
+    ("artifact_delta", "artifactDelta", ("artifact_delta",)),
+    ("transfer_to_agent", "transferAgent", ("transfer_agent", "transfer_to_agent")),
+    ("escalate", "escalate", ()),
+    ("requested_auth_configs", "requestedAuthConfigs", ("requested_auth_configs",)),
+)
+
+
+def encode_event(event: Event) -> Dict[str, Any]:
+    """Encodes an Event into a Firestore document dictionary."""
+    metadata_json = {
+        "partial": event.partial,
+        "turn_complete": event.turn_complete,
+        "interrupted": event.interrupted,
+        "branch": event.branch,
+        "long_running_tool_ids": (
+            list(event.long_running_tool_ids) if event.long_running_tool_ids else None
+        ),
+    }
+    if event.grounding_metadata:
+        metadata_json["grounding_metadata"] = event.grounding_metadata.model_dump(exclude_none=True, mode="json")
+
+    event_json = {
+        SCHEMA_VERSION_FIELD: SCHEMA_VERSION,
+        "author": event.author,
+        "invocation_id": event.invocation_id,
+        "timestamp": {
+            "seconds": int(event.timestamp),
+            "nanos": int((event.timestamp - int(event.timestamp)) * 1_000_000_000),
+        },
+        EVENT_TIME_FIELD: event.timestamp,
+        "error_code": event.error_code,
+        "error_message": event.error_message,
+        "event_metadata": metadata_json,
+    }
+    if event.actions:
+        event_json["actions"] = _encode_actions(event.actions)
+    if event.content:
+        event_json["content"] = _encode_content(event.content, strip_pdfs=event.author == "user")
+    return event_json
+
+
+def decode_event(doc_id: str, event_dict: Dict[str, Any]) -> Event:
+    """Decodes a Firestore document dictionary (any schema version) into an Event."""
+    legacy = event_dict.get(SCHEMA_VERSION_FIELD) is None
+    timestamp = event_dict.get(EVENT_TIME_FIELD)
+    if timestamp is None:
+        ts_map = event_dict["timestamp"]
+        timestamp = ts_map["seconds"] + ts_map.get("nanos", 0) / 1_000_000_000
+
+    event = Event(
+        id=doc_id,
+        invocation_id=event_dict["invocation_id"],
+        author=event_dict["author"],
+        actions=_decode_actions(event_dict.get("actions"), legacy),
+        content=_decode_content(event_dict.get("content")),
+        timestamp=timestamp,
+        error_code=event_dict.get("error_code"),
+        error_message=event_dict.get("error_message"),
+    )
+
+    metadata = event_dict.get("event_metadata")
+    if metadata:
+        long_running_tool_ids = metadata.get("long_running_tool_ids")
+        event.partial = metadata.get("partial")
+        event.turn_complete = metadata.get("turn_complete")
+        event.interrupted = metadata.get("interrupted")
+        event.branch = metadata.get("branch")
+        event.grounding_metadata = _session_util.decode_grounding_metadata(metadata.get("grounding_metadata"))
+        event.long_running_tool_ids = set(long_running_tool_ids) if long_running_tool_ids else None
+    return event
+
+
+def decode_state_delta(event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the state delta stored in an event document of any schema version."""
+    actions = event_dict.get("actions") or {}
+    return actions.get("stateDelta") or actions.get("state_delta") or {}
+
+
+def _encode_actions(actions: EventActions) -> Dict[str, Any]:
+    actions_json = {}
+    for attribute, key, _ in _ACTION_FIELDS:
+        actions_json[key] = getattr(actions, attribute)
+    if actions.requested_auth_configs:
+        actions_json["requestedAuthConfigs"] = {
+            call_id: auth_config.model_dump(exclude_none=True, mode="json")
+            for call_id, auth_config in actions.requested_auth_configs.items()
+        }
+    return actions_json
+
+
+def _decode_actions(actions_json: Optional[Dict[str, Any]], legacy: bool) -> EventActions:
+    if not actions_json:
+        return EventActions()
+    fields = {}
+    for attribute, key, legacy_keys in _ACTION_FIELDS:
+        value = actions_json.get(key)
+        if value is None and legacy:
+            for legacy_key in legacy_keys:
+                value = actions_json.get(legacy_key)
+                if value is not None:
+                    break
+        if value is not None:
+            fields[attribute] = value
+    # Validation turns stored auth configs back into their models.
+    return EventActions.model_validate(fields)
+
+
+def _is_text_part(part: types.Part) -> bool:
+    return part.text is not None and part.model_fields_set <= {"text"}
+
+
+def _encode_content(content: types.Content, strip_pdfs: bool) -> Dict[str, Any]:
+    if content.parts is not None and all(_is_text_part(part) for part in content.parts):
+        content_dict = {"parts": [{"text": part.text} for part in content.parts]}
+        if content.role is not None:
+            content_dict["role"] = content.role
+        return content_dict
+
+    content_dict = content.model_dump(exclude_none=True, mode="json")
+    if strip_pdfs and "parts" in content_dict:
+        # Inline PDFs are how pitch decks arrive; keep them out of the history.
+        content_dict["parts"] = [
+            {"text": PDF_PLACEHOLDER_TEXT}
+            if part.get("inline_data", {}).get("mime_type") == "application/pdf"
+            else part
+            for part in content_dict["parts"]
+        ]
+    return content_dict
+
+
+def _decode_content(content_dict: Optional[Dict[str, Any]]) -> Optional[types.Content]:
+    if not content_dict:
+        return None
+    parts = content_dict.get("parts")
+    if parts is not None and all(part.keys() == {"text"} and isinstance(part["text"], str) for part in parts):
+        return types.Content(role=content_dict.get("role"), parts=[types.Part(text=part["text"]) for part in parts])
+    return _session_util.decode_content(content_dict)
@@ -19,35 +19,130 @@ This version uses the synchronous Firestore client to prevent event loop errors.
 from __future__ import annotations
 
 import asyncio
+import base64
+import json
 import logging
-from typing import Any, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
 
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
 from google.cloud import firestore
 from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
 from typing_extensions import override
 
-from google.adk.sessions import _session_util, Session
+from google.adk.sessions import Session, State
 from google.adk.events.event import Event
-from google.adk.events.event_actions import EventActions
 from google.adk.sessions.base_session_service import (
     BaseSessionService,
     GetSessionConfig,
     ListSessionsResponse,
 )
 
+from .blob_store import (
+    DEFAULT_BLOB_THRESHOLD_BYTES,
+    BlobStore,
+    delete_event_payloads,
+    hydrate_event_payloads,
+    offload_event_payloads,
+    session_blob_prefix,
+)
+from .event_codec import EVENT_TIME_FIELD, decode_event, decode_state_delta, encode_event
+from .session_cache import SessionCache
+
 logger = logging.getLogger("google_adk." + __name__)
 # Set the level to INFO to make sure our logs are captured.
 logger.setLevel(logging.INFO)
 
 SESSIONS_COLLECTION = "adk_sessions"
 EVENTS_SUBCOLLECTION = "events"
+# Set on sessions whose events all carry EVENT_TIME_FIELD; older sessions are backfilled on first read.
+EVENT_TIME_INDEXED_FIELD = "eventTimeIndexed"
+# Set on sessions whose `state` already includes every event's state delta; older sessions are folded on first read.
+EVENT_STATE_MERGED_FIELD = "eventStateMerged"
+# Firestore limits a write batch to 500 operations.
+MAX_BATCH_WRITES = 500
+
+# Session compaction: folded state of compacted events lives in a snapshot document,
+# and only events newer than the snapshot watermark are read back.
+SNAPSHOT_SUBCOLLECTION = "snapshots"
+SNAPSHOT_DOCUMENT = "latest"
+ARCHIVED_EVENTS_SUBCOLLECTION = "archived_events"
+SNAPSHOT_WATERMARK_FIELD = "snapshotWatermark"
+EVENT_COUNT_FIELD = "eventCount"
+EVENT_BYTES_FIELD = "eventBytes"
+
+# Fields holding an event's state delta, in current and legacy event documents.
+STATE_DELTA_FIELD_PATHS = ["actions.stateDelta", "actions.state_delta"]
+
+# Session deletion: documents listed per recursive-delete page, sessions whose documents are
+# listed concurrently, and progress reporting cadence.
+DELETE_CHUNK_SIZE = 500
+DELETE_LIST_WORKERS = 8
+DELETE_PROGRESS_INTERVAL = 500
 
 
 class FirestoreSessionService(BaseSessionService):
-    def __init__(self, project: Optional[str] = None, database: Optional[str] = None):
-        """Initializes the FirestoreSessionService with the synchronous client."""
+    def __init__(
+        self,
+        project: Optional[str] = None,
+        database: Optional[str] = None,
+        write_behind: bool = False,
+        max_pending_events: int = 20,
+        compaction_event_threshold: Optional[int] = None,
+        compaction_bytes_threshold: Optional[int] = None,
+        compaction_keep_recent_events: int = 20,
+        archive_compacted_events: bool = True,
+        blob_store: Optional[BlobStore] = None,
+        blob_threshold_bytes: int = DEFAULT_BLOB_THRESHOLD_BYTES,
+        session_cache_max_entries: int = 0,
+        session_cache_ttl_sec: float = 300,
+    ):
+        """
+        Initializes the FirestoreSessionService with the synchronous client.
+
+        With `write_behind`, appended events are queued per session and committed
+        in grouped batches (see `append_event`); queued events are always flushed
+        before the session is read.
+
+        When a session grows past `compaction_event_threshold` events or
+        `compaction_bytes_threshold` bytes of event data, a read schedules its
+        compaction on a background thread (see `compact_session`); the read itself
+        is served as usual. Both thresholds default to None, which disables
+        automatic compaction.
+
+        Session state is the session document's state: each commit merges the
+        non-temp state deltas of its events into it in the same batch, so reads
+        never replay events for state, whatever the session's length and
+        whether or not it was compacted.
+
+        With a `blob_store`, content parts and grounding metadata larger than
+        `blob_threshold_bytes` are written to gzipped blobs and the event
+        document keeps only a reference (see `blob_store.py`).
+
+        With `session_cache_max_entries` > 0, sessions read or created by this
+        process are kept in a `SessionCache` and served again while the session
+        document is unchanged; `session_cache.hits` and `.misses` count lookups.
+        """
         # Use the standard synchronous client instead of the AsyncClient
         self._db = firestore.Client(project=project, database=database)
+        self._write_behind = write_behind
+        self._max_pending_events = max_pending_events
+        self._pending_events: Dict[str, list] = {}
+        self._pending_lock = threading.Lock()
+        self._compaction_event_threshold = compaction_event_threshold
+        self._compaction_bytes_threshold = compaction_bytes_threshold
+        self._compaction_keep_recent_events = compaction_keep_recent_events
+        self._archive_compacted_events = archive_compacted_events
+        self._compaction_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session_compaction")
+        self._compacting: set = set()
+        self._blob_store = blob_store
+        self._blob_threshold_bytes = blob_threshold_bytes
+        self.session_cache = (
+            SessionCache(session_cache_max_entries, session_cache_ttl_sec) if session_cache_max_entries > 0 else None
+        )
 
     @override
     async def create_session(
@@ -69,18 +164,23 @@ class FirestoreSessionService(BaseSessionService):
                 "state": state or {},
                 "createTime": firestore.SERVER_TIMESTAMP,
                 "updateTime": firestore.SERVER_TIMESTAMP,
+                EVENT_TIME_INDEXED_FIELD: True,
+                EVENT_STATE_MERGED_FIELD: True,
             }
             # These are now synchronous calls
             _, doc_ref = self._db.collection(SESSIONS_COLLECTION).add(session_data)
             doc = doc_ref.get()
             doc_dict = doc.to_dict()
-            return Session(
+            session = Session(
                 app_name=doc_dict["app_name"],
                 user_id=doc_dict["user_id"],
                 id=doc.id,
                 state=doc_dict.get("state", {}),
                 last_update_time=doc_dict["updateTime"].timestamp(),
             )
+            if self.session_cache:
+                self.session_cache.put(doc.id, doc.update_time, session)
+            return session
 
         # Run the synchronous DB calls in a separate thread to not block the async server
         return await asyncio.to_thread(_create_in_firestore)
@@ -97,6 +197,7 @@ class FirestoreSessionService(BaseSessionService):
         """Retrieves a session and its events from Firestore using a thread."""
 
         def _get_from_firestore():
+            self._flush_session_sync(session_id)
             session_ref = self._db.collection(SESSIONS_COLLECTION).document(session_id)
             session_doc = session_ref.get()
 
@@ -110,42 +211,112 @@ class FirestoreSessionService(BaseSessionService):
             ):
                 return None
 
+            if not session_dict.get(EVENT_TIME_INDEXED_FIELD):
+                _backfill_event_times(self._db, session_ref)
+            if not session_dict.get(EVENT_STATE_MERGED_FIELD):
+                session_dict["state"] = _backfill_event_state(self._db, session_ref)
+
+            if self._needs_compaction(session_dict):
+                self._schedule_compaction(session_ref)
+            if self.session_cache:
+                session = self.session_cache.get(session_id, session_doc.update_time)
+                if session is not None:
+                    session.events = _filter_events(session.events, config)
+                    return session
+
             update_timestamp = session_dict["updateTime"].timestamp()
             session = Session(
                 app_name=session_dict["app_name"],
                 user_id=session_dict["user_id"],
                 id=session_doc.id,
-                state=session_dict.get("state", {}),
+                # The document state already includes the deltas of every event, compacted or not.
+                state=dict(session_dict.get("state", {})),
                 last_update_time=update_timestamp,
             )
 
-            # Fetch events without ordering from the database to avoid index requirements.
-            events_ref = session_ref.collection(EVENTS_SUBCOLLECTION)
-            event_docs = events_ref.stream()
-            events_list = [_from_firestore_doc_to_event(doc) for doc in event_docs]
-            # Sort the events in the application code instead.
-            events_list.sort(key=lambda e: e.timestamp)
-            session.events = events_list
-
+            # Order, limit and filter in Firestore so reads only cover the events returned.
+            watermark = session_dict.get(SNAPSHOT_WATERMARK_FIELD)
+            events_query = session_ref.collection(EVENTS_SUBCOLLECTION).order_by(EVENT_TIME_FIELD)
+            if watermark is not None:
+                events_query = events_query.where(filter=FieldFilter(EVENT_TIME_FIELD, ">", watermark))
+            filtered = bool(config and (config.num_recent_events or config.after_timestamp))
             if config:
                 if config.num_recent_events:
-                    session.events = session.events[-config.num_recent_events :]
+                    events_query = events_query.limit_to_last(config.num_recent_events)
                 elif config.after_timestamp:
-                    session.events = [e for e in session.events if e.timestamp > config.after_timestamp]
-            
+                    events_query = events_query.where(
+                        filter=FieldFilter(EVENT_TIME_FIELD, ">", config.after_timestamp)
+                    )
+            # limit_to_last queries cannot be streamed, so fetch the (bounded) result list.
+            event_docs = events_query.get()
+            event_dicts = [doc.to_dict() for doc in event_docs]
+            if self._blob_store:
+                hydrate_event_payloads(self._blob_store, event_dicts)
+            session.events = [decode_event(doc.id, event_dict) for doc, event_dict in zip(event_docs, event_dicts)]
+
+            # Only complete sessions are cached; filtered reads are served from them in memory.
+            if self.session_cache and not filtered:
+                self.session_cache.put(session_id, session_doc.update_time, session)
             return session
 
         return await asyncio.to_thread(_get_from_firestore)
 
     @override
-    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
-        """Lists all sessions for a given user and app from Firestore using a thread."""
+    async def list_sessions(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        include_state: bool = False,
+        limit: Optional[int] = None,
+        page_token: Optional[str] = None,
+    ) -> ListSessionsResponse:
+        """
+        Lists a user's sessions for an app from Firestore using a thread, most
+        recently updated first. Only IDs and timestamps are read unless
+        `include_state` is set. Use `list_sessions_page` to page through results.
+        """
+        response, _ = await self.list_sessions_page(
+            app_name=app_name,
+            user_id=user_id,
+            include_state=include_state,
+            limit=limit,
+            page_token=page_token,
+        )
+        return response
+
+    async def list_sessions_page(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        include_state: bool = False,
+        limit: Optional[int] = None,
+        page_token: Optional[str] = None,
+    ) -> Tuple[ListSessionsResponse, Optional[str]]:
+        """
+        Lists one page of sessions; returns the response and the next page token,
+        if any. Raises ValueError for a malformed page token.
+        """
         def _list_from_firestore():
-            query = self._db.collection(SESSIONS_COLLECTION).where(
-                filter=FieldFilter("app_name", "==", app_name)
-            ).where(filter=FieldFilter("user_id", "==", user_id))
-            
+            field_paths = ["app_name", "user_id", "updateTime"]
+            if include_state:
+                field_paths.append("state")
+            query = (
+                self._db.collection(SESSIONS_COLLECTION)
+                .where(filter=FieldFilter("app_name", "==", app_name))
+                .where(filter=FieldFilter("user_id", "==", user_id))
+                .order_by("updateTime", direction=firestore.Query.DESCENDING)
+                .order_by(FieldPath.document_id(), direction=firestore.Query.DESCENDING)
+                .select(field_paths)
+            )
+            if page_token:
+                query = query.start_after(decode_page_token(page_token))
+            if limit:
+                query = query.limit(limit)
+
             sessions = []
+            last_update_time = None
             for doc in query.stream():
                 session_dict = doc.to_dict()
                 session = Session(
@@ -156,7 +327,11 @@ class FirestoreSessionService(BaseSessionService):
                     last_update_time=session_dict["updateTime"].timestamp(),
                 )
                 sessions.append(session)
-            return ListSessionsResponse(sessions=sessions)
+                last_update_time = session_dict["updateTime"]
+            next_page_token = (
+                encode_page_token(last_update_time, sessions[-1].id) if limit and len(sessions) == limit else None
+            )
+            return ListSessionsResponse(sessions=sessions), next_page_token
 
         return await asyncio.to_thread(_list_from_firestore)
 
@@ -168,167 +343,423 @@ class FirestoreSessionService(BaseSessionService):
             session_doc = session_ref.get(field_paths=["app_name", "user_id"])
             if not session_doc.exists or session_doc.to_dict().get("user_id") != user_id:
                 return
+            self._delete_session_trees([session_ref])
 
-            events_ref = session_ref.collection(EVENTS_SUBCOLLECTION)
-            event_docs = events_ref.list_documents()
-            
-            batch = self._db.batch()
-            for doc in event_docs:
-                batch.delete(doc)
-            batch.delete(session_ref)
-            batch.commit()
-        
         await asyncio.to_thread(_delete_in_firestore)
 
+    async def delete_sessions_for_user(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """
+        Deletes every session of a user, with their events, snapshots and archives.
+        `on_progress(sessions_deleted, documents_deleted)` is called as deletion proceeds.
+        Returns the number of sessions deleted.
+        """
+        def _delete_in_firestore():
+            query = (
+                self._db.collection(SESSIONS_COLLECTION)
+                .where(filter=FieldFilter("app_name", "==", app_name))
+                .where(filter=FieldFilter("user_id", "==", user_id))
+                .select([FieldPath.document_id()])
+            )
+            return self._delete_session_trees([doc.reference for doc in query.stream()], on_progress)
+
+        return await asyncio.to_thread(_delete_in_firestore)
+
+    async def purge_older_than(
+        self,
+        *,
+        app_name: str,
+        older_than: datetime,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """
+        Deletes every session of an app last updated before `older_than`.
+        Returns the number of sessions deleted.
+        """
+        def _delete_in_firestore():
+            query = (
+                self._db.collection(SESSIONS_COLLECTION)
+                .where(filter=FieldFilter("app_name", "==", app_name))
+                .where(filter=FieldFilter("updateTime", "<", older_than))
+                .select([FieldPath.document_id()])
+            )
+            return self._delete_session_trees([doc.reference for doc in query.stream()], on_progress)
+
+        return await asyncio.to_thread(_delete_in_firestore)
+
+    def _delete_session_trees(
+        self,
+        session_refs: list,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """
+        Deletes sessions and their subcollections through one BulkWriter, which
+        parallelizes and rate-limits the deletes and is not bound by the 500-write
+        batch limit. Subcollection documents are listed (keys only) for several
+        sessions concurrently; the deletes are queued from the calling thread
+        only, since BulkWriter is not thread-safe, and the writer is closed once
+        at the end. `recursive_delete` is not used because it closes the
+        BulkWriter it is given. Returns the number of sessions deleted.
+        """
+        if not session_refs:
+            return 0
+        with self._pending_lock:
+            for session_ref in session_refs:
+                self._pending_events.pop(session_ref.id, None)
+        if self.session_cache:
+            for session_ref in session_refs:
+                self.session_cache.invalidate(session_ref.id)
+
+        progress_lock = threading.Lock()
+        documents_deleted = 0
+        sessions_deleted = 0
+
+        def _on_write_result(reference, result, bulk_writer):
+            nonlocal documents_deleted
+            with progress_lock:
+                documents_deleted += 1
+                if on_progress and documents_deleted % DELETE_PROGRESS_INTERVAL == 0:
+                    on_progress(sessions_deleted, documents_deleted)
+
+        bulk_writer = self._db.bulk_writer()
+        bulk_writer.on_write_result(_on_write_result)
+
+        def _list_session_tree(session_ref):
+            """Returns the references of a session's subcollection documents, then the session itself."""
+            refs = [
+                doc.reference
+                for collection_ref in session_ref.collections()
+                for doc in collection_ref.select([FieldPath.document_id()]).stream()
+            ]
+            refs.append(session_ref)
+            return refs
+
+        try:
+            with ThreadPoolExecutor(max_workers=DELETE_LIST_WORKERS) as executor:
+                # Results arrive in order as sessions are listed; the first listing error is raised here.
+                for session_ref, refs in zip(session_refs, executor.map(_list_session_tree, session_refs)):
+                    for ref in refs:
+                        bulk_writer.delete(ref)
+                    with progress_lock:
+                        sessions_deleted += 1
+                    logger.info("Queued deletion of session '%s'", session_ref.id)
+        finally:
+            bulk_writer.close()
+        if self._blob_store:
+            for session_ref in session_refs:
+                self._blob_store.delete_prefix(session_blob_prefix(session_ref.id))
+
+        logger.info("Deleted %d session(s) (%d documents)", sessions_deleted, documents_deleted)
+        if on_progress:
+            on_progress(sessions_deleted, documents_deleted)
+        return sessions_deleted
 
     @override
     async def append_event(self, session: Session, event: Event) -> Event:
-        """Appends an event to the session's event subcollection in Firestore using a thread."""
+        """
+        Appends an event to the session's event subcollection in Firestore using a thread.
+
+        Partial (streaming) events are not persisted. In write-behind mode the
+        event is queued and committed together with the rest of the turn when
+        the turn completes, a final response is produced or the queue is full.
+        """
         await super().append_event(session=session, event=event)
-        
-        def _append_in_firestore():
-            logger.info("Starting _append_in_firestore for session '%s'", session.id)
+        if event.partial:
+            return event
+
+        session_ref = self._db.collection(SESSIONS_COLLECTION).document(session.id)
+        # Document IDs are generated client-side, so the event ID is known before the write.
+        event_doc_ref = session_ref.collection(EVENTS_SUBCOLLECTION).document()
+        event.id = event_doc_ref.id # Assign the new ID to the event object
+        event_data_dict = encode_event(event)
+
+        if not self._write_behind:
+            await asyncio.to_thread(self._commit_events, session.id, [(event_doc_ref, event_data_dict, event)])
+            return event
+
+        with self._pending_lock:
+            pending = self._pending_events.setdefault(session.id, [])
+            pending.append((event_doc_ref, event_data_dict, event))
+            should_flush = (
+                event.turn_complete
+                or event.is_final_response()
+                or len(pending) >= self._max_pending_events
+            )
+        if should_flush:
+            await self.flush(session_id=session.id)
+        return event
+
+    async def compact_session(self, *, session_id: str) -> None:
+        """Folds all but the most recent events of a session into its snapshot document."""
+        await asyncio.to_thread(
+            self._compact_session_sync,
+            self._db.collection(SESSIONS_COLLECTION).document(session_id),
+        )
+
+    def _schedule_compaction(self, session_ref: firestore.DocumentReference) -> None:
+        """Compacts a session on the background thread, once at a time per session."""
+        with self._pending_lock:
+            if session_ref.id in self._compacting:
+                return
+            self._compacting.add(session_ref.id)
+
+        def _compact():
             try:
-                # Use a batch for atomic writes.
-                batch = self._db.batch()
-                
-                session_ref = self._db.collection(SESSIONS_COLLECTION).document(session.id)
-                
-                # Create a new document for the event in the subcollection.
-                event_doc_ref = session_ref.collection(EVENTS_SUBCOLLECTION).document()
-                event.id = event_doc_ref.id # Assign the new ID to the event object
-                
-                event_data_dict = _convert_event_to_json(event)
-                logger.info("Appending event data: %s", event_data_dict)
-                
-                # Add the event creation to the batch.
-                batch.set(event_doc_ref, event_data_dict)
-
-                # Update the session document's timestamp. State is no longer saved here.
-                batch.update(session_ref, {"updateTime": firestore.SERVER_TIMESTAMP})
-                # Commit the batch.
-                logger.info("Committing batch to Firestore for session '%s'...", session.id)
-                batch.commit()
-                logger.info("Batch committed successfully for session '%s'.", session.id)
+                self._compact_session_sync(session_ref)
             except Exception as e:
-                # Log any exception that occurs during the process.
-                logger.error(
-                    "!!! Exception in _append_in_firestore for session '%s': %s",
-                    session.id,
-                    e,
-                    exc_info=True
+                logger.error("Compaction of session '%s' failed: %s", session_ref.id, e, exc_info=True)
+            finally:
+                with self._pending_lock:
+                    self._compacting.discard(session_ref.id)
+
+        self._compaction_executor.submit(_compact)
+
+    def _needs_compaction(self, session_dict: Dict[str, Any]) -> bool:
+        event_count = session_dict.get(EVENT_COUNT_FIELD, 0)
+        event_bytes = session_dict.get(EVENT_BYTES_FIELD, 0)
+        if event_count <= self._compaction_keep_recent_events:
+            return False
+        return bool(
+            (self._compaction_event_threshold and event_count > self._compaction_event_threshold)
+            or (self._compaction_bytes_threshold and event_bytes > self._compaction_bytes_threshold)
+        )
+
+    def _compact_session_sync(self, session_ref: firestore.DocumentReference) -> None:
+        """
+        Writes a snapshot holding the state folded from all but the most recent
+        events and a watermark at the newest compacted event, then archives (or
+        deletes) the compacted events in batches. The snapshot is written first,
+        so an interrupted compaction never hides events that were not folded.
+        """
+        self._flush_session_sync(session_ref.id)
+        event_docs = list(session_ref.collection(EVENTS_SUBCOLLECTION).order_by(EVENT_TIME_FIELD).stream())
+        compacted = event_docs[:max(0, len(event_docs) - self._compaction_keep_recent_events)]
+        if not compacted:
+            return
+        logger.info("Compacting %d event(s) of session '%s'", len(compacted), session_ref.id)
+
+        snapshot_ref = session_ref.collection(SNAPSHOT_SUBCOLLECTION).document(SNAPSHOT_DOCUMENT)
+        snapshot_doc = snapshot_ref.get()
+        snapshot = snapshot_doc.to_dict() if snapshot_doc.exists else {}
+        folded_state = dict(snapshot.get("state", {}))
+        apply_state_deltas(folded_state, [doc.to_dict() for doc in compacted])
+        watermark = compacted[-1].get(EVENT_TIME_FIELD)
+
+        snapshot_ref.set({
+            "state": folded_state,
+            "watermark": watermark,
+            "compactedEventCount": snapshot.get("compactedEventCount", 0) + len(compacted),
+            "updateTime": firestore.SERVER_TIMESTAMP,
+        })
+        # Subtract the compacted events, so events committed while compacting stay counted.
+        session_ref.update({
+            SNAPSHOT_WATERMARK_FIELD: watermark,
+            EVENT_COUNT_FIELD: firestore.Increment(-len(compacted)),
+            EVENT_BYTES_FIELD: firestore.Increment(-sum(_estimate_event_bytes(doc.to_dict()) for doc in compacted)),
+        })
+
+        # Archiving takes two writes per event (copy and delete).
+        writes_per_event = 2 if self._archive_compacted_events else 1
+        chunk_size = MAX_BATCH_WRITES // writes_per_event
+        archive_ref = session_ref.collection(ARCHIVED_EVENTS_SUBCOLLECTION)
+        for start in range(0, len(compacted), chunk_size):
+            batch = self._db.batch()
+            for doc in compacted[start:start + chunk_size]:
+                if self._archive_compacted_events:
+                    batch.set(archive_ref.document(doc.id), doc.to_dict())
+                batch.delete(doc.reference)
+            batch.commit()
+        # Archived events keep their blob references; dropped events take their blobs with them.
+        if self._blob_store and not self._archive_compacted_events:
+            delete_event_payloads(self._blob_store, [doc.to_dict() for doc in compacted])
+
+    async def flush(self, session_id: Optional[str] = None) -> None:
+        """Commits queued write-behind events for one session, or for all sessions."""
+        with self._pending_lock:
+            session_ids = [session_id] if session_id else list(self._pending_events)
+            to_commit = [(sid, self._pending_events.pop(sid)) for sid in session_ids if self._pending_events.get(sid)]
+        for sid, events in to_commit:
+            await asyncio.to_thread(self._commit_events, sid, events)
+
+    def _flush_session_sync(self, session_id: str) -> None:
+        """Commits queued events for `session_id` from inside a worker thread, before a read."""
+        with self._pending_lock:
+            events = self._pending_events.pop(session_id, None)
+        if events:
+            self._commit_events(session_id, events)
+
+    def _commit_events(self, session_id: str, events: list) -> None:
+        """
+        Writes (doc ref, encoded event, event) triples in grouped batches, updating
+        the session timestamp, event counters and state (merged with the events'
+        state deltas) once per flush, and writes the events through to the
+        session cache.
+        """
+        logger.info("Committing %d event(s) to Firestore for session '%s'...", len(events), session_id)
+        try:
+            if self._blob_store:
+                events = [
+                    (event_doc_ref, offload_event_payloads(
+                        self._blob_store, session_id, event_doc_ref.id, event_data_dict, self._blob_threshold_bytes
+                    ), event)
+                    for event_doc_ref, event_data_dict, event in events
+                ]
+            session_ref = self._db.collection(SESSIONS_COLLECTION).document(session_id)
+            # Leave room in the last batch for the session document update.
+            chunk_size = MAX_BATCH_WRITES - 1
+            for start in range(0, len(events), chunk_size):
+                batch = self._db.batch()
+                chunk = events[start:start + chunk_size]
+                for event_doc_ref, event_data_dict, _ in chunk:
+                    batch.set(event_doc_ref, event_data_dict)
+                if start + chunk_size >= len(events):
+                    # Update the session document's timestamp, event counters and state in the same batch.
+                    batch.update(session_ref, {
+                        **state_delta_updates([event_data_dict for _, event_data_dict, _ in events]),
+                        "updateTime": firestore.SERVER_TIMESTAMP,
+                        EVENT_COUNT_FIELD: firestore.Increment(len(events)),
+                        EVENT_BYTES_FIELD: firestore.Increment(
+                            sum(_estimate_event_bytes(event_data_dict) for _, event_data_dict, _ in events)
+                        ),
+                    })
+                write_results = batch.commit()
+            if self.session_cache:
+                # The session document update is the last write of the last batch.
+                self.session_cache.append_events(
+                    session_id, write_results[-1].update_time, [event for _, _, event in events]
                 )
-        
-        await asyncio.to_thread(_append_in_firestore)
-        return event
+            logger.info("Batch committed successfully for session '%s'.", session_id)
+        except Exception as e:
+            # Log any exception that occurs during the process.
+            logger.error(
+                "!!! Exception in _commit_events for session '%s': %s",
+                session_id,
+                e,
+                exc_info=True
+            )
 
-def _convert_event_to_json(event: Event) -> Dict[str, Any]:
-  """Serializes an Event object into a JSON-compatible dictionary."""
-  metadata_json = {
-      'partial': event.partial,
-      'turn_complete': event.turn_complete,
-      'interrupted': event.interrupted,
-      'branch': event.branch,
-      'long_running_tool_ids': (
-          list(event.long_running_tool_ids)
-          if event.long_running_tool_ids
-          else None
-      ),
-  }
-  if event.grounding_metadata:
-    metadata_json['grounding_metadata'] = event.grounding_metadata.model_dump(
-        exclude_none=True, mode='json'
-    )
-
-  event_json = {
-      'author': event.author,
-      'invocation_id': event.invocation_id,
-      'timestamp': {
-          'seconds': int(event.timestamp),
-          'nanos': int(
-              (event.timestamp - int(event.timestamp)) * 1_000_000_000
-          ),
-      },
-      'error_code': event.error_code,
-      'error_message': event.error_message,
-      'event_metadata': metadata_json,
-  }
-
-  if event.actions:
-    actions_json = {
-        'skip_summarization': event.actions.skip_summarization,
-        'state_delta': event.actions.state_delta,
-        'artifact_delta': event.actions.artifact_delta,
-        'transfer_agent': event.actions.transfer_to_agent,
-        'escalate': event.actions.escalate,
-        'requested_auth_configs': event.actions.requested_auth_configs,
+def apply_state_deltas(state: Dict[str, Any], event_dicts: list) -> None:
+  """Applies the persisted (non-temp) state deltas of time-ordered event documents to `state`."""
+  for event_dict in event_dicts:
+    for key, value in decode_state_delta(event_dict).items():
+      if not key.startswith(State.TEMP_PREFIX):
+        state[key] = value
+
+
+def encode_page_token(update_time: DatetimeWithNanoseconds, session_id: str) -> str:
+  """
+  Encodes the cursor after a listed session: its update time (at full precision)
+  and ID, so the token stays valid if that session is deleted meanwhile.
+  """
+  cursor = {"updateTime": update_time.rfc3339(), "id": session_id}
+  return base64.urlsafe_b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii")
+
+
+def decode_page_token(page_token: str) -> Dict[str, Any]:
+  """Decodes a page token into start_after cursor values. Raises ValueError if it is malformed."""
+  try:
+    cursor = json.loads(base64.urlsafe_b64decode(page_token.encode("ascii")))
+    return {
+        "updateTime": DatetimeWithNanoseconds.from_rfc3339(cursor["updateTime"]),
+        FieldPath.document_id(): cursor["id"],
     }
-    event_json['actions'] = actions_json
-  if event.content:
-    content_dict = event.content.model_dump(exclude_none=True, mode='json')
-    if event.author == "user" and 'parts' in content_dict:
-        new_parts = []
-        for part in content_dict['parts']:
-            # Check for inline_data which is how `Part.from_data` stores the PDF
-            if 'inline_data' in part and part['inline_data'].get('mime_type') == 'application/pdf':
-                # Replace the large PDF data with a placeholder text
-                new_parts.append({'text': '[PDF content omitted from history]'})
-            else:
-                new_parts.append(part)
-        content_dict['parts'] = new_parts
-    event_json['content'] = content_dict
-  if event.error_code:
-    event_json['error_code'] = event.error_code
-  if event.error_message:
-    event_json['error_message'] = event.error_message
-  return event_json
-
-
-def _from_firestore_doc_to_event(doc: firestore.DocumentSnapshot) -> Event:
-  """Deserializes a Firestore document into an Event object."""
-  event_dict = doc.to_dict()
-  event_actions = EventActions()
-  if event_dict.get('actions', None):
-    actions_data = event_dict['actions']
-    event_actions = EventActions(
-        skip_summarization=actions_data.get('skipSummarization', None),
-        state_delta=actions_data.get('stateDelta', {}),
-        artifact_delta=actions_data.get('artifactDelta', {}),
-        transfer_to_agent=actions_data.get('transferAgent', None),
-        escalate=actions_data.get('escalate', None),
-        requested_auth_configs=actions_data.get(
-            'requestedAuthConfigs', {}
-        ),
-    )
-
-  ts_map = event_dict['timestamp']
-  timestamp_float = ts_map['seconds'] + ts_map.get('nanos', 0) / 1_000_000_000
-
-  event = Event(
-      id=doc.id,
-      invocation_id=event_dict['invocation_id'],
-      author=event_dict['author'],
-      actions=event_actions,
-      content=_session_util.decode_content(event_dict.get('content', None)),
-      timestamp=timestamp_float,
-      error_code=event_dict.get('error_code', None),
-      error_message=event_dict.get('error_message', None),
-  )
-
-  if event_dict.get('event_metadata', None):
-    metadata = event_dict['event_metadata']
-    long_running_tool_ids_list = metadata.get(
-        'long_running_tool_ids', None
-    )
-    event.partial = metadata.get('partial', None)
-    event.turn_complete = metadata.get('turn_complete', None)
-    event.interrupted = metadata.get('interrupted', None)
-    event.branch = metadata.get('branch', None)
-    event.grounding_metadata = _session_util.decode_grounding_metadata(
-        metadata.get('grounding_metadata', None)
-    )
-    event.long_running_tool_ids = (
-        set(long_running_tool_ids_list) if long_running_tool_ids_list else None
-    )
-
-  return event
+  except (ValueError, KeyError, TypeError) as e:
+    raise ValueError(f"Invalid page token: {page_token!r}") from e
+
+
+def state_delta_updates(event_dicts: list) -> Dict[str, Any]:
+  """
+  Returns session document updates that merge the persisted (non-temp) state
+  deltas of time-ordered event documents into the document's `state`.
+  """
+  state_delta: Dict[str, Any] = {}
+  apply_state_deltas(state_delta, event_dicts)
+  return {FieldPath("state", key).to_api_repr(): value for key, value in state_delta.items()}
+
+
+def _filter_events(events: list, config: Optional[GetSessionConfig]) -> list:
+  """Applies a GetSessionConfig to an in-memory, time-ordered event list."""
+  if config:
+    if config.num_recent_events:
+      return events[-config.num_recent_events:]
+    if config.after_timestamp:
+      return [event for event in events if event.timestamp > config.after_timestamp]
+  return events
+
+
+def _estimate_event_bytes(event_data_dict: Dict[str, Any]) -> int:
+  """Approximates the stored size of an event document."""
+  return len(json.dumps(event_data_dict, default=str))
+
+
+def _backfill_event_times(db: firestore.Client, session_ref: firestore.DocumentReference) -> None:
+  """
+  Adds EVENT_TIME_FIELD to events written before it existed, records the
+  event counters used for compaction, then marks the session indexed.
+  """
+  logger.info("Backfilling event times for session '%s'", session_ref.id)
+  batch = db.batch()
+  pending_writes = 0
+  event_count = 0
+  event_bytes = 0
+  for doc in session_ref.collection(EVENTS_SUBCOLLECTION).stream():
+    event_dict = doc.to_dict()
+    event_count += 1
+    event_bytes += _estimate_event_bytes(event_dict)
+    if EVENT_TIME_FIELD in event_dict:
+      continue
+    ts_map = event_dict['timestamp']
+    batch.update(doc.reference, {
+        EVENT_TIME_FIELD: ts_map['seconds'] + ts_map.get('nanos', 0) / 1_000_000_000
+    })
+    pending_writes += 1
+    if pending_writes == MAX_BATCH_WRITES - 1:
+      batch.commit()
+      batch = db.batch()
+      pending_writes = 0
+  batch.update(session_ref, {
+      EVENT_TIME_INDEXED_FIELD: True,
+      EVENT_COUNT_FIELD: event_count,
+      EVENT_BYTES_FIELD: event_bytes,
+  })
+  batch.commit()
+
+
+def _backfill_event_state(db: firestore.Client, session_ref: firestore.DocumentReference) -> Dict[str, Any]:
+  """
+  Folds the state deltas of a session written before commits merged them into
+  the session document: document state, then the snapshot's folded state, then
+  the remaining events' deltas in order. Runs in a transaction on the session
+  document, so commits made meanwhile are merged on top of the result. Returns
+  the session state.
+  """
+  @firestore.transactional
+  def _fold(transaction):
+    session_dict = session_ref.get(transaction=transaction).to_dict()
+    if session_dict.get(EVENT_STATE_MERGED_FIELD):
+      return session_dict.get("state", {})
+    logger.info("Folding event state into session '%s'", session_ref.id)
+    state = dict(session_dict.get("state", {}))
+    events_query = session_ref.collection(EVENTS_SUBCOLLECTION).order_by(EVENT_TIME_FIELD)
+    watermark = session_dict.get(SNAPSHOT_WATERMARK_FIELD)
+    if watermark is not None:
+      snapshot_doc = session_ref.collection(SNAPSHOT_SUBCOLLECTION).document(SNAPSHOT_DOCUMENT).get(
+          transaction=transaction
+      )
+      if snapshot_doc.exists:
+        state.update(snapshot_doc.to_dict().get("state", {}))
+      events_query = events_query.where(filter=FieldFilter(EVENT_TIME_FIELD, ">", watermark))
+    delta_dicts = [
+        doc.to_dict()
+        for doc in events_query.select(STATE_DELTA_FIELD_PATHS).stream(transaction=transaction)
+    ]
+    apply_state_deltas(state, delta_dicts)
+    transaction.update(session_ref, {"state": state, EVENT_STATE_MERGED_FIELD: True})
+    return state
+
+  return _fold(db.transaction())
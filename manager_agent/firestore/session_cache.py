@@ -0,0 +1,76 @@
+"""
+Per-process cache of sessions read from Firestore.
+
+Entries are keyed by session ID and tagged with the `update_time` of the
+session document they were loaded at. Every write to a session (event commit,
+compaction) touches that document, so a cached session is only served while
+the document's `update_time` still matches, and any other worker's write is
+picked up on the next read. Sessions are copied on the way in and out, so
+callers can mutate what they get back.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from google.adk.events.event import Event
+from google.adk.sessions import Session, State
+
+
+class SessionCache:
+    """A thread-safe LRU cache of sessions with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_sec: float):
+        self._max_entries = max_entries
+        self._ttl_sec = ttl_sec
+        self._entries = OrderedDict()  # session_id -> (expires_at, update_time, session)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str, update_time: Any) -> Optional[Session]:
+        """Returns a copy of the cached session if it was loaded at `update_time` and has not expired."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and time.monotonic() <= entry[0] and entry[1] == update_time:
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                return entry[2].model_copy(deep=True)
+            if entry is not None:
+                del self._entries[session_id]
+            self.misses += 1
+            return None
+
+    def put(self, session_id: str, update_time: Any, session: Session) -> None:
+        with self._lock:
+            self._store(session_id, update_time, session.model_copy(deep=True))
+
+    def append_events(self, session_id: str, update_time: Any, events: List[Event]) -> None:
+        """
+        Writes committed events, and their persisted state deltas, through to a
+        cached session, retagging it with the new `update_time`.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            session = entry[2]
+            session.events.extend(event.model_copy(deep=True) for event in events)
+            for event in events:
+                for key, value in event.actions.state_delta.items():
+                    if not key.startswith(State.TEMP_PREFIX):
+                        session.state[key] = value
+            session.last_update_time = update_time.timestamp()
+            self._store(session_id, update_time, session)
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def _store(self, session_id: str, update_time: Any, session: Session) -> None:
+        self._entries[session_id] = (time.monotonic() + self._ttl_sec, update_time, session)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
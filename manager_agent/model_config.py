@@ -0,0 +1,127 @@
+"""
+Per-agent model routing and latency budgets.
+
+Each LLM agent gets its model from `agent_model_kwargs(agent_name, ...)`. The
+code default can be overridden per agent through the environment, without
+code changes:
+
+  MODEL_<AGENT>               model the agent runs on
+  FALLBACK_MODEL_<AGENT>      faster model used once the budget is exceeded
+                              (default AGENT_FALLBACK_MODEL)
+  LATENCY_BUDGET_SEC_<AGENT>  stage latency budget; 0 disables the fallback
+
+<AGENT> is the agent name in upper case, e.g. MODEL_PITCH_DECK_EXTRACTOR or
+LATENCY_BUDGET_SEC_MARKET_RESEARCHER.
+
+A stage's clock starts when the agent starts. Model calls made after the
+budget is used up (further tool-use turns, or the final answer) go to the
+fallback model. A call that is already running is not interrupted. When the
+agent finishes, its model, fallback use and latency are recorded in session
+state under `stage_meta_<agent>`, next to the stage's output.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("google_adk." + __name__)
+
+# --- Configuration ---
+DEFAULT_MODEL = os.environ.get("AGENT_MODEL_DEFAULT", "gemini-2.5-pro")
+FAST_MODEL = os.environ.get("AGENT_FAST_MODEL", "gemini-2.5-flash")
+FALLBACK_MODEL = os.environ.get("AGENT_FALLBACK_MODEL", FAST_MODEL)
+# --------------------
+
+STAGE_META_PREFIX = "stage_meta_"
+# Open stages are keyed by (invocation_id, agent_name); this bounds them if an agent never finishes.
+_MAX_OPEN_STAGES = 1024
+
+
+def _env(setting, agent_name):
+    return os.environ.get(f"{setting}_{agent_name.upper()}")
+
+
+class _Stage:
+    def __init__(self, model, budget_sec):
+        self.started_at = time.monotonic()
+        self.model = model
+        self.budget_sec = budget_sec
+        self.model_calls = 0
+        self.fallback_calls = 0
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+
+class StageRouter:
+    """Times one agent's stages and switches its model calls to the fallback model once the budget is exceeded."""
+
+    def __init__(self, agent_name, model, fallback_model, latency_budget_sec):
+        self.agent_name = agent_name
+        self.model = model
+        self.fallback_model = fallback_model
+        self.latency_budget_sec = latency_budget_sec
+        self._stages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def before_agent(self, callback_context):
+        with self._lock:
+            self._stages[callback_context.invocation_id] = _Stage(self.model, self.latency_budget_sec)
+            while len(self._stages) > _MAX_OPEN_STAGES:
+                self._stages.popitem(last=False)
+        return None
+
+    def before_model(self, callback_context, llm_request):
+        with self._lock:
+            stage = self._stages.get(callback_context.invocation_id)
+        if stage is None:
+            return None
+        stage.model_calls += 1
+        if (
+            self.latency_budget_sec
+            and self.fallback_model != self.model
+            and stage.elapsed() > self.latency_budget_sec
+        ):
+            if not stage.fallback_calls:
+                logger.warning(
+                    "%s exceeded its %.0fs latency budget (%.1fs); falling back to %s",
+                    self.agent_name, self.latency_budget_sec, stage.elapsed(), self.fallback_model,
+                )
+            stage.fallback_calls += 1
+            llm_request.model = self.fallback_model
+        return None
+
+    def after_agent(self, callback_context):
+        with self._lock:
+            stage = self._stages.pop(callback_context.invocation_id, None)
+        if stage is None:
+            return None
+        meta = {
+            "model": stage.model,
+            "fallback_model": self.fallback_model if stage.fallback_calls else None,
+            "model_calls": stage.model_calls,
+            "fallback_calls": stage.fallback_calls,
+            "latency_sec": round(stage.elapsed(), 2),
+            "latency_budget_sec": stage.budget_sec or None,
+        }
+        callback_context.state[STAGE_META_PREFIX + self.agent_name] = meta
+        logger.info("Stage %s finished: %s", self.agent_name, meta)
+        return None
+
+
+def agent_model_kwargs(agent_name, default_model=DEFAULT_MODEL, latency_budget_sec=0):
+    """
+    Returns the `model` and callback keyword arguments for an `Agent` named
+    `agent_name`, applying any environment overrides to the given defaults.
+    """
+    model = _env("MODEL", agent_name) or default_model
+    fallback_model = _env("FALLBACK_MODEL", agent_name) or FALLBACK_MODEL
+    budget = _env("LATENCY_BUDGET_SEC", agent_name)
+    router = StageRouter(agent_name, model, fallback_model, float(budget) if budget is not None else latency_budget_sec)
+    return {
+        "model": model,
+        "before_agent_callback": router.before_agent,
+        "before_model_callback": router.before_model,
+        "after_agent_callback": router.after_agent,
+    }
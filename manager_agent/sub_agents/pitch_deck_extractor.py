@@ -1,11 +1,15 @@
 from google.adk.agents import Agent
+from model_config import FAST_MODEL, agent_model_kwargs
 
 pitch_deck_extractor_agent = Agent(
     name="pitch_deck_extractor",
-    model="gemini-2.5-pro",
-    description="Extracts key claims and data from a pitch deck PDF.",
+    # Purely extractive, so it runs on the fast model.
+    **agent_model_kwargs("pitch_deck_extractor", default_model=FAST_MODEL, latency_budget_sec=60),
+    description="Extracts key claims and data from a pitch deck, given as a PDF or as its extracted page text.",
     instruction="""
     You are a specialized AI assistant. Your only task is to analyze the provided pitch deck document.
+    The deck is provided either as a PDF or as text extracted from it, split into "--- Page N ---" sections;
+    treat both the same way. Extracted text may lose slide layout, so rely on headings and page order for context.
     Read the document and extract the key claims made by the founders regarding the following areas:
     - Team
     - Problem
@@ -18,4 +22,5 @@ pitch_deck_extractor_agent = Agent(
     Output the extracted information as a structured JSON object. Do not use any external knowledge.
     """,
     tools=[],
+    output_key="deck_claims",
 )
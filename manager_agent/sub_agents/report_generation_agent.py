@@ -1,4 +1,5 @@
 from google.adk.agents import Agent
+from model_config import agent_model_kwargs
 import pydantic
 from typing import List, Optional
 
@@ -52,12 +53,14 @@ class InvestmentMemo(pydantic.BaseModel):
 
 report_generation_agent = Agent(
     name="report_generation_agent",
-    model="gemini-2.5-pro",
+    **agent_model_kwargs("report_generation_agent", latency_budget_sec=120),
     description="Synthesizes pitch deck data and web research into a final investment memo.",
     instruction="""
     You are a senior VC partner. You will be given two JSON objects:
-    1. The original claims extracted from a pitch deck.
-    2. The enriched data and verifications from a research analyst.
+    1. The original claims extracted from a pitch deck:
+    {deck_claims}
+    2. The enriched data and verifications from a research analyst:
+    {web_research}
 
     Your task is to synthesize all of this information into a final, comprehensive investment memo.
     Where the internal claims and external research differ, you must highlight the discrepancy in your analysis.
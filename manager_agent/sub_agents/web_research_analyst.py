@@ -1,19 +1,78 @@
-from google.adk.agents import Agent
-from google.adk.tools import google_search
+from google.adk.agents import Agent, ParallelAgent, SequentialAgent
+from model_config import agent_model_kwargs
+from tools.profile_enrichment import enrich_founder_profiles
+from tools.search_cache import SEARCH_MAX_PER_AGENT, web_search
 
-web_research_analyst_agent = Agent(
-    name="web_research_analyst",
-    model="gemini-2.5-pro",
-    description="Researches and verifies information from a pitch deck using Google.",
+# Each topic is researched by its own agent, all running in parallel, so the
+# stage takes about as long as the slowest topic. Findings land in session
+# state under `research_<topic>` and are merged into `web_research`.
+RESEARCH_TOPICS = {
+    "market": "Verify the market size (TAM/SAM) and growth rate claimed in the deck against industry reports and public data.",
+    "competitors": "Research the named competitors and find notable competitors the deck does not mention, with their funding and positioning.",
+    "founders": "Find the professional backgrounds of the founders: prior companies, roles, education and relevant domain experience. "
+                "If you know founders' profile URLs (e.g. LinkedIn), read them with the enrich_founder_profiles tool in a single call.",
+    "traction": "Look for news articles, press releases or public data about the company's traction, customers, partnerships and funding history.",
+}
+
+
+# Tools beyond web_search, per topic.
+RESEARCH_EXTRA_TOOLS = {
+    "founders": [enrich_founder_profiles],
+}
+
+
+def make_topic_researcher(topic: str, focus: str, max_searches: int = SEARCH_MAX_PER_AGENT) -> Agent:
+    """Builds a researcher that verifies one topic of the deck's claims with its own search budget."""
+    name = f"{topic}_researcher"
+    return Agent(
+        name=name,
+        **agent_model_kwargs(name, latency_budget_sec=90),
+        description=f"Researches the {topic} claims of a pitch deck using Google.",
+        instruction=f"""
+    You are a research analyst covering a single topic: {topic}.
+    These are the claims extracted from a startup's pitch deck:
+
+    {{deck_claims}}
+
+    Your task: {focus}
+    Use the web_search tool at most {max_searches} times; stop searching once the claims are verified or refuted.
+    Output a JSON object with the keys "topic" ("{topic}"), "findings" (a list of objects with "claim",
+    "verdict" ("verified", "contradicted" or "unverified"), "evidence" and "sources" (URLs)) and
+    "additional_information". Cite every source with its URL. Do not research other topics.
+    """,
+        tools=[web_search, *RESEARCH_EXTRA_TOOLS.get(topic, [])],
+        output_key=f"research_{topic}",
+    )
+
+
+web_research_fanout_agent = ParallelAgent(
+    name="web_research_fanout",
+    sub_agents=[make_topic_researcher(topic, focus) for topic, focus in RESEARCH_TOPICS.items()],
+    description="Researches market size, competitors, founders and traction in parallel.",
+)
+
+research_merge_agent = Agent(
+    name="research_merge_agent",
+    **agent_model_kwargs("research_merge_agent", latency_budget_sec=60),
+    description="Merges per-topic research findings into one enriched JSON object.",
     instruction="""
-    You are a research analyst. You will be given a JSON object containing claims from a startup's pitch deck.
-    Your task is to use the google_search tool to independently verify these claims and find additional, publicly available information.
-    Focus on:
-    - Verifying the market size.
-    - Researching the named competitors and finding any unmentioned ones.
-    - Finding the professional backgrounds of the founders.
-    - Looking for any news articles or public data related to the company's traction.
-    Output your findings as a new, enriched JSON object. Clearly cite your sources with URLs in your output.
+    You are a research lead. Your analysts researched a startup's pitch deck claims in parallel, one topic each:
+
+    Market: {research_market}
+    Competitors: {research_competitors}
+    Founders: {research_founders}
+    Traction: {research_traction}
+
+    Combine their findings into a single, enriched JSON object with one section per topic. Keep every cited source
+    URL with the finding it supports, remove duplicate findings, and list any contradictions between analysts.
+    Do not add information that is not in the findings above.
     """,
-    tools=[google_search],
-)
\ No newline at end of file
+    tools=[],
+    output_key="web_research",
+)
+
+web_research_analyst_agent = SequentialAgent(
+    name="web_research_analyst",
+    sub_agents=[web_research_fanout_agent, research_merge_agent],
+    description="Researches and verifies information from a pitch deck using Google, one topic per parallel researcher.",
+)
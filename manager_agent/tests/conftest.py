@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The agent modules import each other from the manager_agent directory (e.g. `from firestore...`).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
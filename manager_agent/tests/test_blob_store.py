@@ -0,0 +1,48 @@
+"""The blob store interface and deletion of the blobs referenced by offloaded events."""
+import os
+
+import pytest
+
+from firestore.blob_store import (
+    BLOB_REF_FIELD,
+    BlobStore,
+    LocalDirectoryBlobStore,
+    delete_event_payloads,
+    offload_event_payloads,
+)
+
+
+def _event_dict(text_bytes, grounding_bytes=0):
+    event_dict = {"content": {"role": "model", "parts": [{"text": "short"}, {"text": "x" * text_bytes}]}}
+    if grounding_bytes:
+        event_dict["event_metadata"] = {"grounding_metadata": {"webSearchQueries": ["q" * grounding_bytes]}}
+    return event_dict
+
+
+def test_stores_must_implement_every_method():
+    with pytest.raises(TypeError):
+        BlobStore()
+
+    class PutOnlyStore(BlobStore):
+        def put(self, key, data):
+            pass
+
+    with pytest.raises(TypeError):
+        PutOnlyStore()
+
+
+def test_referenced_blobs_of_dropped_events_are_deleted(tmp_path):
+    store = LocalDirectoryBlobStore(str(tmp_path))
+    dropped = [
+        offload_event_payloads(store, "session_1", "evt_1", _event_dict(4096, grounding_bytes=4096), 1024),
+        offload_event_payloads(store, "session_1", "evt_2", _event_dict(16), 1024),
+    ]
+    kept = offload_event_payloads(store, "session_1", "evt_3", _event_dict(4096), 1024)
+
+    assert delete_event_payloads(store, dropped) == 2
+    assert os.listdir(tmp_path / "session_1" / "evt_1") == []
+    assert os.listdir(tmp_path / "session_1" / "evt_3") == ["part_1.json.gz"]
+    assert store.get(kept["content"]["parts"][1][BLOB_REF_FIELD])
+    # Deleting again, or events without references, is a no-op.
+    assert delete_event_payloads(store, dropped) == 2
+    assert delete_event_payloads(store, [_event_dict(16)]) == 0
@@ -0,0 +1,207 @@
+"""
+Round-trip properties of the Firestore event codec, checked over randomly
+generated events: `decode_event(encode_event(e)) == e` for current documents,
+for documents written by the legacy (unversioned, snake_case) serializer, and
+for documents whose large payloads were offloaded to a blob store.
+
+Events are generated from fixed seeds, so a failure names a reproducible seed.
+"""
+import random
+import string
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.events.event_actions import EventActions  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from firestore.blob_store import (  # noqa: E402
+    BLOB_REF_FIELD,
+    LocalDirectoryBlobStore,
+    hydrate_event_payloads,
+    offload_event_payloads,
+)
+from firestore.event_codec import (  # noqa: E402
+    EVENT_TIME_FIELD,
+    PDF_PLACEHOLDER_TEXT,
+    SCHEMA_VERSION_FIELD,
+    decode_event,
+    decode_state_delta,
+    encode_event,
+)
+
+SEEDS = range(200)
+AUTHORS = ["user", "manager_agent", "investment_analysis_agent", "invester_query_agent"]
+MIME_TYPES = ["application/pdf", "image/png", "text/plain"]
+# Legacy serializer key for each stored action key; transfers were stored under either name.
+LEGACY_ACTION_KEYS = {
+    "skipSummarization": ["skip_summarization"],
+    "stateDelta": ["state_delta"],
+    "artifactDelta": ["artifact_delta"],
+    "transferAgent": ["transfer_agent", "transfer_to_agent"],
+    "escalate": ["escalate"],
+    "requestedAuthConfigs": ["requested_auth_configs"],
+}
+
+
+def random_text(rng, max_len=40):
+    alphabet = string.ascii_letters + string.digits + " _-.,{}\"'\n" + "₹é漢字🚀"
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+
+
+def random_key(rng):
+    return "".join(rng.choice(string.ascii_lowercase + "_") for _ in range(rng.randint(1, 12)))
+
+
+def random_json(rng, depth=0):
+    kinds = ["str", "int", "float", "bool", "none"] + (["list", "dict"] if depth < 3 else [])
+    kind = rng.choice(kinds)
+    if kind == "str":
+        return random_text(rng)
+    if kind == "int":
+        return rng.randint(-10**12, 10**12)
+    if kind == "float":
+        return rng.uniform(-1e6, 1e6)
+    if kind == "bool":
+        return rng.random() < 0.5
+    if kind == "none":
+        return None
+    if kind == "list":
+        return [random_json(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {random_key(rng): random_json(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+def random_part(rng):
+    kind = rng.choice(["text", "text", "inline_data", "function_call", "function_response"])
+    if kind == "text":
+        return types.Part(text=random_text(rng))
+    if kind == "inline_data":
+        data = rng.randbytes(rng.choice([0, 16, 512, 4096]))
+        return types.Part(inline_data=types.Blob(mime_type=rng.choice(MIME_TYPES), data=data))
+    call_id = f"call_{rng.randint(0, 999)}"
+    if kind == "function_call":
+        args = {random_key(rng): random_json(rng) for _ in range(rng.randint(0, 3))}
+        return types.Part(function_call=types.FunctionCall(id=call_id, name=random_key(rng), args=args))
+    response = {random_key(rng): random_json(rng) for _ in range(rng.randint(0, 3))}
+    return types.Part(function_response=types.FunctionResponse(id=call_id, name=random_key(rng), response=response))
+
+
+def random_actions(rng):
+    fields = {}
+    if rng.random() < 0.3:
+        fields["skip_summarization"] = rng.random() < 0.5
+    if rng.random() < 0.6:
+        fields["state_delta"] = {random_key(rng): random_json(rng) for _ in range(rng.randint(1, 5))}
+    if rng.random() < 0.3:
+        fields["artifact_delta"] = {f"{random_key(rng)}.pdf": rng.randint(0, 20) for _ in range(rng.randint(1, 3))}
+    if rng.random() < 0.3:
+        fields["transfer_to_agent"] = rng.choice(AUTHORS[1:])
+    if rng.random() < 0.2:
+        fields["escalate"] = rng.random() < 0.5
+    return EventActions(**fields)
+
+
+def random_event(rng):
+    fields = {
+        "id": f"evt_{rng.getrandbits(48):x}",
+        "invocation_id": f"inv_{rng.randint(0, 99)}",
+        "author": rng.choice(AUTHORS),
+        "timestamp": rng.uniform(1.5e9, 2e9),
+        "actions": random_actions(rng),
+    }
+    if rng.random() < 0.9:
+        fields["content"] = types.Content(
+            role=rng.choice(["user", "model", None]),
+            parts=[random_part(rng) for _ in range(rng.randint(1, 4))],
+        )
+    if rng.random() < 0.2:
+        fields["error_code"] = rng.choice(["SAFETY", "MAX_TOKENS"])
+        fields["error_message"] = random_text(rng)
+    if rng.random() < 0.5:
+        fields["partial"] = rng.random() < 0.5
+        fields["turn_complete"] = rng.random() < 0.5
+        fields["interrupted"] = rng.random() < 0.5
+        fields["branch"] = rng.choice([None, "manager_agent.investment_analysis_agent"])
+    if rng.random() < 0.2:
+        fields["long_running_tool_ids"] = {f"call_{rng.randint(0, 999)}" for _ in range(rng.randint(1, 3))}
+    if rng.random() < 0.2:
+        fields["grounding_metadata"] = types.GroundingMetadata(
+            web_search_queries=[random_text(rng) for _ in range(rng.randint(1, 3))],
+        )
+    return Event(**fields)
+
+
+def expected_event(event):
+    """The event as it should read back: inline PDFs sent by the user are replaced by a placeholder."""
+    if event.author != "user" or not event.content or not event.content.parts:
+        return event
+    parts = [
+        types.Part(text=PDF_PLACEHOLDER_TEXT)
+        if part.inline_data is not None and part.inline_data.mime_type == "application/pdf"
+        else part
+        for part in event.content.parts
+    ]
+    return event.model_copy(update={"content": types.Content(role=event.content.role, parts=parts)})
+
+
+def legacy_document(rng, event):
+    """Rewrites an encoded event the way the unversioned serializer stored it."""
+    doc = encode_event(event)
+    del doc[SCHEMA_VERSION_FIELD]
+    del doc[EVENT_TIME_FIELD]
+    if "actions" in doc:
+        doc["actions"] = {rng.choice(LEGACY_ACTION_KEYS[key]): value for key, value in doc["actions"].items()}
+    return doc
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_round_trip(seed):
+    event = random_event(random.Random(seed))
+    assert decode_event(event.id, encode_event(event)) == expected_event(event)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_legacy_documents_decode(seed):
+    rng = random.Random(seed)
+    event = random_event(rng)
+    decoded = decode_event(event.id, legacy_document(rng, event))
+    # Legacy documents only kept the timestamp as seconds and nanoseconds.
+    assert decoded.timestamp == pytest.approx(event.timestamp, abs=1e-6)
+    assert decoded.model_copy(update={"timestamp": event.timestamp}) == expected_event(event)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_offloaded_payloads_round_trip(seed, tmp_path):
+    rng = random.Random(seed)
+    event = random_event(rng)
+    store = LocalDirectoryBlobStore(str(tmp_path))
+    doc = offload_event_payloads(store, "session_1", event.id, encode_event(event), rng.choice([0, 64, 1024]))
+    hydrate_event_payloads(store, [doc])
+    assert decode_event(event.id, doc) == expected_event(event)
+
+
+def test_large_parts_are_offloaded(tmp_path):
+    event = Event(
+        id="evt_blob", invocation_id="inv_1", author="investment_analysis_agent", timestamp=1760000000.5,
+        content=types.Content(role="model", parts=[
+            types.Part(text="short"),
+            types.Part(inline_data=types.Blob(mime_type="image/png", data=random.Random(0).randbytes(4096))),
+        ]),
+    )
+    store = LocalDirectoryBlobStore(str(tmp_path))
+    doc = offload_event_payloads(store, "session_1", event.id, encode_event(event), 1024)
+    parts = doc["content"]["parts"]
+    assert parts[0] == {"text": "short"}
+    assert parts[1].keys() == {BLOB_REF_FIELD}
+    hydrate_event_payloads(store, [doc])
+    assert decode_event(event.id, doc) == event
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_state_delta_of_any_schema_version(seed):
+    rng = random.Random(seed)
+    event = random_event(rng)
+    assert decode_state_delta(encode_event(event)) == event.actions.state_delta
+    assert decode_state_delta(legacy_document(rng, event)) == event.actions.state_delta
@@ -0,0 +1,80 @@
+"""
+Session deletion against the Firestore emulator. Run with
+FIRESTORE_EMULATOR_HOST set (e.g. `gcloud emulators firestore start`).
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("google.cloud.firestore")
+pytest.importorskip("google.adk")
+if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+    pytest.skip("FIRESTORE_EMULATOR_HOST is not set", allow_module_level=True)
+
+from firestore.firestore_session_service import (  # noqa: E402
+    ARCHIVED_EVENTS_SUBCOLLECTION,
+    EVENTS_SUBCOLLECTION,
+    SESSIONS_COLLECTION,
+    SNAPSHOT_SUBCOLLECTION,
+    FirestoreSessionService,
+)
+
+APP_NAME = "delete_test_app"
+
+
+@pytest.fixture
+def service():
+    return FirestoreSessionService(project="demo-ventureai")
+
+
+def _create_sessions(service, user_id, count, events_per_session=3):
+    session_ids = []
+    for _ in range(count):
+        session = asyncio.run(service.create_session(app_name=APP_NAME, user_id=user_id))
+        session_ref = service._db.collection(SESSIONS_COLLECTION).document(session.id)
+        for i in range(events_per_session):
+            session_ref.collection(EVENTS_SUBCOLLECTION).document().set({"event_time": float(i)})
+        session_ref.collection(SNAPSHOT_SUBCOLLECTION).document("latest").set({"state": {}})
+        session_ref.collection(ARCHIVED_EVENTS_SUBCOLLECTION).document().set({"event_time": -1.0})
+        session_ids.append(session.id)
+    return session_ids
+
+
+def _assert_deleted(service, session_ids):
+    for session_id in session_ids:
+        session_ref = service._db.collection(SESSIONS_COLLECTION).document(session_id)
+        assert not session_ref.get().exists
+        for name in (EVENTS_SUBCOLLECTION, SNAPSHOT_SUBCOLLECTION, ARCHIVED_EVENTS_SUBCOLLECTION):
+            assert list(session_ref.collection(name).limit(1).stream()) == []
+
+
+def test_delete_sessions_for_user_deletes_every_session(service):
+    user_id = f"user-{uuid.uuid4()}"
+    other_user_id = f"user-{uuid.uuid4()}"
+    session_ids = _create_sessions(service, user_id, 3)
+    kept_ids = _create_sessions(service, other_user_id, 1)
+    progress = []
+
+    deleted = asyncio.run(service.delete_sessions_for_user(
+        app_name=APP_NAME, user_id=user_id, on_progress=lambda s, d: progress.append((s, d)),
+    ))
+
+    assert deleted == 3
+    _assert_deleted(service, session_ids)
+    # Three sessions, each with three events, a snapshot and an archived event.
+    assert progress[-1] == (3, 3 * 6)
+    assert service._db.collection(SESSIONS_COLLECTION).document(kept_ids[0]).get().exists
+
+
+def test_purge_older_than_deletes_every_matching_session(service):
+    session_ids = _create_sessions(service, f"user-{uuid.uuid4()}", 2)
+
+    deleted = asyncio.run(service.purge_older_than(
+        app_name=APP_NAME, older_than=datetime.now(timezone.utc) + timedelta(minutes=1),
+    ))
+
+    assert deleted >= 2
+    _assert_deleted(service, session_ids)
@@ -0,0 +1,61 @@
+"""
+Session list paging. Page tokens are checked offline; paging itself runs
+against the Firestore emulator when FIRESTORE_EMULATOR_HOST is set.
+"""
+import asyncio
+import os
+import uuid
+from datetime import timezone
+
+import pytest
+
+pytest.importorskip("google.cloud.firestore")
+pytest.importorskip("google.adk")
+
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds  # noqa: E402
+
+from firestore.firestore_session_service import (  # noqa: E402
+    FirestoreSessionService,
+    decode_page_token,
+    encode_page_token,
+)
+
+APP_NAME = "list_test_app"
+
+
+@pytest.fixture
+def service():
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        pytest.skip("FIRESTORE_EMULATOR_HOST is not set")
+    return FirestoreSessionService(project="demo-ventureai")
+
+
+def test_page_tokens_keep_the_full_update_time():
+    update_time = DatetimeWithNanoseconds(2026, 10, 18, 1, 2, 3, nanosecond=123456789, tzinfo=timezone.utc)
+
+    cursor = decode_page_token(encode_page_token(update_time, "session_1"))
+
+    assert cursor["updateTime"].nanosecond == 123456789
+    assert cursor["__name__"] == "session_1"
+
+
+@pytest.mark.parametrize("page_token", ["session_1", "not base64!", "e30="])
+def test_malformed_page_tokens_are_rejected(page_token):
+    with pytest.raises(ValueError):
+        decode_page_token(page_token)
+
+
+def test_paging_survives_deletion_of_the_token_session(service):
+    user_id = f"user-{uuid.uuid4()}"
+    created = [asyncio.run(service.create_session(app_name=APP_NAME, user_id=user_id)).id for _ in range(5)]
+
+    first, token = asyncio.run(service.list_sessions_page(app_name=APP_NAME, user_id=user_id, limit=2))
+    asyncio.run(service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=first.sessions[-1].id))
+    listed = [session.id for session in first.sessions]
+    while token:
+        page, token = asyncio.run(service.list_sessions_page(
+            app_name=APP_NAME, user_id=user_id, limit=2, page_token=token,
+        ))
+        listed.extend(session.id for session in page.sessions)
+
+    assert sorted(listed) == sorted(created)
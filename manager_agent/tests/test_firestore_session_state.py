@@ -0,0 +1,117 @@
+"""
+Session state and compaction counters against the Firestore emulator. Run with
+FIRESTORE_EMULATOR_HOST set (e.g. `gcloud emulators firestore start`).
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+pytest.importorskip("google.cloud.firestore")
+pytest.importorskip("google.adk")
+if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+    pytest.skip("FIRESTORE_EMULATOR_HOST is not set", allow_module_level=True)
+
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.events.event_actions import EventActions  # noqa: E402
+from google.adk.sessions.base_session_service import GetSessionConfig  # noqa: E402
+from google.cloud import firestore  # noqa: E402
+
+from google.genai import types  # noqa: E402
+
+from firestore.blob_store import LocalDirectoryBlobStore  # noqa: E402
+from firestore.firestore_session_service import (  # noqa: E402
+    EVENT_COUNT_FIELD,
+    EVENT_STATE_MERGED_FIELD,
+    EVENTS_SUBCOLLECTION,
+    SESSIONS_COLLECTION,
+    FirestoreSessionService,
+)
+
+APP_NAME = "state_test_app"
+
+
+@pytest.fixture
+def service():
+    return FirestoreSessionService(project="demo-ventureai", compaction_keep_recent_events=2)
+
+
+def _append(service, session, state_delta):
+    event = Event(author="state_test_agent", invocation_id="inv_1", actions=EventActions(state_delta=state_delta))
+    asyncio.run(service.append_event(session, event))
+
+
+def _get(service, session, **config):
+    return asyncio.run(service.get_session(
+        app_name=APP_NAME, user_id=session.user_id, session_id=session.id,
+        config=GetSessionConfig(**config) if config else None,
+    ))
+
+
+def test_commits_merge_state_deltas_into_the_session_document(service):
+    session = asyncio.run(service.create_session(app_name=APP_NAME, user_id=f"user-{uuid.uuid4()}", state={"x": 0}))
+    _append(service, session, {"a": 1})
+    _append(service, session, {"b": 2, "temp:scratch": 1})
+    _append(service, session, {"a": 3})
+
+    stored = service._db.collection(SESSIONS_COLLECTION).document(session.id).get().to_dict()
+    assert stored["state"] == {"x": 0, "a": 3, "b": 2}
+
+    recent = _get(service, session, num_recent_events=1)
+    assert recent.state == {"x": 0, "a": 3, "b": 2}
+    assert len(recent.events) == 1
+
+
+def test_sessions_written_before_merging_are_folded_on_first_read(service):
+    session = asyncio.run(service.create_session(app_name=APP_NAME, user_id=f"user-{uuid.uuid4()}"))
+    session_ref = service._db.collection(SESSIONS_COLLECTION).document(session.id)
+    session_ref.update({"state": {"base": 1}, EVENT_STATE_MERGED_FIELD: firestore.DELETE_FIELD})
+    for i, delta in enumerate([{"a": 1}, {"a": 2, "b": 1}]):
+        # Legacy documents: no schema version, snake_case actions.
+        session_ref.collection(EVENTS_SUBCOLLECTION).document().set({
+            "author": "state_test_agent",
+            "invocation_id": "inv_1",
+            "timestamp": {"seconds": 1760000000 + i, "nanos": 0},
+            "event_time": 1760000000.0 + i,
+            "actions": {"state_delta": delta},
+        })
+
+    assert _get(service, session, num_recent_events=1).state == {"base": 1, "a": 2, "b": 1}
+    stored = session_ref.get().to_dict()
+    assert stored["state"] == {"base": 1, "a": 2, "b": 1}
+    assert stored[EVENT_STATE_MERGED_FIELD] is True
+
+
+def test_compaction_keeps_state_and_subtracts_compacted_events(service):
+    session = asyncio.run(service.create_session(app_name=APP_NAME, user_id=f"user-{uuid.uuid4()}"))
+    for i in range(5):
+        _append(service, session, {f"k{i}": i})
+
+    asyncio.run(service.compact_session(session_id=session.id))
+
+    stored = service._db.collection(SESSIONS_COLLECTION).document(session.id).get().to_dict()
+    assert stored[EVENT_COUNT_FIELD] == 2
+    full = _get(service, session)
+    assert full.state == {f"k{i}": i for i in range(5)}
+    assert len(full.events) == 2
+
+
+def test_compaction_without_archiving_deletes_the_dropped_events_blobs(tmp_path):
+    service = FirestoreSessionService(
+        project="demo-ventureai", compaction_keep_recent_events=1, archive_compacted_events=False,
+        blob_store=LocalDirectoryBlobStore(str(tmp_path)), blob_threshold_bytes=64,
+    )
+    session = asyncio.run(service.create_session(app_name=APP_NAME, user_id=f"user-{uuid.uuid4()}"))
+    for i in range(3):
+        event = Event(
+            author="state_test_agent", invocation_id="inv_1",
+            content=types.Content(role="model", parts=[types.Part(text=str(i) * 256)]),
+        )
+        asyncio.run(service.append_event(session, event))
+
+    asyncio.run(service.compact_session(session_id=session.id))
+
+    blobs = [path for path in (tmp_path / session.id).rglob("*") if path.is_file()]
+    assert len(blobs) == 1
+    assert _get(service, session).events[0].content.parts[0].text == "2" * 256
@@ -0,0 +1,135 @@
+"""ProfileEnrichmentService against a local HTTP fixture server."""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from tools.profile_enrichment import DomainThrottle, ProfileEnrichmentService
+
+PROFILE_HTML = """
+<html><head><title>Jane Doe | LinkedIn</title><script>var tracking = 1;</script></head>
+<body>
+  <a>Skip to main content</a><a>Sign in</a><a>Join now</a>
+  <h1>Jane Doe</h1><p>Founder at Acme Analytics</p>
+  <h2>About</h2><p>Building data tools for Indian SMEs.</p><p>Building data tools for Indian SMEs.</p>
+  <h2>Experience</h2><p>Acme Analytics, Founder, 2021 - present</p>
+  <footer><a>User Agreement</a><a>Privacy Policy</a><a>Cookie Policy</a></footer>
+</body></html>
+"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.request_times.append((self.path, time.monotonic()))
+        if self.path.startswith("/profile/"):
+            body = PROFILE_HTML.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(500, "fixture failure")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.request_times = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _service(**kwargs):
+    http_session = requests.Session()
+    http_session.trust_env = False  # never route the fixture server through a proxy
+    return ProfileEnrichmentService(http_session=http_session, timeout_sec=5, **kwargs)
+
+
+def _unused_port():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    port = server.server_address[1]
+    server.server_close()
+    return port
+
+
+def test_a_failing_url_does_not_affect_the_others(fixture_server):
+    base = _base_url(fixture_server)
+    service = _service(per_domain_delay_sec=0)
+    urls = [f"{base}/profile/jane", f"{base}/broken", f"http://127.0.0.1:{_unused_port()}/profile/down"]
+
+    profiles = service.enrich(urls)
+
+    assert "Jane Doe" in profiles[urls[0]]["text"]
+    assert profiles[urls[1]]["error"].startswith("HTTPError")
+    assert profiles[urls[2]]["error"].startswith("ConnectionError")
+    # Failures are not cached; the successful profile is.
+    assert service.enrich(urls[:2])[urls[0]]["cached"] is True
+    assert "error" in service.enrich(urls[1:2])[urls[1]]
+    service.close()
+
+
+def test_requests_to_one_domain_are_spaced_by_the_delay(fixture_server):
+    base = _base_url(fixture_server)
+    service = _service(per_domain_concurrency=4, per_domain_delay_sec=0.2)
+
+    service.enrich([f"{base}/profile/{name}" for name in ("a", "b", "c", "d")])
+
+    starts = sorted(t for _, t in fixture_server.request_times)
+    assert len(starts) == 4
+    assert all(later - earlier >= 0.15 for earlier, later in zip(starts, starts[1:]))
+    service.close()
+
+
+def test_domain_throttle_bounds_concurrent_requests():
+    throttle = DomainThrottle(concurrency=2, delay_sec=0)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def request():
+        nonlocal active, peak
+        with throttle("example.com"):
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
+
+
+def test_page_text_is_compacted(fixture_server):
+    url = f"{_base_url(fixture_server)}/profile/jane"
+    service = _service(per_domain_delay_sec=0)
+
+    profile = service.enrich([url + "/?trk=public_profile#about"])[url]
+
+    assert profile["text"].count("Building data tools for Indian SMEs.") == 1
+    assert "Sign in" not in profile["text"] and "Privacy Policy" not in profile["text"]
+    assert "tracking" not in profile["text"]
+    assert profile["sections"]["about"] == "Building data tools for Indian SMEs."
+    assert profile["sections"]["experience"] == "Acme Analytics, Founder, 2021 - present"
+    assert profile["compaction"]["boilerplate_dropped"] >= 5
+    assert profile["compaction"]["duplicates_dropped"] == 1
+    assert profile["compaction"]["compression_ratio"] > 1
+    service.close()
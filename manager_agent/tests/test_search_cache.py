@@ -0,0 +1,117 @@
+"""SearchCache on the local file backend with a fake clock, and the web_search budget."""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from tools import search_cache  # noqa: E402
+from tools.search_cache import LocalFileSearchCacheBackend, SearchCache  # noqa: E402
+
+HOUR = 3600
+TTL_HOURS = {"market": 720, "traction": 24}
+
+
+class FakeClock:
+    def __init__(self, now=1_760_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSearch:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, query):
+        self.queries.append(query)
+        return {"answer": f"answer {len(self.queries)} for {query}", "sources": []}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return LocalFileSearchCacheBackend(str(tmp_path / "search_cache.json"))
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _cache(backend, clock):
+    return SearchCache(backend, ttl_hours=TTL_HOURS, default_ttl_hours=72, clock=clock)
+
+
+def test_normalized_queries_hit_the_same_entry(backend, clock):
+    cache = _cache(backend, clock)
+    search = FakeSearch()
+
+    first = cache.get_or_search("market", "India SME SaaS market size?", search)
+    second = cache.get_or_search("market", "  india sme saas MARKET size ", search)
+
+    assert second == first
+    assert search.queries == ["India SME SaaS market size?"]
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate() == 0.5
+
+
+def test_topics_do_not_share_entries(backend, clock):
+    cache = _cache(backend, clock)
+    search = FakeSearch()
+
+    cache.get_or_search("market", "acme analytics", search)
+    cache.get_or_search("traction", "acme analytics", search)
+
+    assert len(search.queries) == 2
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+@pytest.mark.parametrize("topic, ttl_hours", [("market", 720), ("traction", 24), ("general", 72)])
+def test_entries_expire_after_their_topic_ttl(backend, clock, topic, ttl_hours):
+    cache = _cache(backend, clock)
+    search = FakeSearch()
+    cache.get_or_search(topic, "acme analytics funding", search)
+
+    clock.now += ttl_hours * HOUR - 1
+    cache.get_or_search(topic, "acme analytics funding", search)
+    assert len(search.queries) == 1
+
+    clock.now += 1
+    refreshed = cache.get_or_search(topic, "acme analytics funding", search)
+    assert len(search.queries) == 2
+    assert refreshed["answer"].startswith("answer 2")
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_entries_persist_in_the_file(backend, clock, tmp_path):
+    search = FakeSearch()
+    _cache(backend, clock).get_or_search("market", "acme analytics", search)
+
+    reopened = _cache(LocalFileSearchCacheBackend(str(tmp_path / "search_cache.json")), clock)
+    reopened.get_or_search("market", "acme analytics", search)
+
+    assert len(search.queries) == 1
+    entries = json.loads((tmp_path / "search_cache.json").read_text(encoding="utf-8"))
+    (entry,) = entries.values()
+    assert entry["topic"] == "market" and entry["query"] == "acme analytics"
+    assert entry["expires_at"] == clock.now + 720 * HOUR
+
+
+def test_web_search_enforces_the_per_agent_budget_in_temp_state(backend, clock, monkeypatch):
+    search = FakeSearch()
+    monkeypatch.setattr(search_cache, "get_search_cache", lambda: _cache(backend, clock))
+    monkeypatch.setattr(search_cache, "grounded_search", search)
+    monkeypatch.setattr(search_cache, "SEARCH_MAX_PER_AGENT", 2)
+    market = SimpleNamespace(agent_name="market_researcher", state={})
+    traction = SimpleNamespace(agent_name="traction_researcher", state={})
+
+    results = [asyncio.run(search_cache.web_search(f"query {i}", market)) for i in range(3)]
+
+    assert [("error" in result) for result in results] == [False, False, True]
+    assert search.queries == ["query 0", "query 1"]
+    assert market.state == {"temp:search_count_market_researcher": 2}
+    # Each researcher has its own budget.
+    assert "error" not in asyncio.run(search_cache.web_search("query 0", traction))
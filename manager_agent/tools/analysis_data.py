@@ -0,0 +1,107 @@
+"""
+Shared `get_analysis_data` tool for the investor query and follow-up agents.
+
+Analysis rows are immutable once written, so they are kept in a process-wide,
+size- and TTL-bounded LRU cache and fetched with a single reused BigQuery
+client. Repeated questions about the same deck are answered without running
+another BigQuery job.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from google.adk.tools.tool_context import ToolContext
+from google.cloud import bigquery
+
+# --- Configuration ---
+PROJECT_ID = os.environ.get("GCP_PROJECT", "valued-mediator-461216-k7")
+BIGQUERY_DATASET_ID = os.environ.get("BIGQUERY_DATASET_ID", "venture_ai_test_dataset")
+BIGQUERY_TABLE_ID = os.environ.get("BIGQUERY_TABLE_ID", "pitch_deck_analysis")
+ANALYSIS_ROW_CACHE_MAX_ENTRIES = int(os.environ.get("ANALYSIS_ROW_CACHE_MAX_ENTRIES", "256"))
+ANALYSIS_ROW_CACHE_TTL_SEC = int(os.environ.get("ANALYSIS_ROW_CACHE_TTL_SEC", "1800"))
+# --------------------
+
+
+class AnalysisRowCache:
+    """A thread-safe LRU cache of analysis rows with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries, ttl_sec):
+        self._max_entries = max_entries
+        self._ttl_sec = ttl_sec
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, analysis_id):
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+            if entry is not None and time.monotonic() <= entry[0]:
+                self._entries.move_to_end(analysis_id)
+                self.hits += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self._entries[analysis_id]
+            self.misses += 1
+            return None
+
+    def put(self, analysis_id, row):
+        with self._lock:
+            self._entries[analysis_id] = (time.monotonic() + self._ttl_sec, dict(row))
+            self._entries.move_to_end(analysis_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+_row_cache = AnalysisRowCache(ANALYSIS_ROW_CACHE_MAX_ENTRIES, ANALYSIS_ROW_CACHE_TTL_SEC)
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_bigquery_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = bigquery.Client(project=PROJECT_ID)
+    return _client
+
+
+def fetch_analysis_row(analysis_id: str) -> dict:
+    """Returns the analysis row for `analysis_id`, from the cache when possible."""
+    cached_row = _row_cache.get(analysis_id)
+    if cached_row is not None:
+        return cached_row
+
+    table_ref_str = f"{PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}"
+    query = f"SELECT * FROM `{table_ref_str}` WHERE analysis_id = @analysis_id LIMIT 1"
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("analysis_id", "STRING", analysis_id),
+        ]
+    )
+    results = _get_bigquery_client().query(query, job_config=job_config).result()
+    try:
+        row = dict(next(iter(results)))
+    except StopIteration:
+        # Not cached: the row may still be on its way into the table.
+        return {"error": f"No analysis found for ID: {analysis_id}"}
+
+    # Timestamps are not JSON serializable in a function response.
+    row = {key: value.isoformat() if hasattr(value, "isoformat") else value for key, value in row.items()}
+    _row_cache.put(analysis_id, row)
+    return row
+
+
+def make_get_analysis_data_tool(state_key: str):
+    """Builds a `get_analysis_data` tool that reads the analysis ID from `state_key` in the session state."""
+
+    def get_analysis_data(tool_context: ToolContext) -> dict:
+        """Fetches the analysis data for a given analysis_id from BigQuery."""
+        analysis_id = tool_context.state.get(state_key)
+        if not analysis_id:
+            raise ValueError(f"{state_key} not found in the session state.")
+        return fetch_analysis_row(analysis_id)
+
+    return get_analysis_data
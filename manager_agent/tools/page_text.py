@@ -0,0 +1,185 @@
+"""
+Streaming compaction of scraped page text before it reaches an LLM.
+
+Profile pages repeat the same sign-in, cookie-policy and navigation blurbs many
+times before any real content. Text nodes are processed one at a time, straight
+from the HTML stream, and:
+
+  * known boilerplate nodes are dropped,
+  * repeated blocks are kept only once,
+  * known section headings (About, Experience, Education, ...) start a section,
+  * output stops at a token budget, so the rest of the page is never read.
+
+`CompactionStats` reports what was dropped and the compression ratio.
+"""
+import codecs
+import os
+import re
+from html.parser import HTMLParser
+
+# --- Configuration ---
+PAGE_TEXT_TOKEN_BUDGET = int(os.environ.get("PAGE_TEXT_TOKEN_BUDGET", "1500"))
+# --------------------
+
+# Rough token estimate for English text.
+CHARS_PER_TOKEN = 4
+
+BOILERPLATE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"^skip to main content$",
+    r"^(sign in|join now|sign in or|join now or|or|show|get the app|contact info|see more|see less|report this profile)$",
+    r"^sign in to view .* full profile$",
+    r"^welcome back$",
+    r"^email or phone$",
+    r"^password$",
+    r"^forgot password\??$",
+    r"^new to linkedin\?( join now( or)?)?$",
+    r"^by clicking continue to join or sign in, you agree to .*$",
+    r"^(linkedin|top content|people|learning|jobs|games)$",
+    r"^(user agreement|privacy policy|cookie policy|copyright policy|brand policy|community guidelines|accessibility)\s*[.,]?$",
+    r"^(,|\.|·|\||,? ?and)$",
+    r"^(see your|view) mutual connections.*$",
+    r"^© \d{4}.*$",
+)]
+
+SECTION_HEADINGS = {
+    "about", "experience", "education", "activity", "projects", "skills", "languages",
+    "licenses & certifications", "volunteer experience", "honors & awards", "recommendations",
+    "publications", "courses", "organizations", "patents", "test scores",
+}
+
+_SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+
+
+class CompactionStats:
+    """Counters for one compaction run."""
+
+    def __init__(self):
+        self.input_chars = 0
+        self.output_chars = 0
+        self.nodes = 0
+        self.boilerplate_dropped = 0
+        self.duplicates_dropped = 0
+        self.truncated = False
+
+    @property
+    def compression_ratio(self):
+        """Input size over output size (higher is better); 1.0 for empty input."""
+        return self.input_chars / self.output_chars if self.output_chars else 1.0
+
+    def to_dict(self):
+        return {
+            "input_chars": self.input_chars,
+            "output_chars": self.output_chars,
+            "nodes": self.nodes,
+            "boilerplate_dropped": self.boilerplate_dropped,
+            "duplicates_dropped": self.duplicates_dropped,
+            "truncated": self.truncated,
+            "compression_ratio": round(self.compression_ratio, 2),
+        }
+
+
+class _TextNodeParser(HTMLParser):
+    """
+    Collects text nodes outside of scripts, styles and the document head. Text
+    split across fed chunks is joined at the next tag.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.nodes = []
+        self._pending = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in _SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._pending.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self.nodes.append("".join(self._pending))
+            self._pending.clear()
+
+
+def iter_html_text_nodes(chunks, encoding="utf-8"):
+    """Yields text nodes from an iterable of HTML chunks (bytes or str) without buffering the page."""
+    parser = _TextNodeParser()
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        yield from parser.nodes
+        parser.nodes.clear()
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    yield from parser.nodes
+
+
+def compact_text_nodes(nodes, token_budget=PAGE_TEXT_TOKEN_BUDGET):
+    """
+    Compacts an iterable of text nodes. Returns (text, sections, stats), where
+    `sections` maps each detected section heading to its text. Stops consuming
+    `nodes` once the token budget is reached.
+    """
+    char_budget = token_budget * CHARS_PER_TOKEN
+    stats = CompactionStats()
+    seen = set()
+    sections = {}
+    current_section = "header"
+    lines = []
+    used_chars = 0
+
+    for node in nodes:
+        text = " ".join(node.split())
+        stats.input_chars += len(node)
+        if not text:
+            continue
+        stats.nodes += 1
+        if any(pattern.match(text) for pattern in BOILERPLATE_PATTERNS):
+            stats.boilerplate_dropped += 1
+            continue
+        key = text.lower()
+        if key in SECTION_HEADINGS:
+            current_section = key
+            line = f"## {text}"
+        else:
+            if key in seen:
+                stats.duplicates_dropped += 1
+                continue
+            seen.add(key)
+            line = text
+
+        if used_chars + len(line) + 1 > char_budget:
+            remaining = char_budget - used_chars - 1
+            if remaining > 0 and not line.startswith("## "):
+                line = line[:remaining]
+                lines.append(line)
+                sections.setdefault(current_section, []).append(line)
+                used_chars += len(line) + 1
+            stats.truncated = True
+            break
+        lines.append(line)
+        if not line.startswith("## "):
+            sections.setdefault(current_section, []).append(line)
+        used_chars += len(line) + 1
+
+    text = "\n".join(lines)
+    stats.output_chars = len(text)
+    return text, {name: " ".join(parts) for name, parts in sections.items()}, stats
+
+
+def compact_html(chunks, encoding="utf-8", token_budget=PAGE_TEXT_TOKEN_BUDGET):
+    """Streams HTML chunks through `iter_html_text_nodes` and `compact_text_nodes`."""
+    return compact_text_nodes(iter_html_text_nodes(chunks, encoding), token_budget)
@@ -0,0 +1,194 @@
+"""
+Founder-profile enrichment: fetches profile pages (e.g. LinkedIn) and returns
+their compacted text (see `tools.page_text`).
+
+The service fetches pages over a pooled HTTP session on a bounded thread pool.
+URLs are normalized and deduplicated, fetches from one domain (request and
+body) are throttled to a minimum interval and a small number of concurrent
+connections, and cleaned profiles are cached by URL with a TTL. A failure on
+one URL is reported in that URL's entry and does not affect the others.
+Responses are streamed through the compactor, and reading stops once the
+page's token budget is filled.
+
+`enrich_founder_profiles` exposes the service as an ADK tool. Any http(s) URL
+works, so the service can be pointed at a local fixture server.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+from tools.page_text import PAGE_TEXT_TOKEN_BUDGET, compact_html
+
+# --- Configuration ---
+ENRICHMENT_MAX_WORKERS = int(os.environ.get("ENRICHMENT_MAX_WORKERS", "8"))
+ENRICHMENT_PER_DOMAIN_CONCURRENCY = int(os.environ.get("ENRICHMENT_PER_DOMAIN_CONCURRENCY", "2"))
+ENRICHMENT_PER_DOMAIN_DELAY_SEC = float(os.environ.get("ENRICHMENT_PER_DOMAIN_DELAY_SEC", "1.0"))
+ENRICHMENT_CACHE_TTL_SEC = int(os.environ.get("ENRICHMENT_CACHE_TTL_SEC", str(24 * 3600)))
+ENRICHMENT_CACHE_MAX_ENTRIES = int(os.environ.get("ENRICHMENT_CACHE_MAX_ENTRIES", "512"))
+ENRICHMENT_TIMEOUT_SEC = float(os.environ.get("ENRICHMENT_TIMEOUT_SEC", "15"))
+ENRICHMENT_MAX_URLS = int(os.environ.get("ENRICHMENT_MAX_URLS", "10"))
+ENRICHMENT_CHUNK_BYTES = 16 * 1024
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+# --------------------
+
+
+def normalize_profile_url(url):
+    """Drops query strings, fragments and trailing slashes and lowercases the host, so one profile has one URL."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    netloc = parts.netloc.lower()
+    if netloc.startswith("in.linkedin.com") or netloc.startswith("m.linkedin.com"):
+        netloc = "www.linkedin.com"
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), "", ""))
+
+
+class DomainThrottle:
+    """Limits concurrent requests per domain and spaces their start times by `delay_sec`."""
+
+    def __init__(self, concurrency, delay_sec):
+        self._concurrency = concurrency
+        self._delay_sec = delay_sec
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def __call__(self, domain):
+        with self._lock:
+            semaphore = self._semaphores.setdefault(domain, threading.BoundedSemaphore(self._concurrency))
+        return _ThrottledSlot(self, domain, semaphore)
+
+    def _wait_turn(self, domain):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(domain, now))
+            self._next_start[domain] = start + self._delay_sec
+        if start > now:
+            time.sleep(start - now)
+
+
+class _ThrottledSlot:
+    def __init__(self, throttle, domain, semaphore):
+        self._throttle = throttle
+        self._domain = domain
+        self._semaphore = semaphore
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        self._throttle._wait_turn(self._domain)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._semaphore.release()
+
+
+class ProfileEnrichmentService:
+    """Fetches and compacts profile pages concurrently, with per-domain throttling and a TTL cache."""
+
+    def __init__(
+        self,
+        max_workers=ENRICHMENT_MAX_WORKERS,
+        per_domain_concurrency=ENRICHMENT_PER_DOMAIN_CONCURRENCY,
+        per_domain_delay_sec=ENRICHMENT_PER_DOMAIN_DELAY_SEC,
+        cache_ttl_sec=ENRICHMENT_CACHE_TTL_SEC,
+        cache_max_entries=ENRICHMENT_CACHE_MAX_ENTRIES,
+        timeout_sec=ENRICHMENT_TIMEOUT_SEC,
+        token_budget=PAGE_TEXT_TOKEN_BUDGET,
+        http_session=None,
+    ):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="profile_enrichment")
+        self._throttle = DomainThrottle(per_domain_concurrency, per_domain_delay_sec)
+        self._cache_ttl_sec = cache_ttl_sec
+        self._cache_max_entries = cache_max_entries
+        self._cache = OrderedDict()  # url -> (expires_at, profile)
+        self._cache_lock = threading.Lock()
+        self._timeout_sec = timeout_sec
+        self._token_budget = token_budget
+        self._http = http_session or requests.Session()
+        self._http.headers.setdefault("User-Agent", USER_AGENT)
+        self.hits = 0
+        self.misses = 0
+
+    def enrich(self, urls):
+        """
+        Returns {normalized_url: profile} for `urls`. A profile is {"url", "text",
+        "sections", "compaction"} or {"url", "error"}.
+        """
+        unique_urls = list(dict.fromkeys(normalize_profile_url(url) for url in urls if url and url.strip()))
+        profiles = {}
+        to_fetch = []
+        for url in unique_urls:
+            cached = self._cache_get(url)
+            if cached is not None:
+                profiles[url] = {**cached, "cached": True}
+            else:
+                to_fetch.append(url)
+        for url, profile in zip(to_fetch, self._executor.map(self._fetch, to_fetch)):
+            profiles[url] = profile
+        return profiles
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def _fetch(self, url):
+        try:
+            # The slot is held until the body has been read, so it bounds open connections.
+            with self._throttle(urlsplit(url).netloc):
+                with self._http.get(url, timeout=self._timeout_sec, stream=True) as response:
+                    response.raise_for_status()
+                    text, sections, stats = compact_html(
+                        response.iter_content(chunk_size=ENRICHMENT_CHUNK_BYTES),
+                        encoding=response.encoding,
+                        token_budget=self._token_budget,
+                    )
+        except Exception as e:
+            # Failures (network, HTTP status, decoding or parsing) are not cached, so the next call retries them.
+            return {"url": url, "error": f"{type(e).__name__}: {e}"}
+        profile = {"url": url, "text": text, "sections": sections, "compaction": stats.to_dict()}
+        self._cache_put(url, profile)
+        return profile
+
+    def _cache_get(self, url):
+        with self._cache_lock:
+            entry = self._cache.get(url)
+            if entry is not None and time.monotonic() <= entry[0]:
+                self._cache.move_to_end(url)
+                self.hits += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self._cache[url]
+            self.misses += 1
+            return None
+
+    def _cache_put(self, url, profile):
+        with self._cache_lock:
+            self._cache[url] = (time.monotonic() + self._cache_ttl_sec, dict(profile))
+            self._cache.move_to_end(url)
+            while len(self._cache) > self._cache_max_entries:
+                self._cache.popitem(last=False)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_enrichment_service():
+    """Returns the process-wide enrichment service, creating it on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ProfileEnrichmentService()
+    return _service
+
+
+async def enrich_founder_profiles(profile_urls: list[str]) -> dict:
+    """Fetches founder profile pages (e.g. LinkedIn URLs) and returns their text by section, one entry per unique URL."""
+    if len(profile_urls) > ENRICHMENT_MAX_URLS:
+        profile_urls = profile_urls[:ENRICHMENT_MAX_URLS]
+    profiles = await asyncio.to_thread(get_enrichment_service().enrich, profile_urls)
+    return {"profiles": list(profiles.values())}
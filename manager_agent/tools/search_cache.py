@@ -0,0 +1,204 @@
+"""
+Cached web search tool for the research agents.
+
+Decks in the same sector trigger nearly identical searches (market sizes,
+well-known competitors, industry reports), so results are shared across
+analyses. Queries are normalized, results are stored in a persistent cache
+(Firestore, or a local JSON file for offline runs and tests) with a TTL that
+depends on how quickly the topic goes stale, and hit/miss counters are logged
+with every lookup.
+
+A miss runs one Gemini call grounded with Google Search and returns its answer
+with the source URLs. Each researcher also has a per-invocation search budget,
+which is enforced here because grounded search is otherwise invisible to ADK.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from google.adk.tools.tool_context import ToolContext
+
+logger = logging.getLogger("google_adk." + __name__)
+
+# --- Configuration ---
+PROJECT_ID = os.environ.get("GCP_PROJECT", "valued-mediator-461216-k7")
+SEARCH_CACHE_BACKEND = os.environ.get("SEARCH_CACHE_BACKEND", "firestore") # "firestore" or "file"
+SEARCH_CACHE_PATH = os.environ.get("SEARCH_CACHE_PATH", "search_cache.json")
+SEARCH_CACHE_COLLECTION = os.environ.get("SEARCH_CACHE_COLLECTION", "search_cache")
+SEARCH_MODEL = os.environ.get("SEARCH_MODEL", "gemini-2.5-flash")
+SEARCH_MAX_PER_AGENT = int(os.environ.get("RESEARCH_MAX_SEARCHES_PER_TOPIC", "4"))
+# Market sizes and founder bios change slowly; traction news goes stale quickly.
+SEARCH_TTL_HOURS = {
+    "market": float(os.environ.get("SEARCH_TTL_HOURS_MARKET", "720")),
+    "competitors": float(os.environ.get("SEARCH_TTL_HOURS_COMPETITORS", "168")),
+    "founders": float(os.environ.get("SEARCH_TTL_HOURS_FOUNDERS", "720")),
+    "traction": float(os.environ.get("SEARCH_TTL_HOURS_TRACTION", "24")),
+}
+DEFAULT_SEARCH_TTL_HOURS = float(os.environ.get("SEARCH_TTL_HOURS_DEFAULT", "72"))
+# --------------------
+
+
+class FirestoreSearchCacheBackend:
+    """Stores search results as documents in a Firestore collection."""
+
+    def __init__(self, collection=SEARCH_CACHE_COLLECTION, project=PROJECT_ID, database=None):
+        from google.cloud import firestore
+
+        self._collection = firestore.Client(project=project, database=database).collection(collection)
+
+    def get(self, key):
+        doc = self._collection.document(key).get()
+        return doc.to_dict() if doc.exists else None
+
+    def put(self, key, entry):
+        self._collection.document(key).set(entry)
+
+
+class LocalFileSearchCacheBackend:
+    """Stores search results in a local JSON file."""
+
+    def __init__(self, path=SEARCH_CACHE_PATH):
+        self._path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return {}
+        with open(self._path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get(self, key):
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key, entry):
+        with self._lock:
+            entries = self._load()
+            entries[key] = entry
+            tmp_path = self._path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self._path)
+
+
+class SearchCache:
+    """
+    Normalizes queries and caches their results with per-topic TTLs, counting
+    hits and misses. `clock` returns the current epoch time in seconds.
+    """
+
+    def __init__(self, backend, ttl_hours=None, default_ttl_hours=DEFAULT_SEARCH_TTL_HOURS, clock=time.time):
+        self._backend = backend
+        self._clock = clock
+        self._ttl_hours = ttl_hours if ttl_hours is not None else SEARCH_TTL_HOURS
+        self._default_ttl_hours = default_ttl_hours
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query):
+        """Lowercases, strips punctuation and collapses whitespace, so trivially different queries share an entry."""
+        query = re.sub(r"[^\w\s$%.-]", " ", query.lower())
+        return " ".join(query.split()).strip(" .-")
+
+    def key(self, topic, query):
+        return hashlib.sha256(f"{topic}\n{self.normalize(query)}".encode("utf-8")).hexdigest()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get_or_search(self, topic, query, search):
+        """Returns the cached result for `query` under `topic`, calling `search(query)` on a miss."""
+        key = self.key(topic, query)
+        entry = self._backend.get(key)
+        if entry is not None and entry["expires_at"] > self._clock():
+            self._record(hit=True, topic=topic, query=query)
+            return entry["result"]
+
+        self._record(hit=False, topic=topic, query=query)
+        result = search(query)
+        ttl_sec = self._ttl_hours.get(topic, self._default_ttl_hours) * 3600
+        self._backend.put(key, {
+            "query": self.normalize(query),
+            "topic": topic,
+            "result": result,
+            "expires_at": self._clock() + ttl_sec,
+        })
+        return result
+
+    def _record(self, hit, topic, query):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            logger.info(
+                "Search cache %s for [%s] '%s' (hit rate %.0f%% over %d lookups)",
+                "hit" if hit else "miss", topic, query, self.hit_rate() * 100, self.hits + self.misses,
+            )
+
+
+_search_cache = None
+_genai_client = None
+_init_lock = threading.Lock()
+
+
+def get_search_cache():
+    """Returns the process-wide search cache, creating it and its backend on first use."""
+    global _search_cache
+    if _search_cache is None:
+        with _init_lock:
+            if _search_cache is None:
+                if SEARCH_CACHE_BACKEND == "file":
+                    backend = LocalFileSearchCacheBackend()
+                else:
+                    backend = FirestoreSearchCacheBackend(database=os.environ.get("DATABASE"))
+                _search_cache = SearchCache(backend)
+    return _search_cache
+
+
+def grounded_search(query):
+    """Answers `query` with one Gemini call grounded in Google Search; returns the answer and its sources."""
+    global _genai_client
+    from google import genai
+    from google.genai import types
+
+    if _genai_client is None:
+        with _init_lock:
+            if _genai_client is None:
+                _genai_client = genai.Client(vertexai=True, project=PROJECT_ID, location=os.environ.get("LOCATION", "us-central1"))
+    response = _genai_client.models.generate_content(
+        model=SEARCH_MODEL,
+        contents=f"Search the web and summarize the most relevant, factual results for: {query}",
+        config=types.GenerateContentConfig(tools=[types.Tool(google_search=types.GoogleSearch())]),
+    )
+    sources = []
+    candidate = response.candidates[0] if response.candidates else None
+    grounding = candidate.grounding_metadata if candidate else None
+    for chunk in (grounding.grounding_chunks or []) if grounding else []:
+        if chunk.web and chunk.web.uri:
+            sources.append({"title": chunk.web.title, "url": chunk.web.uri})
+    return {"answer": response.text or "", "sources": sources}
+
+
+async def web_search(query: str, tool_context: ToolContext) -> dict:
+    """Searches the web for `query` and returns a summary of the results with their source URLs."""
+    agent_name = tool_context.agent_name
+    # Researchers are named "<topic>_researcher"; the topic selects the cache TTL.
+    topic = agent_name[: -len("_researcher")] if agent_name.endswith("_researcher") else "general"
+
+    budget_key = f"temp:search_count_{agent_name}"
+    searches = tool_context.state.get(budget_key, 0)
+    if searches >= SEARCH_MAX_PER_AGENT:
+        return {"error": f"Search budget of {SEARCH_MAX_PER_AGENT} searches is used up; answer with the findings so far."}
+    tool_context.state[budget_key] = searches + 1
+
+    # Off the event loop, so the parallel researchers' searches overlap.
+    return await asyncio.to_thread(get_search_cache().get_or_search, topic, query, grounded_search)